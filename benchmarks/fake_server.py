@@ -0,0 +1,388 @@
+"""
+Local stand-in for the hut reservation web API, with configurable latency and fault injection.
+
+The server answers the two requests performed for each hut:
+    api/v1/reservation/hutInfo/{id}
+    api/v1/reservation/getHutAvailability?hutId={id}
+using recorded JSON files, if available, or synthetic data generated from the list of huts (so that the application
+finds the expected hut names and room labels). The synthetic data are stable between requests (unless a change rate
+is set), and ETag validators are provided, so that conditional requests can be answered with 304 Not Modified.
+
+Run with:
+python -m benchmarks.fake_server [-p PORT] [-l LATENCY] [-e STATUS:RATE ...] [-t RATE] [-d DAYS] [-c CATEGORIES] ...
+and set BASE_URL (in config.yaml) to the printed address.
+
+Latency distributions (seconds):
+    constant:VALUE
+    uniform:MIN:MAX
+    exponential:MEAN
+    lognormal:MEDIAN:SIGMA
+
+Recorded data are read from a folder containing the files hutInfo/{id}.json and getHutAvailability/{id}.json;
+the huts without recorded files are answered with synthetic data.
+
+Classes:
+    FakeServer: local server emulating the hut reservation web API
+
+Functions:
+    parse_latency: create a latency distribution from its description
+"""
+import argparse
+import csv
+import datetime
+import hashlib
+import json
+import math
+import pathlib
+import random
+import socket
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread, Lock
+from urllib.parse import urlparse, parse_qs
+
+from src.config import ASSETS_PATH_DATA
+
+_HUTS_DATA_FILE = ASSETS_PATH_DATA / 'huts.txt'
+_SKIP_CODE = 'SKIP'
+_HUT_INFO_PATH = '/api/v1/reservation/hutInfo/'
+_AVAILABILITY_PATH = '/api/v1/reservation/getHutAvailability'
+_ROOM_LABELS = ['Massenlager', 'Doppelzimmer', 'Mehrbettzimmer', 'Einzelzimmer', 'Matratzenlager', 'Zweibettzimmer',
+                'Vierbettzimmer', '6-er Zimmer']
+_CLOSED_RATIO = 0.1  # ratio of closed days in the synthetic data
+_MAX_FREE_BEDS = 40
+
+DEFAULT_SETTINGS = {
+    'latency': 'constant:0.05',  # distribution of the time before the answer
+    'errors': {},  # probability of an error answer for each status code (e.g. {429: 0.02, 503: 0.05})
+    'retry_after': None,  # seconds: value of the Retry-After header of the 429 and 503 answers (None: no header)
+    'timeout_rate': 0.0,  # probability that a request is never answered
+    'hang_time': 60.0,  # seconds: time after which the connection of an unanswered request is closed
+    'days': 180,  # number of days of the synthetic availability data
+    'categories': 3,  # number of bed categories of the synthetic huts
+    'padding': 0,  # bytes added to each synthetic answer, to emulate larger payloads
+    'change_rate': 0.0,  # probability that the availability of a hut changes before a request
+    'etag': True,  # if True, ETag validators are provided and conditional requests are honoured
+    'recorded': None,  # folder of recorded JSON files
+    'seed': None,  # seed of the random generator, for reproducible runs
+}
+
+
+def parse_latency(description):
+    """Create a latency distribution from its description.
+
+    :param description: the description of the distribution (e.g. 'lognormal:0.08:0.5')
+    :return: function returning a random latency [seconds] (signature: (random.Random) -> float)
+    """
+    name, *parameters = description.split(':')
+    parameters = [float(parameter) for parameter in parameters]
+    if name == 'constant' and len(parameters) == 1:
+        return lambda rng: parameters[0]
+    if name == 'uniform' and len(parameters) == 2:
+        return lambda rng: rng.uniform(*parameters)
+    if name == 'exponential' and len(parameters) == 1:
+        return lambda rng: rng.expovariate(1 / parameters[0]) if parameters[0] > 0 else 0.
+    if name == 'lognormal' and len(parameters) == 2:
+        return lambda rng: rng.lognormvariate(math.log(parameters[0]), parameters[1])
+    raise ValueError(f"Invalid latency distribution '{description}'")
+
+
+class FakeServer:
+    """Local server emulating the hut reservation web API.
+
+    Properties:
+        base_url: the URL to be used as BASE_URL by the application
+        statistics: copy of the statistics of the served requests
+
+    Methods:
+        start: start serving the requests in a background thread
+        stop: stop the server
+        reset_statistics: reset the statistics of the served requests
+    """
+
+    def __init__(self, settings=None, host='127.0.0.1', port=0):
+        """Create the server.
+
+        :param settings: dictionary of settings overriding DEFAULT_SETTINGS
+        :param host: the address of the server
+        :param port: the port of the server (0: a free port is chosen)
+        """
+        self._settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self._latency = parse_latency(self._settings['latency'])
+        self._random = random.Random(self._settings['seed'])
+        self._lock = Lock()
+        self._huts = self._load_huts()
+        self._versions = {}
+        self._statistics = {}
+        self.reset_statistics()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """Return the URL to be used as BASE_URL by the application.
+
+        :return: the base URL of the server
+        """
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    @property
+    def statistics(self):
+        """Return a copy of the statistics of the served requests.
+
+        :return: dictionary of statistics (requests, bytes sent, answers by status code, unanswered requests)
+        """
+        with self._lock:
+            return {key: value.copy() if isinstance(value, dict) else value
+                    for key, value in self._statistics.items()}
+
+    def start(self):
+        """Start serving the requests in a background thread.
+
+        :return: the server itself
+        """
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_statistics(self):
+        """Reset the statistics of the served requests."""
+        with self._lock:
+            self._statistics = {'requests': 0, 'bytes_sent': 0, 'status': {}, 'unanswered': 0}
+
+    @staticmethod
+    def _load_huts():
+        """Load the names and language codes of the huts from the huts data file.
+
+        :return: dictionary of hut name and language code, with hut index as key
+        """
+        huts = {}
+        with open(_HUTS_DATA_FILE, encoding='UTF-8-SIG') as tsv:
+            for line in csv.reader(tsv, dialect='excel-tab'):
+                if len(line) < 10 or line[1] == _SKIP_CODE:
+                    continue
+                try:
+                    huts[int(line[0])] = {'name': line[1], 'lang_code': line[9]}
+                except ValueError:
+                    continue
+        return huts
+
+    def _draw(self):
+        """Draw the latency and the fault of a request.
+
+        :return: tuple of the latency [seconds], of the flag of unanswered request and of the error status code
+        """
+        with self._lock:
+            latency = max(0., self._latency(self._random))
+            if self._random.random() < self._settings['timeout_rate']:
+                return latency, True, None
+            draw = self._random.random()
+            for status, rate in self._settings['errors'].items():
+                if draw < rate:
+                    return latency, False, int(status)
+                draw -= rate
+            return latency, False, None
+
+    def _recorded(self, kind, index):
+        """Get the recorded answer of a request, if available.
+
+        :param kind: the kind of request ('hutInfo' or 'getHutAvailability')
+        :param index: the hut index
+        :return: the recorded answer (bytes), None if not available
+        """
+        if self._settings['recorded'] is None:
+            return None
+        try:
+            return (pathlib.Path(self._settings['recorded']) / kind / f'{index}.json').read_bytes()
+        except IOError:
+            return None
+
+    def _hut_info(self, index):
+        """Get the answer to the hut information request.
+
+        :param index: the hut index
+        :return: the answer (bytes), None if the hut is unknown
+        """
+        recorded = self._recorded('hutInfo', index)
+        if recorded is not None:
+            return recorded
+        if index not in self._huts:
+            return None
+        lang_code = self._huts[index]['lang_code']
+        language = lang_code if lang_code in ('IT', 'FR') else 'DE_' + lang_code
+        categories = [{'categoryID': 100 * index + k,
+                       'hutBedCategoryLanguageData': [{'language': language,
+                                                       'label': _ROOM_LABELS[k % len(_ROOM_LABELS)]}]}
+                      for k in range(self._settings['categories'])]
+        hut_info = {'hutId': index, 'hutName': self._huts[index]['name'], 'hutLanguages': [language],
+                    'hutBedCategories': categories}
+        return self._encode(hut_info)
+
+    def _availability(self, index):
+        """Get the answer to the availability request.
+
+        :param index: the hut index
+        :return: the answer (bytes), None if the hut is unknown
+        """
+        recorded = self._recorded('getHutAvailability', index)
+        if recorded is not None:
+            return recorded
+        if index not in self._huts:
+            return None
+        with self._lock:
+            if self._random.random() < self._settings['change_rate']:
+                self._versions[index] = self._versions.get(index, 0) + 1
+            version = self._versions.get(index, 0)
+        first_day = datetime.date.today()
+        days = []
+        for k in range(self._settings['days']):
+            seed = int.from_bytes(hashlib.blake2b(f'{index}/{k}/{version}'.encode(), digest_size=8).digest(), 'big')
+            day_random = random.Random(seed)
+            closed = day_random.random() < _CLOSED_RATIO
+            free_beds = {str(100 * index + c): 0 if closed else day_random.randint(0, _MAX_FREE_BEDS)
+                         for c in range(self._settings['categories'])}
+            days.append({'dateFormatted': (first_day + datetime.timedelta(days=k)).strftime('%d.%m.%Y'),
+                         'hutStatus': 'CLOSED' if closed else 'SERVICED',
+                         'freeBedsPerCategory': free_beds})
+        return self._encode(days)
+
+    def _encode(self, data):
+        """Encode a synthetic answer, adding the padding (as trailing whitespace, ignored by JSON decoders).
+
+        :param data: the answer data
+        :return: the encoded answer (bytes)
+        """
+        return json.dumps(data).encode() + b' ' * self._settings['padding']
+
+    def _record(self, status, size=0, answered=True):
+        """Update the statistics of the served requests.
+
+        :param status: the status code of the answer
+        :param size: the size of the answer body [bytes]
+        :param answered: False if the request has not been answered
+        """
+        with self._lock:
+            self._statistics['requests'] += 1
+            if not answered:
+                self._statistics['unanswered'] += 1
+                return
+            self._statistics['bytes_sent'] += size
+            self._statistics['status'][status] = self._statistics['status'].get(status, 0) + 1
+
+    def _handler_class(self):
+        """Create the request handler class bound to this server.
+
+        :return: the request handler class
+        """
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *_args):
+                pass
+
+            def do_GET(self):
+                latency, unanswered, error_status = server._draw()
+                if unanswered:
+                    server._record(None, answered=False)
+                    time.sleep(server._settings['hang_time'])
+                    self.close_connection = True
+                    try:
+                        self.connection.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+                    return
+                time.sleep(latency)
+                if error_status is not None:
+                    headers = {}
+                    if error_status in (429, 503) and server._settings['retry_after'] is not None:
+                        headers['Retry-After'] = str(server._settings['retry_after'])
+                    self._answer(error_status, b'', headers)
+                    return
+                url = urlparse(self.path)
+                body = None
+                try:
+                    if url.path.startswith(_HUT_INFO_PATH):
+                        body = server._hut_info(int(url.path[len(_HUT_INFO_PATH):]))
+                    elif url.path == _AVAILABILITY_PATH:
+                        body = server._availability(int(parse_qs(url.query)['hutId'][0]))
+                except (ValueError, KeyError):
+                    body = None
+                if body is None:
+                    self._answer(404, b'')
+                    return
+                headers = {'Content-Type': 'application/json'}
+                if server._settings['etag']:
+                    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+                    headers['ETag'] = etag
+                    if self.headers.get('If-None-Match') == etag:
+                        self._answer(304, b'', headers)
+                        return
+                self._answer(200, body, headers)
+
+            def _answer(self, status, body, headers=None):
+                server._record(status, len(body))
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return _Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the hut reservation web API.")
+    parser.add_argument('-H', '--host', type=str, default='127.0.0.1', help="address of the server")
+    parser.add_argument('-p', '--port', type=int, default=8000, help="port of the server")
+    parser.add_argument('-l', '--latency', type=str, default=DEFAULT_SETTINGS['latency'],
+                        help="latency distribution (e.g. constant:0.05, lognormal:0.08:0.5)")
+    parser.add_argument('-e', '--error', type=str, action='append', default=[], metavar='STATUS:RATE',
+                        help="probability of an error answer with the status code (repeatable, e.g. 503:0.05)")
+    parser.add_argument('-r', '--retry-after', type=float, default=None,
+                        help="Retry-After of the 429 and 503 answers [seconds]")
+    parser.add_argument('-t', '--timeout-rate', type=float, default=0., help="probability of unanswered requests")
+    parser.add_argument('--hang-time', type=float, default=DEFAULT_SETTINGS['hang_time'],
+                        help="time before closing the connection of unanswered requests [seconds]")
+    parser.add_argument('-d', '--days', type=int, default=DEFAULT_SETTINGS['days'],
+                        help="number of days of the synthetic availability")
+    parser.add_argument('-c', '--categories', type=int, default=DEFAULT_SETTINGS['categories'],
+                        help="number of bed categories of the synthetic huts")
+    parser.add_argument('--padding', type=int, default=0, help="bytes added to each synthetic answer")
+    parser.add_argument('--change-rate', type=float, default=0., help="probability of availability changes")
+    parser.add_argument('--no-etag', action='store_true', help="do not provide ETag validators")
+    parser.add_argument('--recorded', type=str, default=None, help="folder of recorded JSON answers")
+    parser.add_argument('-s', '--seed', type=int, default=None, help="seed of the random generator")
+    args = parser.parse_args()
+
+    errors = {}
+    for error in args.error:
+        status, rate = error.split(':')
+        errors[int(status)] = float(rate)
+    settings = {'latency': args.latency, 'errors': errors, 'retry_after': args.retry_after,
+                'timeout_rate': args.timeout_rate, 'hang_time': args.hang_time, 'days': args.days,
+                'categories': args.categories, 'padding': args.padding, 'change_rate': args.change_rate,
+                'etag': not args.no_etag, 'recorded': args.recorded, 'seed': args.seed}
+    server = FakeServer(settings, args.host, args.port).start()
+    print(f"Serving the hut reservation API on {server.base_url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(1.)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(json.dumps(server.statistics, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+Benchmark of the pipeline retrieving the free places in the huts, run against the local fake server.
+
+Two scenarios are measured:
+    hut: web_request.perform_web_request_for_hut called for one hut after the other
+    crawl: HutsModel._perform_web_request retrieving all the huts as the application does
+For each scenario the report contains the throughput (huts per second), the percentiles of the latency of the
+single web requests, the CPU time spent decoding and parsing the availability data and the bytes transferred.
+The report is written as JSON, so that the results of different versions can be compared.
+
+Run with:
+python -m benchmarks.fetch_pipeline [-n HUTS] [-s SCENARIO ...] [-o OUTPUT] [fake server options]
+"""
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+from threading import Lock
+
+from src import config
+from benchmarks.fake_server import FakeServer, DEFAULT_SETTINGS
+
+_SCENARIOS = ['hut', 'crawl']
+
+
+class _Probe:
+    """
+    Instrumentation of the web_request module collecting the latency and size of each web request
+    and the CPU time spent decoding and parsing the availability data.
+
+    Methods:
+        install: start collecting the measurements
+        uninstall: stop collecting the measurements
+        report: get the summary of the collected measurements
+    """
+
+    def __init__(self, web_request):
+        """Create the probe.
+
+        :param web_request: the web_request module
+        """
+        self._web_request = web_request
+        self._lock = Lock()
+        self._latencies = []
+        self._bytes = 0
+        self._decode_time = 0.
+        self._parse_time = 0.
+        self._original = {}
+
+    def install(self):
+        """Start collecting the measurements."""
+        web_request = self._web_request
+        self._original = {'_json_loads': web_request._json_loads,
+                          '_parse_hut_availability_json': web_request._parse_hut_availability_json}
+        web_request._json_loads = self._timed(web_request._json_loads, '_decode_time')
+        web_request._parse_hut_availability_json = self._timed(web_request._parse_hut_availability_json,
+                                                               '_parse_time')
+        web_request._session.hooks['response'].append(self._on_response)
+
+    def uninstall(self):
+        """Stop collecting the measurements."""
+        for name, function in self._original.items():
+            setattr(self._web_request, name, function)
+        self._web_request._session.hooks['response'].remove(self._on_response)
+
+    def report(self, huts, elapsed_time):
+        """Get the summary of the collected measurements.
+
+        :param huts: number of retrieved huts
+        :param elapsed_time: duration of the retrieval [seconds]
+        :return: dictionary of measurements
+        """
+        latencies = sorted(self._latencies)
+        return {
+            'huts': huts,
+            'elapsed_time': elapsed_time,
+            'huts_per_second': huts / elapsed_time if elapsed_time > 0 else None,
+            'requests': len(latencies),
+            'latency': {
+                'p50': _percentile(latencies, 0.50),
+                'p95': _percentile(latencies, 0.95),
+                'p99': _percentile(latencies, 0.99),
+                'max': latencies[-1] if latencies else None
+            },
+            'decode_cpu_time': self._decode_time,
+            'parse_cpu_time': self._parse_time,
+            'parse_cpu_time_per_hut': (self._decode_time + self._parse_time) / huts if huts else None,
+            'bytes_received': self._bytes
+        }
+
+    def _timed(self, function, counter):
+        """Wrap a function to accumulate the CPU time spent in it.
+
+        :param function: the function to be wrapped
+        :param counter: the name of the attribute accumulating the CPU time
+        :return: the wrapped function
+        """
+        def timed(*args, **kwargs):
+            start = time.thread_time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.thread_time() - start
+                with self._lock:
+                    setattr(self, counter, getattr(self, counter) + elapsed)
+        return timed
+
+    def _on_response(self, response, *_args, **_kwargs):
+        """Record the latency and size of a web request (response hook of the session).
+
+        :param response: the response of the web request
+        """
+        with self._lock:
+            self._latencies.append(response.elapsed.total_seconds())
+            self._bytes += len(response.content)
+
+
+def _percentile(values, fraction):
+    """Get a percentile of a sorted list of values.
+
+    :param values: the sorted list of values
+    :param fraction: the percentile as a fraction
+    :return: the percentile, None if the list is empty
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _run_hut(web_request, huts):
+    """Retrieve the huts one after the other with perform_web_request_for_hut.
+
+    :param web_request: the web_request module
+    :param huts: dictionary of information about the huts, with hut index as key
+    :return: the number of failed huts
+    """
+    failed = 0
+    for index, hut in huts.items():
+        if web_request.perform_web_request_for_hut(index, hut)['error'] is not None:
+            failed += 1
+    return failed
+
+
+def _run_crawl(huts_model, huts):
+    """Retrieve the huts as the application does, with HutsModel._perform_web_request.
+
+    :param huts_model: the model
+    :param huts: dictionary of information about the huts, with hut index as key
+    :return: the number of failed huts
+    """
+    huts_model._results_dictionary.clear()
+    huts_model._availability.clear()
+    huts_model._perform_web_request(list(huts), datetime.date.today(), None, None)
+    results = huts_model.get_results_dictionary()
+    return sum(1 for index in huts if results[index]['error'] is not None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the retrieval of the free places in the huts.")
+    parser.add_argument('-n', '--huts', type=int, default=100, help="number of retrieved huts")
+    parser.add_argument('-s', '--scenario', type=str, action='append', choices=_SCENARIOS,
+                        help="scenario to be run (repeatable; default: all)")
+    parser.add_argument('-o', '--output', type=str, default=None, help="file of the JSON report (default: stdout)")
+    parser.add_argument('--rate', type=float, default=None, help="initial request rate [requests per second]")
+    parser.add_argument('--concurrency', type=int, default=None, help="maximum number of concurrent requests")
+    parser.add_argument('--http-cache', action='store_true', help="enable the HTTP cache")
+    parser.add_argument('--warm', action='store_true', help="keep the cached hut information")
+    parser.add_argument('-l', '--latency', type=str, default=DEFAULT_SETTINGS['latency'],
+                        help="latency distribution of the fake server (e.g. lognormal:0.08:0.5)")
+    parser.add_argument('-e', '--error', type=str, action='append', default=[], metavar='STATUS:RATE',
+                        help="probability of an error answer of the fake server (repeatable, e.g. 503:0.05)")
+    parser.add_argument('-t', '--timeout-rate', type=float, default=0.,
+                        help="probability of unanswered requests of the fake server")
+    parser.add_argument('-d', '--days', type=int, default=DEFAULT_SETTINGS['days'],
+                        help="number of days of the availability data")
+    parser.add_argument('-c', '--categories', type=int, default=DEFAULT_SETTINGS['categories'],
+                        help="number of bed categories of each hut")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the fake server random generator")
+    args = parser.parse_args()
+
+    errors = {}
+    for error in args.error:
+        status, rate = error.split(':')
+        errors[int(status)] = float(rate)
+    server_settings = {'latency': args.latency, 'errors': errors, 'timeout_rate': args.timeout_rate,
+                       'hang_time': 10., 'days': args.days, 'categories': args.categories, 'seed': args.seed}
+
+    # The configuration is loaded from the files and then redirected to the fake server
+    config.load()
+    config._config['HTTP_CACHE'] = args.http_cache
+    if args.rate is not None:
+        config._config['REQUEST_RATE'] = args.rate
+    if args.concurrency is not None:
+        config._config['MAX_CONCURRENT_REQUESTS'] = args.concurrency
+
+    from src import model, i18n, web_request
+    i18n.configure()
+
+    report = {
+        'benchmark': 'fetch_pipeline',
+        'version': (config.ABOUT or {}).get('version'),
+        'python': platform.python_version(),
+        'json_decoder': 'orjson' if web_request.orjson is not None else 'json',
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'settings': {**vars(args), 'server': server_settings},
+        'scenarios': {}
+    }
+
+    huts_model = None
+    for scenario in args.scenario or _SCENARIOS:
+        server = FakeServer(server_settings).start()
+        config._config['BASE_URL'] = server.base_url
+        web_request.configure()
+        if not args.warm:
+            web_request.invalidate_hut_info()
+        if huts_model is None:
+            huts_model = model.HutsModel()
+        indexes = [index for index in huts_model.get_all_huts()['displayed'] if index in server._huts][:args.huts]
+        huts = {index: huts_model._huts_dictionary[index] for index in indexes}
+
+        probe = _Probe(web_request)
+        probe.install()
+        start_time = time.monotonic()
+        if scenario == 'hut':
+            failed = _run_hut(web_request, huts)
+        else:
+            failed = _run_crawl(huts_model, huts)
+        elapsed_time = time.monotonic() - start_time
+        probe.uninstall()
+        server.stop()
+
+        report['scenarios'][scenario] = {**probe.report(len(huts), elapsed_time),
+                                         'failed_huts': failed,
+                                         'server': server.statistics}
+        print(f"{scenario}: {len(huts)} huts in {elapsed_time:.1f} s", file=sys.stderr)
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, 'w', encoding='UTF-8') as report_file:
+            report_file.write(output)
+
+
+if __name__ == '__main__':
+    main()
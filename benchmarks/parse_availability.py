@@ -0,0 +1,74 @@
+"""
+Micro-benchmark of the parsing of the hut availability data.
+
+A synthetic season of availability data is decoded and parsed repeatedly, as it happens for every hut during a
+retrieval; the time per hut is reported for the JSON decoding and for the parsing, the latter both with an empty
+and with a warm cache of the parsed dates.
+
+Run with:
+python -m benchmarks.parse_availability [-n HUTS] [-d DAYS] [-c CATEGORIES]
+"""
+import argparse
+import datetime
+import json
+import time
+
+from src import config
+from src import web_request
+
+_LABELS = ['Massenlager', 'Doppelzimmer', 'Einzelzimmer', 'Mehrbettzimmer', 'Winterraum']
+
+
+def _synthetic_availability(number_days, number_categories):
+    """Create the synthetic availability data of a hut.
+
+    :param number_days: number of days of the season
+    :param number_categories: number of bed categories of the hut
+    :return: tuple of the availability data (JSON bytes), of the bed categories and of their labels
+    """
+    first_day = datetime.date.today()
+    category_id_list = list(range(1, number_categories + 1))
+    room_label_list = [_LABELS[i % len(_LABELS)] for i in range(number_categories)]
+    days = [{'dateFormatted': (first_day + datetime.timedelta(days=k)).strftime('%d.%m.%Y'),
+             'hutStatus': 'CLOSED' if k % 7 == 6 else 'SERVICED',
+             'freeBedsPerCategory': {str(category_id): (k * category_id) % 40 for category_id in category_id_list}}
+            for k in range(number_days)]
+    return json.dumps(days).encode(), category_id_list, room_label_list
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parsing of the hut availability data.")
+    parser.add_argument('-n', '--huts', type=int, default=500, help="number of parsed huts")
+    parser.add_argument('-d', '--days', type=int, default=180, help="number of days of the season")
+    parser.add_argument('-c', '--categories', type=int, default=4, help="number of bed categories of each hut")
+    args = parser.parse_args()
+
+    config.load()
+    web_request.configure()
+    payload, category_id_list, room_label_list = _synthetic_availability(args.days, args.categories)
+
+    start = time.perf_counter()
+    for _ in range(args.huts):
+        hut_availability_json = web_request._json_loads(payload)
+    decode_time = (time.perf_counter() - start) / args.huts
+
+    start = time.perf_counter()
+    for _ in range(args.huts):
+        web_request._parse_date.cache_clear()
+        web_request._parse_hut_availability_json(hut_availability_json, category_id_list, room_label_list)
+    cold_time = (time.perf_counter() - start) / args.huts
+
+    start = time.perf_counter()
+    for _ in range(args.huts):
+        web_request._parse_hut_availability_json(hut_availability_json, category_id_list, room_label_list)
+    warm_time = (time.perf_counter() - start) / args.huts
+
+    print(f"JSON decoder: {'orjson' if web_request.orjson is not None else 'json'}")
+    print(f"Payload: {len(payload)} bytes ({args.days} days, {args.categories} bed categories)")
+    print(f"Decoding:                    {decode_time * 1e6:8.1f} us/hut")
+    print(f"Parsing (empty date cache):  {cold_time * 1e6:8.1f} us/hut")
+    print(f"Parsing (warm date cache):   {warm_time * 1e6:8.1f} us/hut")
+
+
+if __name__ == '__main__':
+    main()
@@ -24,6 +24,7 @@ The following data files are used by the application:
         /strings.txt            All strings used within the GUI [in different languages]
         /preferences.yaml       Temporary preferences, updated on application exit
         /results.yaml           Cached huts places results
+        /hut_info.json          Cached huts information (room categories and labels)
     /fonts
         /GidoleFont
             /Gidole-Regular.ttf Font used in the map
@@ -110,7 +111,9 @@ else:
 # Start the app main loop
 prettysusi.app.run()
 
-# On exit, save the preferences and the results dictionary
+huts_model.stop_background_refresh()
+
+# On exit, save the preferences, the results dictionary and the cached hut information
 _, all_selected = huts_model.get_selected()
 reference_location = huts_model.get_reference_location()
 preferences = {
@@ -127,3 +130,8 @@ results = {
     config.RESULTS_DICTIONARY_STRING: results_dictionary
 }
 config.save_results(results)
+
+hut_info = {
+    config.HUT_INFO_DICTIONARY_STRING: web_request.get_hut_info_cache()
+}
+config.save_hut_info(hut_info)
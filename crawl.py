@@ -0,0 +1,278 @@
+"""
+Headless batch retrieval of the free places in the huts, e.g. for scheduled executions on a server.
+
+No GUI library is used: the results are written to the cached results file, which is loaded by the application
+at the next start, and the throughput statistics are printed at the end of the retrieval.
+
+Run with:
+python crawl.py [-r REGION] [-m MOUNTAIN_RANGE] [-b LAT_MIN LAT_MAX LON_MIN LON_MAX] [-i ID [ID ...]] [-f]
+                [-w WORKERS] [-q QUEUE [-j]] [--rate RATE] [--batch BATCH] [--metrics FILE]
+
+Options:
+-r (--region): retrieves only the huts in the region (as written in huts.txt)
+-m (--mountain-range): retrieves only the huts in the mountain range (as written in huts.txt)
+-b (--bbox): retrieves only the huts inside the geographical window [degrees]
+-i (--ids): retrieves only the huts with the specified id numbers
+-f (--force): retrieves also the huts whose cached results are still fresh
+--metrics: writes the performance metrics of the web requests of this process to the file (Prometheus text format)
+
+When more options are specified, only the huts fulfilling all of them are retrieved; with no option, all huts are
+retrieved.
+
+Sharded crawl options:
+-w (--workers): number of worker processes sharing the retrieval
+-q (--queue): SQLite file of the queue of huts shared by the worker processes (a temporary file if not specified)
+-j (--join): joins the crawl of an existing queue file, e.g. from another machine sharing the file, without adding
+             huts to it (the hut selection options are ignored)
+--rate: aggregate request rate of all the worker processes, on all the machines [requests per second]
+--batch: number of huts claimed at once by a worker process
+
+With more than one worker process or with a queue file, the huts are retrieved by worker processes claiming batches
+of huts from the queue; all the web requests of all the processes share the request budget stored in the queue.
+At the end, all the results in the queue are merged in the cached results file of this machine.
+"""
+import argparse
+import datetime
+import multiprocessing
+import multiprocessing.connection
+import os
+import pathlib
+import socket
+import tempfile
+import time
+from threading import Event
+
+from src import config
+
+_DEFAULT_SHARED_RATE = 1.0  # requests per second
+_DEFAULT_BATCH = 10  # huts claimed at once by a worker process
+_PROGRESS_INTERVAL = 10.0  # seconds
+
+
+def _parse_arguments():
+    parser = argparse.ArgumentParser(description="Retrieve the available beds in mountain huts without GUI.")
+    parser.add_argument('-r', '--region', type=str,
+                        help="Region of the huts")
+    parser.add_argument('-m', '--mountain-range', type=str,
+                        help="Mountain range of the huts")
+    parser.add_argument('-b', '--bbox', type=float, nargs=4, metavar=('LAT_MIN', 'LAT_MAX', 'LON_MIN', 'LON_MAX'),
+                        help="Geographical window containing the huts [degrees]")
+    parser.add_argument('-i', '--ids', type=int, nargs='+',
+                        help="Id numbers of the huts")
+    parser.add_argument('-f', '--force', action='store_true',
+                        help="Retrieve also the huts whose results are still fresh")
+    parser.add_argument('--metrics', type=str,
+                        help="File of the performance metrics of the web requests (Prometheus text format)")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="Number of worker processes")
+    parser.add_argument('-q', '--queue', type=str,
+                        help="SQLite file of the queue shared by the worker processes")
+    parser.add_argument('-j', '--join', action='store_true',
+                        help="Join the crawl of an existing queue file")
+    parser.add_argument('--rate', type=float,
+                        help="Aggregate request rate of all the worker processes [requests per second]")
+    parser.add_argument('--batch', type=int, default=_DEFAULT_BATCH,
+                        help="Number of huts claimed at once by a worker process")
+    args = parser.parse_args()
+    if args.join and args.queue is None:
+        parser.error("the queue file is required to join a crawl")
+    if args.rate is not None and args.rate <= 0:
+        parser.error("the request rate must be positive")
+    return args
+
+
+def _select_huts(huts_model, args):
+    """Select the huts to be retrieved according to the command line options.
+
+    :param huts_model: the model
+    :param args: the command line arguments
+    :return: list of the huts indexes
+    """
+    if args.region is not None:
+        huts_model.filter_displayed_by('region', {'value': args.region})
+    if args.mountain_range is not None:
+        huts_model.filter_displayed_by('mountain_range', {'value': args.mountain_range})
+    indexes = huts_model.get_displayed_selected_huts()['displayed']
+    if args.bbox is not None:
+        indexes = [index for index in indexes if huts_model.check_in_window(index, *args.bbox)]
+    if args.ids is not None:
+        ids = set(args.ids)
+        indexes = [index for index in indexes if index in ids]
+    return indexes
+
+
+def _crawl(huts_model, web_request, indexes, force):
+    """Retrieve the huts in this process, waiting for the end of the retrieval.
+
+    :param huts_model: the model
+    :param web_request: the web_request module
+    :param indexes: list of the huts indexes
+    :param force: flag defining if also the huts whose results are still fresh are retrieved
+    :return: the number of requested huts
+    """
+    retrieve_completed = Event()
+    requested = 0
+
+    def on_start(_cancel_function, outstanding, skipped):
+        nonlocal requested
+        requested = outstanding
+        print(f"Retrieving {outstanding} huts ({skipped} skipped, results still fresh)")
+
+    def on_progress(outstanding):
+        if outstanding > 0 and outstanding % 25 == 0:
+            print(f"{outstanding} huts outstanding ({web_request.get_current_rate():.1f} requests/s)")
+
+    huts_model.update_results_for_indexes(indexes, on_start, on_progress, retrieve_completed.set, force=force)
+    retrieve_completed.wait()
+    return requested
+
+
+def _crawl_sharded(huts_model, web_request, indexes, args):
+    """Retrieve the huts with worker processes sharing a queue, merging the results of the queue in the model.
+
+    :param huts_model: the model
+    :param web_request: the web_request module
+    :param indexes: list of the huts indexes (ignored when joining an existing queue)
+    :param args: the command line arguments
+    :return: list of the indexes of the huts whose results have been merged from the queue
+    """
+    from src.crawl_queue import CrawlQueue
+
+    temporary_folder = None
+    if args.queue is None:
+        temporary_folder = tempfile.TemporaryDirectory()
+        queue_path = pathlib.Path(temporary_folder.name) / 'crawl.sqlite'
+    else:
+        queue_path = pathlib.Path(args.queue)
+
+    if args.join:
+        queue = CrawlQueue(queue_path)
+    else:
+        rate = args.rate
+        if rate is None:
+            rate = config.REQUEST_RATE or _DEFAULT_SHARED_RATE
+        queue = CrawlQueue(queue_path, rate)
+        to_retrieve, skipped = huts_model.split_fresh(indexes, args.force)
+        queue.add_huts(to_retrieve)
+        print(f"Queued {len(to_retrieve)} huts ({skipped} skipped, results still fresh)")
+
+    # The worker processes are spawned, so that they do not inherit the connections of this process
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_run_worker, args=(str(queue_path), args.batch))
+               for _ in range(max(1, args.workers))]
+    for worker in workers:
+        worker.start()
+    running = workers
+    while running:
+        multiprocessing.connection.wait([worker.sentinel for worker in running], _PROGRESS_INTERVAL)
+        running = [worker for worker in running if worker.is_alive()]
+        progress = queue.get_progress()
+        print(f"{progress['pending'] + progress['claimed']} huts outstanding, {progress['done']} done")
+
+    results = queue.get_results()
+    huts_model.merge_results(results)
+    hut_info = web_request.get_hut_info_cache()
+    hut_info.update(queue.get_hut_info())
+    queue.close()
+    if temporary_folder is not None:
+        temporary_folder.cleanup()
+
+    config.save_hut_info({config.HUT_INFO_DICTIONARY_STRING: hut_info})
+    return list(results)
+
+
+def _run_worker(queue_path, batch):
+    """Retrieve the huts claimed from the queue until the queue is empty (target of the worker processes).
+
+    :param queue_path: path of the SQLite file of the queue
+    :param batch: number of huts claimed at once
+    """
+    config.load()
+
+    from src import model, i18n, web_request
+    from src.crawl_queue import CrawlQueue
+
+    i18n.configure()
+    web_request.configure()
+    huts_model = model.HutsModel()
+    queue = CrawlQueue(queue_path)
+    web_request.set_shared_budget(queue.acquire_request)
+    worker_name = f"{socket.gethostname()}:{os.getpid()}"
+
+    while True:
+        indexes = queue.claim(worker_name, batch)
+        if not indexes:
+            break
+        huts = huts_model.get_huts_dictionary(indexes)
+        results = web_request.perform_web_requests_for_huts(huts)
+        for index in indexes:
+            if index not in huts:
+                results[index] = {'warning': None, 'error': 'Error occurred: unknown hut',
+                                  'hut_status': {}, 'places': {}, 'request_time': datetime.datetime.now()}
+        hut_info = web_request.get_hut_info_cache()
+        queue.complete(results, {index: hut_info[index] for index in results if index in hut_info})
+    queue.close()
+
+
+def main():
+    args = _parse_arguments()
+
+    config.load()
+
+    from src import model, i18n, web_request
+
+    i18n.configure()
+
+    web_request.configure()
+
+    huts_model = model.HutsModel()
+
+    indexes = [] if args.join else _select_huts(huts_model, args)
+
+    start_time = time.monotonic()
+    sharded = args.workers > 1 or args.queue is not None
+    if sharded:
+        indexes = _crawl_sharded(huts_model, web_request, indexes, args)
+        requested = len(indexes)
+    else:
+        requested = _crawl(huts_model, web_request, indexes, args.force)
+    elapsed_time = time.monotonic() - start_time
+
+    # Save the results and the hut information
+    results = {
+        config.RESULTS_DICTIONARY_STRING: huts_model.get_results_dictionary()
+    }
+    config.save_results(results)
+
+    if not sharded:
+        hut_info = {
+            config.HUT_INFO_DICTIONARY_STRING: web_request.get_hut_info_cache()
+        }
+        config.save_hut_info(hut_info)
+
+    # Print the throughput statistics
+    results_dictionary = huts_model.get_results_dictionary()
+    failed = sum(1 for index in indexes
+                 if index in results_dictionary and results_dictionary[index]['error'] is not None)
+    print(f"Huts retrieved: {requested - failed} ({failed} failed) in {elapsed_time:.1f} s"
+          f" - {requested / elapsed_time if elapsed_time > 0 else 0.:.2f} huts/s")
+    if not sharded:
+        connection_statistics = web_request.get_connection_statistics()
+        print(f"Web requests: {connection_statistics['requests']}"
+              f" - {connection_statistics['requests'] / elapsed_time if elapsed_time > 0 else 0.:.2f} requests/s")
+        print(f"Connections: {connection_statistics['new_connections']} new,"
+              f" {connection_statistics['reused_connections']} reused")
+        print(f"Coalesced requests (hut already in flight): {connection_statistics['coalesced_requests']}")
+    print(f"Avoided requests (results still fresh): {huts_model.avoided_requests}")
+    for error_registry in (config.errors, web_request.errors, huts_model.errors):
+        for error in error_registry:
+            print(f"Error: {error['type']} - {error['message']} ({error['count']} times)")
+
+    if args.metrics is not None:
+        from src import metrics
+        with open(args.metrics, 'w', encoding='UTF-8') as metrics_file:
+            metrics_file.write(metrics.export_prometheus())
+
+
+if __name__ == '__main__':
+    main()
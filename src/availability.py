@@ -0,0 +1,164 @@
+"""
+Dense store of the retrieved availability of the huts, for vectorised reductions over all the huts.
+
+Constants:
+    NO_DATA, SERVICED, UNSERVICED, CLOSED: codes of the status of a hut in a date
+
+Classes:
+    AvailabilityTensor: availability of the huts held in NumPy arrays indexed by hut, date and room type
+"""
+from threading import Lock
+
+import numpy as np
+
+NO_DATA = 0
+SERVICED = 1
+UNSERVICED = 2
+CLOSED = 3
+
+_STATUS_CODES = {'UNSERVICED': UNSERVICED, 'CLOSED': CLOSED}
+_NOT_OFFERED = -1  # places of a room type not offered by a hut in a date
+_INITIAL_DAYS = 16
+
+
+class AvailabilityTensor:
+    """
+    Availability of the huts held in NumPy arrays: the free places in an array [hut, day, room type],
+    the status of the huts in a parallel array [hut, day] and the response flags in arrays [hut].
+
+    The rows of the huts are those of the huts catalogue (i.e. the sorted hut indexes); the columns of the days
+    are assigned to the dates as they appear in the results. The room types are those of the model, followed by
+    a column summing any other room type, so that the totals of the free places include all the rooms.
+    The store is updated from the results dictionary of each hut, which remains the reference copy of the results.
+
+    Methods:
+        rebuild: recreate the store for the huts of a catalogue from a results dictionary
+        update: update the store with the results of a hut
+        clear: remove all the results from the store
+        summarise: compute the availability of all the huts for the specified dates
+    """
+
+    def __init__(self, ids, room_types):
+        """Create an empty store.
+
+        :param ids: sorted array of the hut indexes (the rows of the store)
+        :param room_types: list of the room types (the columns of the room types of the store)
+        """
+        self._room_types = list(room_types)
+        self._room_column = {room: column for column, room in enumerate(self._room_types)}
+        self._lock = Lock()
+        self._allocate(ids)
+
+    def rebuild(self, ids, results_dictionary):
+        """Recreate the store for the huts of a catalogue from a results dictionary.
+
+        :param ids: sorted array of the hut indexes (the rows of the store)
+        :param results_dictionary: the dictionary containing the information about free places, with hut index as key
+        """
+        with self._lock:
+            self._allocate(ids)
+        for index, result in list(results_dictionary.items()):
+            self.update(index, result)
+
+    def update(self, index, result):
+        """Update the store with the results of a hut, replacing the previous ones (huts not in the store are ignored).
+
+        :param index: the index of the hut
+        :param result: the dictionary of the results of the hut (as in the results dictionary)
+        """
+        with self._lock:
+            row = np.searchsorted(self._ids, index)
+            if row == len(self._ids) or self._ids[row] != index:
+                return
+            self._has_result[row] = True
+            self._response[row] = result['error'] is None
+            self._status[row] = NO_DATA
+            self._places[row] = _NOT_OFFERED
+            other_column = len(self._room_types)
+            for date, rooms in result['places'].items():
+                column = self._get_date_column(date)
+                self._status[row, column] = _STATUS_CODES.get(result['hut_status'].get(date), SERVICED)
+                for room, places in rooms.items():
+                    room_column = self._room_column.get(room, other_column)
+                    self._places[row, column, room_column] = max(self._places[row, column, room_column], 0) + places
+
+    def clear(self):
+        """Remove all the results from the store."""
+        with self._lock:
+            self._allocate(self._ids)
+
+    def summarise(self, dates, rows=None):
+        """Compute the availability of all the huts (or of the huts in the specified rows) for the specified dates.
+
+        The returned dictionary contains the following arrays, with a row for each hut:
+            has_result: flag defining if a result has been retrieved for the hut
+            response: flag defining if no error occurred in the retrieval (True if no result has been retrieved)
+            data_requested: flag defining if the results contain all the dates
+            open: flag defining if the hut is open in all the dates
+            serviced: flag defining if the hut is serviced in all the dates
+            status: the status code of the hut in each date [hut, date]
+            places_for_date: the free places in each date, 0 if not retrieved or in case of error [hut, date]
+            available: the minimum of the free places over the dates
+            places_for_room: the minimum over the dates of the free places of each room type of the model,
+                             -1 if the room type is not offered or the hut has not all the dates [hut, room type]
+
+        :param dates: list of the dates
+        :param rows: array of the rows of the huts; if not provided, all the huts are considered
+        :return: dictionary of the arrays
+        """
+        with self._lock:
+            if rows is None:
+                rows = np.arange(len(self._ids))
+            columns = [self._date_column.get(date) for date in dates]
+            n_huts = len(rows)
+            status = np.zeros((n_huts, len(dates)), dtype=np.int8)
+            places = np.full((n_huts, len(dates), len(self._room_types) + 1), _NOT_OFFERED, dtype=np.int32)
+            known = [position for position, column in enumerate(columns) if column is not None]
+            if known:
+                known_columns = np.array([columns[position] for position in known])
+                status[:, known] = self._status[rows[:, np.newaxis], known_columns]
+                places[:, known] = self._places[rows[:, np.newaxis], known_columns]
+            has_result = self._has_result[rows]
+            response = self._response[rows]
+
+        valid = has_result & response
+        data_requested = has_result & np.all(status != NO_DATA, axis=1)
+        is_open = valid & data_requested & ~np.any(status == CLOSED, axis=1)
+        is_serviced = valid & data_requested & ~np.any(status == UNSERVICED, axis=1)
+        places_for_date = np.where(valid[:, np.newaxis], np.maximum(places, 0).sum(axis=2), 0)
+        available = places_for_date.min(axis=1) if len(dates) > 0 else np.zeros(n_huts, dtype=np.int32)
+        offered = np.any(places[:, :, :-1] != _NOT_OFFERED, axis=1)
+        places_for_room = np.where(offered & (valid & data_requested)[:, np.newaxis],
+                                   np.maximum(places[:, :, :-1], 0).min(axis=1, initial=np.iinfo(np.int32).max),
+                                   _NOT_OFFERED)
+        return {'has_result': has_result, 'response': response, 'data_requested': data_requested,
+                'open': is_open, 'serviced': is_serviced, 'status': status, 'places_for_date': places_for_date,
+                'available': available, 'places_for_room': places_for_room}
+
+    def _allocate(self, ids):
+        """Allocate empty arrays for the specified huts.
+
+        :param ids: sorted array of the hut indexes
+        """
+        self._ids = np.asarray(ids, dtype=np.int64)
+        self._date_column = {}
+        self._has_result = np.zeros(len(self._ids), dtype=bool)
+        self._response = np.ones(len(self._ids), dtype=bool)
+        self._status = np.zeros((len(self._ids), _INITIAL_DAYS), dtype=np.int8)
+        self._places = np.full((len(self._ids), _INITIAL_DAYS, len(self._room_types) + 1), _NOT_OFFERED,
+                               dtype=np.int32)
+
+    def _get_date_column(self, date):
+        """Get the column of a date, assigning a new one (and enlarging the arrays if necessary) to a new date.
+
+        :param date: the date
+        :return: the column of the date
+        """
+        column = self._date_column.get(date)
+        if column is None:
+            column = self._date_column[date] = len(self._date_column)
+            days = self._status.shape[1]
+            if column >= days:
+                self._status = np.concatenate((self._status, np.zeros_like(self._status)), axis=1)
+                self._places = np.concatenate((self._places, np.full_like(self._places, _NOT_OFFERED)), axis=1)
+        return column
@@ -6,9 +6,10 @@ Constants:
     ASSETS_PATH_TILES: path of the tiles folder (containing the map tiles)
     ASSETS_PATH_ICONS: path of the icons folder (containing the icons for the map display)
     ASSETS_PATH_FONTS: path of the fonts folder (containing the font definitions)
+    ASSETS_PATH_CACHE: path of the cache folder (containing the cached web responses)
 
 Variables:
-    errors: list containing the errors detected in this module
+    errors: registry of the errors detected in this module
 
 Functions:
     __getattr__: retrieve a configuration or preferences parameter using dot notation
@@ -16,7 +17,13 @@ Functions:
     get: retrieve a configuration or preferences parameter
     save_preferences: save the preferences in the preferences files
     save_results: save the retrieved results in the results files
+    save_hut_info: save the cached hut information in the hut information file
     save_log: save a log file
+    save_metrics: save a file of performance metrics
+    convert_results_to_json: convert the results dictionary to its JSON format
+    convert_results_from_json: convert the results dictionary from its JSON format
+    convert_hut_info_to_json: convert the hut information dictionary to its JSON format
+    convert_hut_info_from_json: convert the hut information dictionary from its JSON format
 """
 import sys
 import os
@@ -25,25 +32,31 @@ import yaml
 import json
 import datetime
 
+from src.error_registry import ErrorRegistry
+
 _ASSETS_PATH = pathlib.Path(os.getcwd()) / 'assets'
 
 ASSETS_PATH_DATA = _ASSETS_PATH / 'data'
 ASSETS_PATH_TILES = _ASSETS_PATH / 'tiles'
 ASSETS_PATH_ICONS = _ASSETS_PATH / 'icons'
 ASSETS_PATH_FONTS = _ASSETS_PATH / 'fonts'
+ASSETS_PATH_CACHE = _ASSETS_PATH / 'cache'
 
 _CONFIG_FILE = ASSETS_PATH_DATA / 'config.yaml'
 _PREFERENCES_FILE = ASSETS_PATH_DATA / 'preferences.yaml'
 _RESULTS_FILE = ASSETS_PATH_DATA / 'results.json'
+_HUT_INFO_FILE = ASSETS_PATH_DATA / 'hut_info.json'
 
 _LOG_PATH = pathlib.Path(os.getcwd()) / 'log'
 _LOG_FILE = str(_LOG_PATH / 'chamannas_{0}_{1}.log')
+_METRICS_FILE = str(_LOG_PATH / 'chamannas_metrics_{0}.prom')
 
 _LOG_DATE_FORMAT = '%Y%m%d%H%M%S'
 _JSON_DATE_FORMAT = '%Y-%m-%d'
 _JSON_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
 
 RESULTS_DICTIONARY_STRING = 'RESULTS_DICTIONARY'
+HUT_INFO_DICTIONARY_STRING = 'HUT_INFO_DICTIONARY'
 LANGUAGE_STRING = 'LANGUAGE'
 REFERENCE_LOCATION_STRING = 'REFERENCE_LOCATION'
 SELECTED_STRING = 'SELECTED'
@@ -52,7 +65,7 @@ VIEW_STRING = 'VIEW'
 
 _config = {}
 _args = None
-errors = []
+errors = ErrorRegistry()
 
 
 def __getattr__(key):
@@ -65,7 +78,7 @@ def __getattr__(key):
 
 
 def load(args=None):
-    """Load the configuration, preferences and cached results files.
+    """Load the configuration, preferences, cached results and cached hut information files.
     
     param args: command line arguments to be added to the configuration data
     """
@@ -103,7 +116,7 @@ def load(args=None):
     try:
         with open(_RESULTS_FILE, encoding='UTF-8-SIG') as json_config_results_file:
             results_dict_from_json = json.load(json_config_results_file)
-            results_dict = _convert_results_dict_from_json(results_dict_from_json)
+            results_dict = convert_results_from_json(results_dict_from_json)
             _config.update(results_dict)
     except FileNotFoundError:
         errors.append({'type': 'Configuration Error',
@@ -111,6 +124,17 @@ def load(args=None):
     except (IOError, json.JSONDecodeError, TypeError) as e:
         errors.append({'type': type(e), 'message': str(e)})
 
+    # Load the cached hut information file
+    try:
+        with open(_HUT_INFO_FILE, encoding='UTF-8-SIG') as json_config_hut_info_file:
+            hut_info_dict_from_json = json.load(json_config_hut_info_file)
+            hut_info_dict = convert_hut_info_from_json(hut_info_dict_from_json)
+            _config.update(hut_info_dict)
+    except FileNotFoundError:
+        pass
+    except (IOError, json.JSONDecodeError, TypeError, KeyError, ValueError) as e:
+        errors.append({'type': type(e), 'message': str(e)})
+
     # Add the command line parameters to the configuration data if any is available
     # Save the command line parameters in the global _args variable to have them available in case of update
     if args is not None:
@@ -155,13 +179,26 @@ def save_results(results_dict):
     :param results_dict: dictionary containing the results
     """
     try:
-        results_dict_for_json = _convert_results_dict_to_json(results_dict)
+        results_dict_for_json = convert_results_to_json(results_dict)
         with open(_RESULTS_FILE, 'w', encoding='UTF-8') as json_config_save_file:
             json_config_save_file.write(json.dumps(results_dict_for_json, default=str))
     except (IOError, yaml.YAMLError) as e:
         errors.append({'type': type(e), 'message': str(e)})
 
 
+def save_hut_info(hut_info_dict):
+    """Save the cached hut information in the hut information file.
+
+    :param hut_info_dict: dictionary containing the cached hut information
+    """
+    try:
+        hut_info_dict_for_json = convert_hut_info_to_json(hut_info_dict)
+        with open(_HUT_INFO_FILE, 'w', encoding='UTF-8') as json_config_save_file:
+            json_config_save_file.write(json.dumps(hut_info_dict_for_json))
+    except IOError as e:
+        errors.append({'type': type(e), 'message': str(e)})
+
+
 def save_log(info_type, developer_info):
     """Save a log file.
 
@@ -181,7 +218,26 @@ def save_log(info_type, developer_info):
         errors.append({'type': type(e), 'message': str(e)})
 
 
-def _convert_results_dict_to_json(results_dict):
+def save_metrics(metrics_text):
+    """Save a file of performance metrics.
+
+    :param metrics_text: string containing the metrics in the Prometheus text format
+    """
+    _LOG_PATH.mkdir(exist_ok=True)
+    filename = _METRICS_FILE.format(datetime.datetime.now().strftime(_LOG_DATE_FORMAT))
+    try:
+        with open(filename, mode='w', encoding='UTF-8') as metrics_file:
+            metrics_file.write(metrics_text)
+    except IOError as e:
+        errors.append({'type': type(e), 'message': str(e)})
+
+
+def convert_results_to_json(results_dict):
+    """Convert the results dictionary to its JSON format (dates and times as strings).
+
+    :param results_dict: dictionary containing the results, under the RESULTS_DICTIONARY_STRING key
+    :return: the results dictionary in JSON format, under the RESULTS_DICTIONARY_STRING key
+    """
     results_dict = results_dict[RESULTS_DICTIONARY_STRING]
     to_json = {}
     for index in results_dict:
@@ -200,11 +256,11 @@ def _convert_results_dict_to_json(results_dict):
     return {RESULTS_DICTIONARY_STRING: to_json}
 
 
-def _convert_results_dict_from_json(from_json):
-    """
+def convert_results_from_json(from_json):
+    """Convert the results dictionary from its JSON format (hut indexes as integers, dates and times as objects).
 
-    :param from_json:
-    :return:
+    :param from_json: the results dictionary in JSON format, under the RESULTS_DICTIONARY_STRING key
+    :return: dictionary containing the results, under the RESULTS_DICTIONARY_STRING key
     """
     results_dict = {}
     from_json = from_json[RESULTS_DICTIONARY_STRING]
@@ -224,3 +280,33 @@ def _convert_results_dict_from_json(from_json):
             date = datetime.datetime.strptime(date_string, _JSON_DATE_FORMAT).date()
             results_dict[int_index]['places'][date] = from_json[index]['places'][date_string]
     return {RESULTS_DICTIONARY_STRING: results_dict}
+
+
+def convert_hut_info_to_json(hut_info_dict):
+    """Convert the hut information dictionary to its JSON format (times as strings).
+
+    :param hut_info_dict: dictionary containing the hut information, under the HUT_INFO_DICTIONARY_STRING key
+    :return: the hut information dictionary in JSON format, under the HUT_INFO_DICTIONARY_STRING key
+    """
+    hut_info_dict = hut_info_dict[HUT_INFO_DICTIONARY_STRING]
+    to_json = {}
+    for index, hut_info in hut_info_dict.items():
+        to_json[index] = hut_info.copy()
+        to_json[index]['request_time'] = hut_info['request_time'].strftime(_JSON_DATETIME_FORMAT)
+    return {HUT_INFO_DICTIONARY_STRING: to_json}
+
+
+def convert_hut_info_from_json(from_json):
+    """Convert the hut information dictionary from its JSON format (hut indexes as integers, times as objects).
+
+    :param from_json: the hut information dictionary in JSON format, under the HUT_INFO_DICTIONARY_STRING key
+    :return: dictionary containing the hut information, under the HUT_INFO_DICTIONARY_STRING key
+    """
+    hut_info_dict = {}
+    from_json = from_json[HUT_INFO_DICTIONARY_STRING]
+    for index, hut_info in from_json.items():
+        int_index = int(index)
+        hut_info_dict[int_index] = hut_info.copy()
+        hut_info_dict[int_index]['request_time'] = datetime.datetime.strptime(
+            hut_info['request_time'], _JSON_DATETIME_FORMAT)
+    return {HUT_INFO_DICTIONARY_STRING: hut_info_dict}
@@ -5,7 +5,6 @@ Classes:
     HutsController: controller of the application
 """
 import shutil
-import os
 import tempfile
 import tarfile
 
@@ -16,6 +15,7 @@ from src import i18n
 from src import map_tools
 from src import config
 from src import web_request
+from src import metrics
 
 
 class HutsController:
@@ -31,6 +31,7 @@ class HutsController:
         command_update_results: command the model to retrieve the free beds data and the view to update
         command_update_dates: command the model to update the reference dates interval and the view to update
         command_update_reference_location: command the model to update the reference location and the view to update
+        command_update_viewport: command the model to update the geographical window shown on the map
         command_language: command the i18n module to set a new current language
         command_open_hut_page: command the default browser to open the hut web page
         command_open_table_view: open a new table view
@@ -40,6 +41,7 @@ class HutsController:
         command_open_about_dialog: open the about dialog
         command_open_warnings_frame: open a developer info frame with information about warnings
         command_open_errors_frame: open a developer info frame with information about errors
+        command_open_metrics_frame: open a developer info frame with the performance metrics of the web requests
         command_search_for_updates: command the web_request module to search for application updates
         command_open_update_dialog: open a dialog for the application updates
         command_preference_gui: select a gui type in the preferences settings
@@ -58,6 +60,8 @@ class HutsController:
             self.command_open_map_view()
         else:
             self.command_open_table_view()
+        if config.BACKGROUND_REFRESH:
+            self._model.start_background_refresh(self._update_gui_for_hut)
 
     def command_sort(self, data):
         """Command the model to sort the huts and the view to update.
@@ -161,18 +165,24 @@ class HutsController:
             self._model.update_results_for_displayed(
                 self._show_waiting_message_huts,
                 self._update_waiting_message_huts,
-                self._update_gui_after_retrieve)
+                self._update_gui_after_retrieve,
+                self._update_gui_for_hut,
+                data.get('force', False))
         elif data['which'] == 'selected':
             self._model.update_results_for_selected(
                 self._show_waiting_message_huts,
                 self._update_waiting_message_huts,
-                self._update_gui_after_retrieve)
+                self._update_gui_after_retrieve,
+                self._update_gui_for_hut,
+                data.get('force', False))
         elif data['which'] == 'huts':
             self._model.update_results_for_indexes(
                 data['indexes'],
                 self._view.show_waiting_message_huts,
                 self._update_waiting_message_huts,
-                self._update_gui_after_retrieve)
+                self._update_gui_after_retrieve,
+                self._update_gui_for_hut,
+                data.get('force', True))
 
     def command_update_dates(self, data):
         """Command the model to update the reference dates interval and the view to update.
@@ -195,6 +205,13 @@ class HutsController:
             update_data.update(self._model.set_reference_location(data['lat'], data['lon']))
         self._view.update_gui(update_data)
 
+    def command_update_viewport(self, data):
+        """Command the model to update the geographical window shown on the map (used to prioritise the retrieval).
+
+        :param data: dictionary containing the details about the window shown on the map
+        """
+        self._model.set_viewport(*data['window'])
+
     def command_language(self, lang):
         """Command the i18n module to set a new current language.
 
@@ -299,6 +316,18 @@ class HutsController:
         self._add_to_developer_info(errors, view.errors, 'View')
         self._command_open_developer_frame(parent, errors, 'error')
 
+    def command_open_metrics_frame(self, parent):
+        """Open a developer info frame with the performance metrics of the web requests.
+
+        :param parent: the parent view of the developer info frame
+        """
+        metrics_info = [{'name': metric['name'],
+                         'type': metric['type'],
+                         'message': ', '.join(f"{key}: {'-' if value is None else f'{value:.4g}'}"
+                                              for key, value in metric['summary'].items())}
+                        for metric in metrics.get_summary()]
+        self._command_open_developer_frame(parent, metrics_info, 'metrics')
+
     def command_search_for_updates(self):
         """Command the web_request module to search for application updates."""
         if not self._model.is_retrieve_enabled():
@@ -340,11 +369,10 @@ class HutsController:
                     if filename in all_updates['data_files']:
                         shutil.copy(update_path, str(config.ASSETS_PATH_DATA / filename))
                     elif filename in all_updates['tiles']:
-                        dest_file = str(config.ASSETS_PATH_TILES / filename)
                         config.ASSETS_PATH_TILES.mkdir(parents=True, exist_ok=True)
-                        shutil.copy(update_path, dest_file)
-                        tarfile.open(dest_file).extractall(config.ASSETS_PATH_TILES)
-                        os.remove(dest_file)
+                        with tarfile.open(update_path) as tiles_archive:
+                            tiles_archive.extractall(config.ASSETS_PATH_TILES)
+                    web_request.confirm_update(update_path)
 
                 # Reload the configuration and data files and reconfigure the modules
                 config.load()
@@ -384,7 +412,7 @@ class HutsController:
 
         :param parent: the parent view of the developer info frame
         :param developer_info: developer info to be displayed
-        :param info_type: type of developer info (warnings or errors)
+        :param info_type: type of developer info (warning, error or metrics)
         """
         developer_frame = DeveloperInfoView(parent=parent, info_type=info_type)
         developer_frame.update_gui({'developer_info': developer_info,
@@ -400,10 +428,14 @@ class HutsController:
         :param info_string: string defining the source of the information
         """
         for index, view_error in enumerate(info_dict):
+            message = view_error['message']
+            if view_error.get('count', 1) > 1:
+                message = (f"{message} ({view_error['count']} times,"
+                           f" first {view_error['first_time']:%H:%M:%S}, last {view_error['last_time']:%H:%M:%S})")
             info_list.append({
                 'name': info_string + ' #' + str(index),
                 'type': view_error['type'],
-                'message': view_error['message']
+                'message': message
             })
 
     def _update_gui_after_retrieve(self):
@@ -418,6 +450,16 @@ class HutsController:
         update_data.update(self._model.get_all_data_after_retrieve())
         self._view.update_gui(update_data)
 
+    def _update_gui_for_hut(self, update_data):
+        """
+        Command the view to update the information about a single hut, as soon as its data have been retrieved.
+
+        This method executes in a secondary thread.
+
+        :param update_data: the dictionary of update data of the hut
+        """
+        self._view.update_gui(update_data)
+
     def _update_gui_after_updates(self, all_updates, update_cancelled):
         """
         Command the view to update after the search for updates is complete.
@@ -437,13 +479,14 @@ class HutsController:
         self._view.update_gui(update_data)
         self._view.update_gui(self._model.get_displayed_selected_huts())
 
-    def _show_waiting_message_huts(self, cancel_function, outstanding):
+    def _show_waiting_message_huts(self, cancel_function, outstanding, skipped=0):
         """Command the view to show the waiting message.
 
         :param cancel_function: the function to be executed if the user selects cancel
         :param outstanding: the number of outstanding huts for which data have to be retrieved
+        :param skipped: the number of huts skipped because their data are still fresh
         """
-        self._view.show_waiting_message_huts(cancel_function, outstanding)
+        self._view.show_waiting_message_huts(cancel_function, outstanding, skipped)
 
     def _update_waiting_message_huts(self, outstanding):
         """
@@ -454,7 +497,7 @@ class HutsController:
         :param outstanding: the number of outstanding huts for which data have to be retrieved
         """
         if outstanding > 0:
-            self._view.update_waiting_message_huts(outstanding)
+            self._view.update_waiting_message_huts(outstanding, web_request.get_current_rate())
         else:
             self._view.close_waiting_message()
 
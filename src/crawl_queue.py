@@ -0,0 +1,199 @@
+"""
+Queue of huts shared by the processes of a sharded crawl.
+
+Classes:
+    CrawlQueue: queue of huts, results and request budget stored in a SQLite file shared by the crawl processes
+"""
+import sqlite3
+import json
+import random
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+from src import config
+
+_DEFAULT_LEASE_TIME = 300.0  # seconds: time after which a batch claimed by a process can be claimed by another one
+_BUSY_TIMEOUT = 60.0  # seconds: maximum wait for the lock of the SQLite file
+_BUDGET_JITTER = 0.05  # seconds: maximum random delay added to the waits for the request budget
+
+# States of the huts in the queue
+_PENDING = 0
+_CLAIMED = 1
+_DONE = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS huts (hut_id INTEGER PRIMARY KEY, state INTEGER NOT NULL, worker TEXT,
+                                 claimed_time REAL);
+CREATE TABLE IF NOT EXISTS results (hut_id INTEGER PRIMARY KEY, result TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS hut_info (hut_id INTEGER PRIMARY KEY, info TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS budget (id INTEGER PRIMARY KEY CHECK (id = 0), rate REAL NOT NULL, capacity REAL NOT NULL,
+                                   tokens REAL NOT NULL, refill_time REAL NOT NULL);
+"""
+
+
+class CrawlQueue:
+    """
+    Queue of huts, results and request budget stored in a SQLite file shared by the processes of a sharded crawl.
+
+    The processes, running on one machine or on several machines sharing the file, claim batches of huts from
+    the queue and store the results (and the hut information) in it as soon as each batch is completed.
+    A batch not completed within the lease time (e.g. because its process has been stopped) is claimed again.
+    The results and the hut information are stored as JSON, in the same format of the cached results files.
+    Every web request of every process takes a token from a single token bucket stored in the file, so that the
+    aggregate request rate of all the processes respects the budget.
+
+    Methods:
+        add_huts: add huts to the queue
+        claim: claim a batch of pending huts
+        complete: store the results of a batch of huts, marking them as done
+        acquire_request: wait until a web request can be performed within the shared budget
+        get_progress: get the number of pending, claimed and done huts
+        get_results: get the results stored in the queue
+        get_hut_info: get the hut information stored in the queue
+        close: close the connection to the SQLite file
+    """
+
+    def __init__(self, path, rate=None, capacity=None, lease_time=_DEFAULT_LEASE_TIME):
+        """Open the queue, creating the SQLite file if it does not exist.
+
+        :param path: path of the SQLite file
+        :param rate: aggregate request rate of all the processes [requests per second]; if None, the budget
+                     already stored in the file is used
+        :param capacity: maximum burst of requests of all the processes (if None, equal to the rate)
+        :param lease_time: time after which a batch claimed by a process can be claimed by another one [seconds]
+        """
+        self._lease_time = lease_time
+        self._lock = Lock()
+        # The default rollback journal is kept (no WAL mode), since the WAL mode does not work
+        # on the network filesystems through which the file is shared between machines
+        self._connection = sqlite3.connect(str(path), timeout=_BUSY_TIMEOUT, isolation_level=None,
+                                           check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        if rate is not None:
+            capacity = max(1.0, rate if capacity is None else capacity)
+            with self._transaction() as cursor:
+                cursor.execute("INSERT OR REPLACE INTO budget VALUES (0, ?, ?, ?, ?)",
+                               (rate, capacity, capacity, time.time()))
+
+    def add_huts(self, indexes):
+        """Add huts to the queue; the huts already in the queue are left unchanged.
+
+        :param indexes: list of huts indexes
+        """
+        with self._transaction() as cursor:
+            cursor.executemany("INSERT OR IGNORE INTO huts (hut_id, state) VALUES (?, ?)",
+                               [(index, _PENDING) for index in indexes])
+
+    def claim(self, worker, count):
+        """Claim a batch of pending huts (including the claimed huts whose lease has expired).
+
+        :param worker: name of the claiming process
+        :param count: maximum number of huts in the batch
+        :return: list of the claimed huts indexes (empty if no hut is pending)
+        """
+        now = time.time()
+        with self._transaction() as cursor:
+            rows = cursor.execute("SELECT hut_id FROM huts WHERE state = ? OR (state = ? AND claimed_time < ?) "
+                                  "ORDER BY hut_id LIMIT ?",
+                                  (_PENDING, _CLAIMED, now - self._lease_time, count)).fetchall()
+            indexes = [row[0] for row in rows]
+            cursor.executemany("UPDATE huts SET state = ?, worker = ?, claimed_time = ? WHERE hut_id = ?",
+                               [(_CLAIMED, worker, now, index) for index in indexes])
+        return indexes
+
+    def complete(self, results, hut_info=None):
+        """Store the results of a batch of huts, marking them as done (skipped huts are marked as done without results).
+
+        :param results: dictionary containing the retrieved information about free beds, with hut index as key
+        :param hut_info: dictionary of hut information retrieved with the results, with hut index as key
+        """
+        retrieved = {index: result for index, result in results.items() if not result.get('skipped')}
+        with self._transaction() as cursor:
+            results_json = config.convert_results_to_json({config.RESULTS_DICTIONARY_STRING: retrieved})
+            cursor.executemany("INSERT OR REPLACE INTO results VALUES (?, ?)",
+                               [(index, json.dumps(result, default=str))
+                                for index, result in results_json[config.RESULTS_DICTIONARY_STRING].items()])
+            if hut_info:
+                hut_info_json = config.convert_hut_info_to_json({config.HUT_INFO_DICTIONARY_STRING: hut_info})
+                cursor.executemany("INSERT OR REPLACE INTO hut_info VALUES (?, ?)",
+                                   [(index, json.dumps(info))
+                                    for index, info in hut_info_json[config.HUT_INFO_DICTIONARY_STRING].items()])
+            cursor.executemany("UPDATE huts SET state = ? WHERE hut_id = ?",
+                               [(_DONE, index) for index in results])
+
+    def acquire_request(self, cancellation=None):
+        """Wait until a web request can be performed within the request budget shared by all the processes.
+
+        :param cancellation: the web_request.Cancellation of the request, interrupting the wait when cancelled
+                             (None if the request cannot be cancelled)
+        :return: True if the web request can be performed, False if it has been cancelled while waiting
+        """
+        while True:
+            with self._transaction() as cursor:
+                row = cursor.execute("SELECT rate, capacity, tokens, refill_time FROM budget WHERE id = 0").fetchone()
+                if row is None:
+                    return True
+                rate, capacity, tokens, refill_time = row
+                now = time.time()
+                tokens = min(capacity, tokens + max(0.0, now - refill_time) * rate)
+                if tokens >= 1.0:
+                    cursor.execute("UPDATE budget SET tokens = ?, refill_time = ? WHERE id = 0", (tokens - 1.0, now))
+                    return True
+                cursor.execute("UPDATE budget SET tokens = ?, refill_time = ? WHERE id = 0", (tokens, now))
+            delay = (1.0 - tokens) / rate + random.uniform(0, _BUDGET_JITTER)
+            if cancellation is None:
+                time.sleep(delay)
+            elif cancellation.sleep(delay):
+                return False
+
+    def get_progress(self):
+        """Get the number of pending, claimed and done huts.
+
+        :return: dictionary with the number of huts in each state
+        """
+        with self._lock:
+            rows = self._connection.execute("SELECT state, COUNT(*) FROM huts GROUP BY state").fetchall()
+        counts = dict(rows)
+        return {'pending': counts.get(_PENDING, 0), 'claimed': counts.get(_CLAIMED, 0), 'done': counts.get(_DONE, 0)}
+
+    def get_results(self):
+        """Get the results stored in the queue.
+
+        :return: dictionary containing the retrieved information about free beds, with hut index as key
+        """
+        with self._lock:
+            rows = self._connection.execute("SELECT hut_id, result FROM results").fetchall()
+        results_json = {config.RESULTS_DICTIONARY_STRING: {index: json.loads(result) for index, result in rows}}
+        return config.convert_results_from_json(results_json)[config.RESULTS_DICTIONARY_STRING]
+
+    def get_hut_info(self):
+        """Get the hut information stored in the queue.
+
+        :return: dictionary of hut information, with hut index as key
+        """
+        with self._lock:
+            rows = self._connection.execute("SELECT hut_id, info FROM hut_info").fetchall()
+        hut_info_json = {config.HUT_INFO_DICTIONARY_STRING: {index: json.loads(info) for index, info in rows}}
+        return config.convert_hut_info_from_json(hut_info_json)[config.HUT_INFO_DICTIONARY_STRING]
+
+    def close(self):
+        """Close the connection to the SQLite file."""
+        with self._lock:
+            self._connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Execute an immediate write transaction, committed on success and rolled back on errors.
+
+        :return: a cursor of the transaction
+        """
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
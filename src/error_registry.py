@@ -0,0 +1,84 @@
+"""
+Bounded registry of the errors detected by a module, aggregating repeated errors.
+
+Classes:
+    ErrorRegistry: bounded registry of errors, deduplicated by type and message
+"""
+import datetime
+from collections import OrderedDict
+from threading import Lock
+
+_DEFAULT_MAX_ENTRIES = 200  # maximum number of distinct errors kept by a registry
+_MAX_MESSAGE_LENGTH = 1000  # characters: longer messages are truncated
+
+
+class ErrorRegistry:
+    """
+    Bounded registry of errors, deduplicated by type and message.
+
+    The errors are added as dictionaries with 'type' and 'message' keys, as for a list; a repeated error only
+    updates the count and the last time of the registered one. When the registry is full, the error seen least
+    recently is discarded to make room for a new one.
+    Iterating over the registry provides, in order of first occurrence, a copy of each registered error with the
+    additional 'count', 'first_time' and 'last_time' keys.
+
+    Methods:
+        append: add an error to the registry
+        clear: remove all the errors from the registry
+    Properties:
+        dropped: the number of errors discarded because the registry was full
+    """
+
+    def __init__(self, max_entries=_DEFAULT_MAX_ENTRIES):
+        """Create an empty registry.
+
+        :param max_entries: maximum number of distinct errors kept by the registry
+        """
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._last_seen = OrderedDict()
+        self._dropped = 0
+        self._lock = Lock()
+
+    @property
+    def dropped(self):
+        return self._dropped
+
+    def append(self, error):
+        """Add an error to the registry.
+
+        :param error: dictionary with the 'type' and 'message' of the error
+        """
+        message = str(error['message'])
+        if len(message) > _MAX_MESSAGE_LENGTH:
+            message = message[:_MAX_MESSAGE_LENGTH] + '...'
+        key = (str(error['type']), message)
+        now = datetime.datetime.now()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self._max_entries:
+                    oldest_key, _ = self._last_seen.popitem(last=False)
+                    del self._entries[oldest_key]
+                    self._dropped += 1
+                entry = self._entries[key] = {'type': error['type'], 'message': message,
+                                              'count': 0, 'first_time': now, 'last_time': now}
+            entry['count'] += 1
+            entry['last_time'] = now
+            self._last_seen[key] = entry
+            self._last_seen.move_to_end(key)
+
+    def clear(self):
+        """Remove all the errors from the registry."""
+        with self._lock:
+            self._entries.clear()
+            self._last_seen.clear()
+            self._dropped = 0
+
+    def __iter__(self):
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        return iter(entries)
+
+    def __len__(self):
+        return len(self._entries)
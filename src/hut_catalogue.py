@@ -0,0 +1,210 @@
+"""
+Columnar store of the characteristics of the huts, for vectorised filtering and sorting.
+
+Classes:
+    HutCatalogue: columnar store of the characteristics of the huts, held in NumPy arrays
+"""
+import numpy as np
+
+from src.spherical_earth import distances
+
+_CATEGORICAL_COLUMNS = ('country', 'region', 'mountain_range')
+
+
+class HutCatalogue:
+    """
+    Columnar store of the characteristics of the huts, held in NumPy arrays (one row per hut, sorted by hut index).
+
+    The categorical columns (country, region and mountain range) are held as integer codes of the sorted list of
+    their distinct values; the names are held as their rank in alphabetical order.
+    The filters and the sorts take and return lists of hut indexes, as the model does.
+
+    Methods:
+        get_rows: get the rows of the catalogue of the specified huts
+        filter_equal: filter a list of huts keeping only those with the specified value in a column
+        filter_between: filter a list of huts keeping only those with the value of a column in an interval
+        filter_keys_between: filter a list of huts keeping only those with a key of their row in an interval
+        filter_equal_keys: filter a list of huts keeping only those with the specified key of their row
+        sort_by: sort a list of huts by the value of a column
+        sort_by_labels: sort a list of huts alphabetically by the labels of the values of a categorical column
+        sort_by_keys: sort a list of huts by a key of each row
+        get_distances: get the distances of all the huts from a location
+    Properties:
+        ids: array of the hut indexes
+        lat: array of the latitudes of the huts [degrees]
+        lon: array of the longitudes of the huts [degrees]
+        height: array of the heights of the huts [meters]
+        self_catering: array of the self-catering flags of the huts
+    """
+
+    def __init__(self, huts_dictionary):
+        """Create the catalogue from the huts dictionary.
+
+        :param huts_dictionary: dictionary of the characteristics of the huts, with hut index as key
+        """
+        ids = sorted(huts_dictionary)
+        huts = [huts_dictionary[index] for index in ids]
+        self._ids = np.array(ids, dtype=np.int64)
+        self._lat = np.array([hut['lat'] for hut in huts], dtype=np.float64)
+        self._lon = np.array([hut['lon'] for hut in huts], dtype=np.float64)
+        self._height = np.array([hut['height'] for hut in huts], dtype=np.float64)
+        self._self_catering = np.array([hut['self_catering'] for hut in huts], dtype=bool)
+        self._categories = {}
+        self._codes = {}
+        for column in _CATEGORICAL_COLUMNS:
+            values = np.array([hut[column] for hut in huts], dtype=str)
+            self._categories[column], self._codes[column] = self._encode(values)
+        _, self._name_rank = self._encode(np.array([hut['name'] for hut in huts], dtype=str))
+
+    @property
+    def ids(self):
+        return self._ids
+
+    @property
+    def lat(self):
+        return self._lat
+
+    @property
+    def lon(self):
+        return self._lon
+
+    @property
+    def height(self):
+        return self._height
+
+    @property
+    def self_catering(self):
+        return self._self_catering
+
+    def get_rows(self, indexes):
+        """Get the rows of the catalogue of the specified huts.
+
+        :param indexes: a list of hut indexes (all in the catalogue)
+        :return: array of the rows of the huts, in the order of the list
+        """
+        return np.searchsorted(self._ids, np.fromiter(indexes, dtype=np.int64, count=len(indexes)))
+
+    def filter_equal(self, indexes, column, value):
+        """Filter a list of huts keeping only those with the specified value in a column.
+
+        :param indexes: a list of hut indexes
+        :param column: the name of the column ('country', 'region', 'mountain_range' or 'self_catering')
+        :param value: the value to be used to filter
+        :return: the updated list of hut indexes
+        """
+        rows = self.get_rows(indexes)
+        if column in _CATEGORICAL_COLUMNS:
+            categories = self._categories[column]
+            code = np.searchsorted(categories, value)
+            if code == len(categories) or categories[code] != value:
+                return []
+            mask = self._codes[column][rows] == code
+        else:
+            mask = self._get_column(column)[rows] == value
+        return self._ids[rows[mask]].tolist()
+
+    def filter_between(self, indexes, column, minimum, maximum):
+        """Filter a list of huts keeping only those with the value of a column in an interval (bounds included).
+
+        :param indexes: a list of hut indexes
+        :param column: the name of the column (e.g. 'height')
+        :param minimum: the minimum value of the interval
+        :param maximum: the maximum value of the interval
+        :return: the updated list of hut indexes
+        """
+        return self.filter_keys_between(indexes, self._get_column(column), minimum, maximum)
+
+    def filter_keys_between(self, indexes, keys, minimum, maximum):
+        """Filter a list of huts keeping only those with a key of their row in an interval (bounds included).
+
+        :param indexes: a list of hut indexes
+        :param keys: array of the keys, one for each row of the catalogue
+        :param minimum: the minimum value of the interval
+        :param maximum: the maximum value of the interval
+        :return: the updated list of hut indexes
+        """
+        rows = self.get_rows(indexes)
+        values = keys[rows]
+        return self._ids[rows[(minimum <= values) & (values <= maximum)]].tolist()
+
+    def filter_equal_keys(self, indexes, keys, value):
+        """Filter a list of huts keeping only those with the specified key of their row.
+
+        :param indexes: a list of hut indexes
+        :param keys: array of the keys, one for each row of the catalogue
+        :param value: the value of the key to be used to filter
+        :return: the updated list of hut indexes
+        """
+        rows = self.get_rows(indexes)
+        return self._ids[rows[keys[rows] == value]].tolist()
+
+    def sort_by(self, indexes, column, ascending=True):
+        """Sort a list of huts by the value of a column (names and categorical values in alphabetical order).
+
+        :param indexes: a list of hut indexes
+        :param column: the name of the column
+        :param ascending: boolean which specifies the sorting direction (True: ascending; False: descending)
+        :return: the sorted list of hut indexes
+        """
+        if column == 'name':
+            keys = self._name_rank
+        elif column in _CATEGORICAL_COLUMNS:
+            keys = self._codes[column]
+        else:
+            keys = self._get_column(column)
+        return self.sort_by_keys(indexes, keys, ascending)
+
+    def sort_by_labels(self, indexes, column, labels, ascending=True):
+        """Sort a list of huts alphabetically (case-insensitive) by the labels of the values of a categorical column.
+
+        :param indexes: a list of hut indexes
+        :param column: the name of the categorical column
+        :param labels: dictionary of the labels, with the value of the column as key
+        :param ascending: boolean which specifies the sorting direction (True: ascending; False: descending)
+        :return: the sorted list of hut indexes
+        """
+        _, label_rank = self._encode(np.array([labels[value].casefold() for value in self._categories[column]],
+                                              dtype=str))
+        return self.sort_by_keys(indexes, label_rank[self._codes[column]], ascending)
+
+    def sort_by_keys(self, indexes, keys, ascending=True):
+        """Sort a list of huts by a key of each row; huts with equal keys keep their order.
+
+        :param indexes: a list of hut indexes
+        :param keys: array of the keys, one for each row of the catalogue
+        :param ascending: boolean which specifies the sorting direction (True: ascending; False: descending)
+        :return: the sorted list of hut indexes
+        """
+        rows = self.get_rows(indexes)
+        row_keys = keys[rows]
+        if not ascending:
+            row_keys = -row_keys.astype(np.float64)
+        return self._ids[rows[np.argsort(row_keys, kind='stable')]].tolist()
+
+    def get_distances(self, lat, lon):
+        """Get the distances of all the huts from a location.
+
+        :param lat: latitude of the location [degrees]
+        :param lon: longitude of the location [degrees]
+        :return: array of the distances, one for each row of the catalogue [meters]
+        """
+        return distances(lat, lon, self._lat, self._lon)
+
+    def _get_column(self, column):
+        """Get a numerical column.
+
+        :param column: the name of the column
+        :return: the array of the column
+        """
+        return {'height': self._height, 'self_catering': self._self_catering,
+                'lat': self._lat, 'lon': self._lon}[column]
+
+    @staticmethod
+    def _encode(values):
+        """Encode an array of strings as the codes of the sorted list of its distinct values.
+
+        :param values: array of strings
+        :return: tuple of the array of the distinct values and of the array of the codes
+        """
+        categories, codes = np.unique(values, return_inverse=True)
+        return categories, codes.astype(np.int32).reshape(-1)
@@ -5,7 +5,7 @@ Variables:
     all_strings: dictionary with all the strings appearing in the view
     mountain_ranges_labels: dictionary with all the names of mountain ranges
     regions_labels: dictionary with all the names of regions
-    errors: list containing the errors detected in this module
+    errors: registry of the errors detected in this module
 
 Functions:
     configure: load all internationalization-dependent strings and set the current active language
@@ -19,6 +19,7 @@ import csv
 import sys
 
 from src import config
+from src.error_registry import ErrorRegistry
 
 _MOUNTAIN_RANGES_DATA_FILE = str(config.ASSETS_PATH_DATA / 'mountain_ranges.txt')
 _REGIONS_DATA_FILE = str(config.ASSETS_PATH_DATA / 'regions.txt')
@@ -55,7 +56,7 @@ class _LanguageDict(dict):
 all_strings = _LanguageDict()
 mountain_ranges_labels = _LanguageDict()
 regions_labels = _LanguageDict()
-errors = []
+errors = ErrorRegistry()
 
 _configured = False
 _current_language = 0
@@ -2,7 +2,8 @@
 Creation of tiles-based maps.
 
 Variables:
-    errors: list containing the errors detected in this module
+    errors: registry of the errors detected in this module
+    missing_tiles: set of the missing tiles ('zoom_x_y' strings), replaced by empty tiles in the maps
 
 Functions:
     configure: configure the limit for the tile caching
@@ -21,10 +22,12 @@ import math
 from PIL import Image, ImageDraw, ImageFont
 from src.spherical_earth import distance, meters_to_degrees
 from src import config
+from src.error_registry import ErrorRegistry
 from src.config import ASSETS_PATH_TILES, ASSETS_PATH_ICONS, ASSETS_PATH_FONTS
 from src.model import HutStatus
 
-errors = []
+errors = ErrorRegistry()
+missing_tiles = set()
 
 # Definitions for the tiles
 _TILE_FILENAME = str(ASSETS_PATH_TILES / '{0}/{1}/{2}.png')
@@ -619,6 +622,7 @@ class _TilesCluster:
                       fill=_TilesCluster._TILES_STRING_COLOUR,
                       font=_TilesCluster._tiles_font)
             errors.append({'type': 'Missing tile', 'message': text})
+            missing_tiles.add(text)
 
         return tile
 
@@ -857,6 +861,7 @@ class NavigableMap(_GenericMap):
         get_map_image: get the map image from the tiles cluster with all symbols
         check_zoom: check if the provided position in pixel coordinates corresponds to the zoom widget
         update_huts_data: update the data about the huts to be displayed on the map
+        update_hut_status: update the status of a hut displayed on the map
         update_zoom_from_point: update the zoom level with new map center point and direction of the zoom level change
         update_zoom_from_widget: update the zoom level specifying the direction of the zoom level change
         update_zoom_from_window: update the zoom level specifying the geographical area to be covered
@@ -950,6 +955,15 @@ class NavigableMap(_GenericMap):
         self._compute_huts_pixel_positions()
         self._compute_huts_groups()
 
+    def update_hut_status(self, index, status):
+        """Update the status of a hut displayed on the map, without recomputing positions and groups.
+
+        :param index: hut index
+        :param status: hut status as a HutStatus enum
+        """
+        if index in self._huts_data:
+            self._huts_data[index]['status'] = status
+
     def update_zoom_from_point(self, lat, lon, direction):
         """Update the zoom level specifying the new map center point and the direction of the zoom level change.
 
@@ -0,0 +1,288 @@
+"""
+In-process registry of performance metrics (counters and histograms), exportable in the Prometheus text format.
+
+Variables:
+    TIME_BUCKETS: default upper bounds of the buckets of the histograms of times [seconds]
+    SIZE_BUCKETS: default upper bounds of the buckets of the histograms of sizes [bytes]
+
+Functions:
+    counter: get the counter with the specified name, registering it if necessary
+    histogram: get the histogram with the specified name, registering it if necessary
+    get_summary: get a summary of all the registered metrics
+    export_prometheus: get all the registered metrics in the Prometheus text format
+    reset: reset the values of all the registered metrics
+"""
+import bisect
+import math
+from threading import Lock
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+_registry = {}
+_registry_lock = Lock()
+
+
+class _Metric:
+    """
+    Metric with a name and a help text, holding a separate value for each combination of label values.
+
+    Methods:
+        get_values: get the values of the metric, for each combination of label values
+        reset: reset all the values of the metric
+    Properties:
+        name: the name of the metric
+        help: the help text of the metric
+        type: the Prometheus type of the metric
+    """
+
+    type = None
+
+    def __init__(self, name, help_text):
+        """Create the metric.
+
+        :param name: the name of the metric
+        :param help_text: the help text of the metric
+        """
+        self._name = name
+        self._help = help_text
+        self._values = {}
+        self._lock = Lock()
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def help(self):
+        return self._help
+
+    def get_values(self):
+        """Get the values of the metric, for each combination of label values.
+
+        :return: list of tuples of the labels (tuple of (name, value) tuples) and of a copy of the value
+        """
+        with self._lock:
+            return [(labels, self._copy(value)) for labels, value in sorted(self._values.items())]
+
+    def reset(self):
+        """Reset all the values of the metric."""
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def _copy(value):
+        """Copy a value of the metric.
+
+        :param value: the value
+        :return: the copy of the value
+        """
+        return value
+
+
+class _Counter(_Metric):
+    """
+    Counter, i.e. metric whose values can only increase.
+
+    Methods:
+        increment: increment the value of the counter
+    """
+
+    type = 'counter'
+
+    def increment(self, amount=1, **labels):
+        """Increment the value of the counter.
+
+        :param amount: the increment
+        :param labels: the values of the labels
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class _Histogram(_Metric):
+    """
+    Histogram, i.e. metric counting the observed values falling in each of a set of buckets.
+
+    Methods:
+        observe: add an observed value to the histogram
+    Properties:
+        buckets: the upper bounds of the buckets
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help_text, buckets):
+        """Create the histogram.
+
+        :param name: the name of the metric
+        :param help_text: the help text of the metric
+        :param buckets: the upper bounds of the buckets, in ascending order
+        """
+        super().__init__(name, help_text)
+        self._buckets = tuple(buckets)
+
+    @property
+    def buckets(self):
+        return self._buckets
+
+    def observe(self, value, **labels):
+        """Add an observed value to the histogram.
+
+        :param value: the observed value
+        :param labels: the values of the labels
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = {'counts': [0] * (len(self._buckets) + 1),
+                                                 'count': 0, 'sum': 0., 'max': value}
+            histogram['counts'][bisect.bisect_left(self._buckets, value)] += 1
+            histogram['count'] += 1
+            histogram['sum'] += value
+            histogram['max'] = max(histogram['max'], value)
+
+    def quantile(self, histogram, fraction):
+        """Estimate a quantile of the observed values, interpolating linearly inside the buckets.
+
+        :param histogram: a value of the histogram, as returned by get_values
+        :param fraction: the quantile as a fraction
+        :return: the estimated quantile, None if no value has been observed
+        """
+        if histogram['count'] == 0:
+            return None
+        rank = fraction * histogram['count']
+        cumulative = 0
+        for position, count in enumerate(histogram['counts']):
+            if count and cumulative + count >= rank:
+                lower = self._buckets[position - 1] if position > 0 else 0.
+                upper = self._buckets[position] if position < len(self._buckets) else histogram['max']
+                return min(histogram['max'], lower + (upper - lower) * (rank - cumulative) / count)
+            cumulative += count
+        return histogram['max']
+
+    @staticmethod
+    def _copy(value):
+        return dict(value, counts=list(value['counts']))
+
+
+def counter(name, help_text):
+    """Get the counter with the specified name, registering it if necessary.
+
+    :param name: the name of the counter (by convention, ending with '_total')
+    :param help_text: the help text of the counter
+    :return: the counter
+    """
+    return _register(name, lambda: _Counter(name, help_text))
+
+
+def histogram(name, help_text, buckets=TIME_BUCKETS):
+    """Get the histogram with the specified name, registering it if necessary.
+
+    :param name: the name of the histogram (by convention, ending with the unit, e.g. '_seconds')
+    :param help_text: the help text of the histogram
+    :param buckets: the upper bounds of the buckets, in ascending order
+    :return: the histogram
+    """
+    return _register(name, lambda: _Histogram(name, help_text, buckets))
+
+
+def get_summary():
+    """Get a summary of all the registered metrics.
+
+    The summary of a counter contains its value, the summary of a histogram contains the number of observed values,
+    their mean, the estimated 50th and 95th percentiles and their maximum.
+
+    :return: list of dictionaries with the name (including the labels), the type and the summary of each metric
+    """
+    summary = []
+    for metric in _get_metrics():
+        for labels, value in metric.get_values():
+            name = metric.name + _format_labels(labels)
+            if metric.type == 'counter':
+                summary.append({'name': name, 'type': metric.type, 'summary': {'value': value}})
+            else:
+                summary.append({'name': name, 'type': metric.type,
+                                'summary': {'count': value['count'],
+                                            'mean': value['sum'] / value['count'],
+                                            'p50': metric.quantile(value, 0.50),
+                                            'p95': metric.quantile(value, 0.95),
+                                            'max': value['max']}})
+    return summary
+
+
+def export_prometheus():
+    """Get all the registered metrics in the Prometheus text format.
+
+    :return: the string containing the metrics
+    """
+    lines = []
+    for metric in _get_metrics():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for labels, value in metric.get_values():
+            if metric.type == 'counter':
+                lines.append(f"{metric.name}{_format_labels(labels)} {_format_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (math.inf,), value['counts']):
+                cumulative += count
+                bucket_labels = labels + (('le', '+Inf' if bound == math.inf else _format_number(bound)),)
+                lines.append(f"{metric.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_number(value['sum'])}")
+            lines.append(f"{metric.name}_count{_format_labels(labels)} {value['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Reset the values of all the registered metrics."""
+    for metric in _get_metrics():
+        metric.reset()
+
+
+def _register(name, factory):
+    """Get the metric with the specified name, registering a new one if necessary.
+
+    :param name: the name of the metric
+    :param factory: function creating the metric (signature: () -> _Metric)
+    :return: the metric
+    """
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = factory()
+        return metric
+
+
+def _get_metrics():
+    """Get all the registered metrics, sorted by name.
+
+    :return: list of the metrics
+    """
+    with _registry_lock:
+        return [_registry[name] for name in sorted(_registry)]
+
+
+def _format_labels(labels):
+    """Format the labels of a metric value in the Prometheus text format.
+
+    :param labels: tuple of (name, value) tuples
+    :return: the formatted labels, an empty string if there are no labels
+    """
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_number(value):
+    """Format a number in the Prometheus text format.
+
+    :param value: the number
+    :return: the formatted number
+    """
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
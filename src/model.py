@@ -11,14 +11,19 @@ Classes:
 import sys
 import datetime
 import csv
-from threading import Thread
+from threading import Thread, Event, Lock
 from enum import Enum, auto
 
+import numpy as np
+
 from src import i18n
-from src.spherical_earth import distance
 from src import config
 from src.config import ASSETS_PATH_DATA
 from src import web_request
+from src.error_registry import ErrorRegistry
+from src.hut_catalogue import HutCatalogue
+from src import availability
+from src.availability import AvailabilityTensor
 
 
 ROOM_TYPES = ['single', 'double', 'shared', 'dormitory', 'special', 'unattended']
@@ -28,8 +33,8 @@ _DAY_DELTA = datetime.timedelta(days=1.0)
 _SKIP_CODE = 'SKIP'
 _DEFAULT_REFERENCE_LOCATION = (48.1, - 11.6)
 _DEFAULT_RESULTS_CACHE_EXPIRATION = 7
-_HUT_STATUS_CLOSED = 'CLOSED'
-_HUT_STATUS_UNSERVICED = 'UNSERVICED'
+_DEFAULT_RESULTS_FRESHNESS = 30  # minutes: age below which the results of a hut are not retrieved again
+_DEFAULT_BACKGROUND_REFRESH_BUDGET = 60  # huts per hour refreshed in background
 
 
 class HutStatus(Enum):
@@ -46,12 +51,13 @@ class HutsModel:
     """Model class which stores and manages all the information about the huts and the available beds.
 
     Attributes:
-        errors: list containing the errors triggered by the class
+        errors: registry of the errors triggered by the class
 
     Properties:
         request_dates: list of currently requested dates
         hut_errors: dictionary of errors detected during hut data retrieval
         hut_warnings: dictionary of warnings detected during hut data retrieval
+        avoided_requests: number of web requests avoided because the results were still fresh
 
     Methods:
         reload_huts_data: reload the huts dictionary after an update
@@ -60,6 +66,7 @@ class HutsModel:
         get_results_dictionary: get the dictionary containing the retrieved results about free places
         set_reference_location: set the reference location to the specified coordinates
         set_reference_location_from_hut: set the reference location to the location of a hut
+        set_viewport: set the geographical window currently shown on the map
         update_results_for_displayed: retrieve the result about free places for all the displayed huts
         update_results_for_selected: retrieve the result about free places for all the selected huts
         update_results_for_indexes: retrieve the result about free places for a group of huts
@@ -82,15 +89,27 @@ class HutsModel:
         get_all_data: get all the data relative to huts
         get_all_data_after_retrieve: get all the data which are affected by a data retrieval from web
         enable_retrieved: enable or disable the retrieval of data from the web
+        merge_results: merge results retrieved outside the model in the results
+        get_huts_dictionary: get the characteristics of the specified huts
+        split_fresh: get the huts whose results have to be retrieved, skipping those with fresh results
+        start_background_refresh: start refreshing in background the stalest results of selected and displayed huts
+        stop_background_refresh: stop the background refresh
         is_retrieved_enabled: get the current status of the retrieve enabled flag
     """
 
     def __init__(self):
         """Initialize the model."""
-        self.errors = []
+        self.errors = ErrorRegistry()
 
         self._retrieve_enabled = True
         self._results_cancelled = False
+        self._active_retrievals = set()
+        self._active_retrievals_lock = Lock()
+        self._results_lock = Lock()
+        self._avoided_requests = 0
+        self._background_refresh_stop = Event()
+        self._background_refresh_thread = None
+        self._background_cancellation = web_request.Cancellation()
         self._sort_displayed_key = None
         self._sort_displayed_ascending = True
         self._sort_selected_key = None
@@ -98,8 +117,12 @@ class HutsModel:
         self._request_date = datetime.datetime.now().date() + _DAY_DELTA
         self._number_days = 1
         self._reference_location = None
+        self._viewport = None
         self._huts_dictionary = {}
+        self._huts_catalogue = HutCatalogue({})
+        self._distances_from_ref = None
         self._results_dictionary = {}
+        self._availability = AvailabilityTensor(self._huts_catalogue.ids, ROOM_TYPES)
         self._displayed = []
         self._all_selected = []
         self._selected = []
@@ -152,7 +175,7 @@ class HutsModel:
         :return: the dictionary of errors detected during hut data retrieval
         """
         errors = []
-        for index, hut in self._results_dictionary.items():
+        for index, hut in list(self._results_dictionary.items()):
             if hut['error'] is not None:
                 hut_name = self._huts_dictionary[index]['name']
                 hut_error = {'message': hut['error'],
@@ -167,7 +190,7 @@ class HutsModel:
         :return: the dictionary of warnings detected during hut data retrieval
         """
         warnings = []
-        for index, hut in self._results_dictionary.items():
+        for index, hut in list(self._results_dictionary.items()):
             if hut['warning'] is not None:
                 hut_name = self._huts_dictionary[index]['name']
                 hut_warning = {'message': hut['warning'],
@@ -175,6 +198,14 @@ class HutsModel:
                 warnings.append(hut_warning)
         return warnings
 
+    @property
+    def avoided_requests(self):
+        """Return the number of web requests avoided because the results were still fresh.
+
+        :return: the number of web requests avoided since the start of the application
+        """
+        return self._avoided_requests
+
     def reload_huts_data(self):
         """Reload the huts dictionary after an update; the previous selections, filters and sorting are reapplied.
 
@@ -224,6 +255,8 @@ class HutsModel:
         """
         if -90. < lat_ref < 90. and -180. < lon_ref < 180.:
             self._reference_location = {'lat': lat_ref, 'lon': lon_ref}
+            self._distances_from_ref = None
+            web_request.reprioritise()
         self.sort_displayed()
         self.sort_selected()
         return {'displayed': self._get_displayed(),
@@ -231,6 +264,19 @@ class HutsModel:
                 'huts_data': self._huts_data_table,
                 'reference_location': self.get_reference_location()}
 
+    def set_viewport(self, lat_min, lat_max, lon_min, lon_max):
+        """Set the geographical window currently shown on the map, whose huts are retrieved with higher priority.
+
+        :param lat_min: the minimum latitude of the window [degrees]
+        :param lat_max: the maximum latitude of the window [degrees]
+        :param lon_min: the minimum longitude of the window [degrees]
+        :param lon_max: the maximum longitude of the window [degrees]
+        """
+        viewport = (lat_min, lat_max, lon_min, lon_max)
+        if viewport != self._viewport:
+            self._viewport = viewport
+            web_request.reprioritise()
+
     def set_reference_location_from_hut(self, hut_number):
         """Set the reference location to the location of a hut.
 
@@ -243,44 +289,63 @@ class HutsModel:
         else:
             return {}
 
-    def update_results_for_displayed(self, initial=None, observer=None, final_observer=None):
+    def update_results_for_displayed(self, initial=None, observer=None, final_observer=None, hut_observer=None,
+                                     force=False):
         """Retrieve the result about free places for all the displayed huts.
 
-        :param initial: function to be executed before starting the retrieve process (signature: (callable, int))
+        Unless a full refresh is forced, the huts whose results are still fresh are skipped.
+
+        :param initial: function to be executed before starting the retrieve process (signature: (callable, int, int))
         :param observer: function to be executed after each step of the retrieve process (signature: (int))
         :param final_observer: function to be executed at the end of the retrieve process (signature: ())
+        :param hut_observer: function to be executed with the view update data of each hut as soon as its result has
+                             been retrieved (signature: (dict))
+        :param force: if True, the results are retrieved for all the huts, even if still fresh
         """
         if self._request_date is not None and self._number_days is not None:
-            displayed = self._displayed.copy()
+            displayed, skipped = self._split_fresh(self._displayed, force)
             if initial is not None:
-                initial(self._cancel_results, len(displayed))
-            self._get_results_for_date(displayed, self._request_date, observer, final_observer)
+                initial(self._cancel_results, len(displayed), skipped)
+            self._get_results_for_date(displayed, self._request_date, observer, final_observer, hut_observer)
 
-    def update_results_for_selected(self, initial=None, observer=None, final_observer=None):
+    def update_results_for_selected(self, initial=None, observer=None, final_observer=None, hut_observer=None,
+                                    force=False):
         """Retrieve the result about free places for all the selected huts.
 
-        :param initial: function to be executed before starting the retrieve process (signature: (callable, int))
+        Unless a full refresh is forced, the huts whose results are still fresh are skipped.
+
+        :param initial: function to be executed before starting the retrieve process (signature: (callable, int, int))
         :param observer: function to be executed after each step of the retrieve process (signature: (int))
         :param final_observer: function to be executed at the end of the retrieve process (signature: ())
+        :param hut_observer: function to be executed with the view update data of each hut as soon as its result has
+                             been retrieved (signature: (dict))
+        :param force: if True, the results are retrieved for all the huts, even if still fresh
         """
         if self._request_date is not None and self._number_days is not None:
-            selected = self._selected.copy()
+            selected, skipped = self._split_fresh(self._selected, force)
             if initial is not None:
-                initial(self._cancel_results, len(selected))
-            self._get_results_for_date(selected, self._request_date, observer, final_observer)
+                initial(self._cancel_results, len(selected), skipped)
+            self._get_results_for_date(selected, self._request_date, observer, final_observer, hut_observer)
 
-    def update_results_for_indexes(self, request_indexes, initial=None, observer=None, final_observer=None):
+    def update_results_for_indexes(self, request_indexes, initial=None, observer=None, final_observer=None,
+                                   hut_observer=None, force=True):
         """Retrieve the result about free places for a group of huts defined by a list of indexes.
 
+        Unless a full refresh is forced, the huts whose results are still fresh are skipped.
+
         :param request_indexes: the list of indexes of the huts for which free places have to be retrieved
-        :param initial: function to be executed before starting the retrieve process (signature: (callable, int))
+        :param initial: function to be executed before starting the retrieve process (signature: (callable, int, int))
         :param observer: function to be executed after each step of the retrieve process (signature: (int))
         :param final_observer: function to be executed at the end of the retrieve process (signature: ())
+        :param hut_observer: function to be executed with the view update data of each hut as soon as its result has
+                             been retrieved (signature: (dict))
+        :param force: if True, the results are retrieved for all the huts, even if still fresh
         """
         if self._request_date is not None and self._number_days is not None:
+            request_indexes, skipped = self._split_fresh(request_indexes, force)
             if initial is not None:
-                initial(self._cancel_results, len(request_indexes))
-            self._get_results_for_date(request_indexes, self._request_date, observer, final_observer)
+                initial(self._cancel_results, len(request_indexes), skipped)
+            self._get_results_for_date(request_indexes, self._request_date, observer, final_observer, hut_observer)
 
     def update_dates(self, request_date, number_days):
         """Update the request dates, based on the selected first day and the number of days.
@@ -314,6 +379,7 @@ class HutsModel:
         """
         self._all_selected.clear()
         self._selected.clear()
+        web_request.reprioritise()
         return {'selected': self.get_selected()}
 
     def filter_displayed_by(self, key, parameters):
@@ -402,6 +468,7 @@ class HutsModel:
         """
         if index in self._huts_dictionary.keys() and index not in self._all_selected:
             self._all_selected.append(index)
+            web_request.reprioritise()
         self._filter_and_sort_selected()
         return {'selected': self.get_selected()}
 
@@ -413,6 +480,7 @@ class HutsModel:
         """
         if index in self._all_selected:
             self._all_selected.remove(index)
+            web_request.reprioritise()
         self._filter_and_sort_selected()
         return {'selected': self.get_selected()}
 
@@ -498,6 +566,63 @@ class HutsModel:
         self._retrieve_enabled = is_enabled
         return {'retrieve_enabled': self._retrieve_enabled}
 
+    def merge_results(self, results):
+        """Merge results retrieved outside the model (e.g. by the processes of a sharded crawl) in the results.
+
+        :param results: dictionary containing the retrieved information about free beds, with hut index as key
+        """
+        self._update_results_dictionary(results)
+
+    def get_huts_dictionary(self, indexes):
+        """Get the characteristics of the specified huts (e.g. to retrieve their results outside the model).
+
+        :param indexes: list of huts indexes (the unknown huts are ignored)
+        :return: dictionary of the characteristics of the huts, with hut index as key
+        """
+        return {index: self._huts_dictionary[index] for index in indexes if index in self._huts_dictionary}
+
+    def split_fresh(self, huts_list, force=False):
+        """
+        Get the huts whose results have to be retrieved (e.g. outside the model), skipping unless forced those whose
+        results are still fresh; the skipped huts count as avoided requests.
+
+        :param huts_list: list of huts indexes
+        :param force: if True, no hut is skipped
+        :return: tuple of the list of huts indexes to be retrieved and of the number of skipped huts
+        """
+        return self._split_fresh(huts_list, force)
+
+    def start_background_refresh(self, hut_observer=None):
+        """
+        Start refreshing in background the stalest results of the selected and displayed huts, one hut at a time,
+        within the budget of huts per hour defined in the configuration.
+
+        The background refresh shares the rate limits of the other web requests; it pauses while another retrieval
+        is in progress and after a retrieval has been cancelled by the user, until the next retrieval starts.
+
+        :param hut_observer: function to be executed with the view update data of each refreshed hut (signature: (dict))
+        """
+        if self._background_refresh_thread is not None:
+            return
+        budget = config.BACKGROUND_REFRESH_BUDGET
+        if budget is None:
+            budget = _DEFAULT_BACKGROUND_REFRESH_BUDGET
+        if budget <= 0:
+            return
+        self._background_refresh_stop.clear()
+        self._background_refresh_thread = Thread(target=self._background_refresh, args=(3600 / budget, hut_observer),
+                                                 daemon=True)
+        self._background_refresh_thread.start()
+
+    def stop_background_refresh(self):
+        """Stop the background refresh, aborting the request in progress (if any)."""
+        if self._background_refresh_thread is None:
+            return
+        self._background_refresh_stop.set()
+        self._background_cancellation.cancel()
+        self._background_refresh_thread.join()
+        self._background_refresh_thread = None
+
     def is_retrieve_enabled(self):
         """Get the current status of the retrieve enabled flag.
 
@@ -511,11 +636,27 @@ class HutsModel:
 
         :return: a dictionary containing all current data about huts with hut index as key
         """
-        table = {}
-        request_dates = self.request_dates
-        for index in self._huts_dictionary:
-            table[index] = self._get_hut_info_for_dates(index, request_dates)
-        return table
+        catalogue, _ = self._get_distances_from_ref()
+        return self._get_huts_info_for_dates(catalogue.ids.tolist(), self.request_dates)
+
+    def _get_distances_from_ref(self):
+        """
+        Get the distances of all the huts from the reference location.
+
+        The distances are computed once for each reference location (and for each loading of the huts data file).
+        This method can be executed in a separate thread.
+
+        :return: tuple of the huts catalogue and of the array of the distances, one for each row of the catalogue
+                 [meters]
+        """
+        distances_from_ref = self._distances_from_ref
+        if distances_from_ref is None:
+            catalogue = self._huts_catalogue
+            reference_location = self._reference_location
+            distances_from_ref = (catalogue, catalogue.get_distances(reference_location['lat'],
+                                                                     reference_location['lon']))
+            self._distances_from_ref = distances_from_ref
+        return distances_from_ref
 
     def _load_cached_results_dictionary(self):
         """Load the recent results about free places from the cache (i.e. the results file read by config module)."""
@@ -529,84 +670,90 @@ class HutsModel:
             for index, result in cached_results_dictionary.items():
                 if result['request_time'] + cache_expiration > datetime.datetime.now():
                     self._results_dictionary[index] = result
+                    self._availability.update(index, result)
 
     def _get_hut_info_for_dates(self, index, request_dates):
-        """Get a dictionary of all huts data for the specified huts and dates.
+        """Get a dictionary of all huts data for the specified hut and dates.
 
         :param index: the index of the hut for which data are required
         :param request_dates: the dates for which data are required
-        :return: a dictionary of all huts data for the specified huts and dates
+        :return: a dictionary of all huts data for the specified hut and dates
         """
-        try:
-            response = self._results_dictionary[index]['error'] is None
-        except KeyError:
-            response = True
-        try:
-            data_requested = (index in self._results_dictionary
-                              and set(request_dates) <= set(self._results_dictionary[index]['places'].keys()))
-        except KeyError:
-            data_requested = False
-        distance_from_ref = distance(self._huts_dictionary[index]['lat'], self._huts_dictionary[index]['lon'],
-                                     self._reference_location['lat'], self._reference_location['lon'])
-        is_open = self._check_open(self._results_dictionary, index, request_dates)
-        is_serviced = self._check_serviced(self._results_dictionary, index, request_dates)
-        available_places_for_date = self._available_places_for_date(self._results_dictionary, index, request_dates)
-        available_places = min(available_places_for_date.values())
-        available_places_for_room = self._available_places_for_room(self._results_dictionary, index, request_dates)
-        detailed_places = self._detailed_places(self._results_dictionary, index, request_dates)
+        return self._get_huts_info_for_dates([index], request_dates)[index]
 
-        if not response:
-            status = HutStatus.NO_RESPONSE
-        elif not data_requested:
-            status = HutStatus.NO_REQUEST
-        elif not is_open:
-            status = HutStatus.CLOSED
-        elif available_places == 0:
-            status = HutStatus.NOT_AVAILABLE
-        elif not is_serviced:
-            status = HutStatus.UNSERVICED
-        else:
-            status = HutStatus.AVAILABLE
+    def _get_huts_info_for_dates(self, indexes, request_dates):
+        """
+        Get the dictionaries of all huts data for the specified huts and dates.
 
-        if not response:
-            detailed_status = {date: HutStatus.NO_RESPONSE for date in request_dates}
-        else:
-            detailed_status = {}
-            for date in request_dates:
-                if (index not in self._results_dictionary
-                   or date not in self._results_dictionary[index]['places'].keys()):
-                    status_for_date = HutStatus.NO_REQUEST
-                elif self._results_dictionary[index]['hut_status'][date] == _HUT_STATUS_CLOSED:
-                    status_for_date = HutStatus.CLOSED
-                elif available_places_for_date[date] == 0:
-                    status_for_date = HutStatus.NOT_AVAILABLE
-                elif self._results_dictionary[index]['hut_status'][date] == _HUT_STATUS_UNSERVICED:
-                    status_for_date = HutStatus.UNSERVICED
-                else:
-                    status_for_date = HutStatus.AVAILABLE
-                detailed_status[date] = status_for_date
-
-        hut_info = {
-            'name': self._huts_dictionary[index]['name'],
-            'country': self._huts_dictionary[index]['country'],
-            'region': self._huts_dictionary[index]['region'],
-            'mountain_range': self._huts_dictionary[index]['mountain_range'],
-            'self_catering': self._huts_dictionary[index]['self_catering'],
-            'height': self._huts_dictionary[index]['height'],
-            'lat': self._huts_dictionary[index]['lat'],
-            'lon': self._huts_dictionary[index]['lon'],
-            'distance': distance_from_ref,
-            'data_requested': data_requested,
-            'response': response,
-            'open': is_open,
-            'available': available_places,
-            'detailed_places': detailed_places,
-            'status': status,
-            'detailed_status': detailed_status
-        }
-        for room in ROOM_TYPES:
-            hut_info[room] = available_places_for_room[room] if room in available_places_for_room else None
-        return hut_info
+        The availability of all the huts is computed at once from the availability tensor.
+
+        :param indexes: the list of the indexes of the huts for which data are required
+        :param request_dates: the dates for which data are required
+        :return: a dictionary of the dictionaries of all huts data for the specified huts and dates,
+                 with hut index as key
+        """
+        catalogue, distances_from_ref = self._get_distances_from_ref()
+        rows = catalogue.get_rows(indexes)
+        summary = self._availability.summarise(request_dates, rows)
+        hut_status_for_code = {availability.NO_DATA: HutStatus.NO_REQUEST, availability.CLOSED: HutStatus.CLOSED,
+                               availability.UNSERVICED: HutStatus.UNSERVICED}
+
+        huts_info = {}
+        for (index, distance_from_ref, response, data_requested, is_open, is_serviced, available_places,
+             places_for_date, status_for_date, places_for_room) in zip(
+                indexes, distances_from_ref[rows].tolist(), summary['response'].tolist(),
+                summary['data_requested'].tolist(), summary['open'].tolist(), summary['serviced'].tolist(),
+                summary['available'].tolist(), summary['places_for_date'].tolist(), summary['status'].tolist(),
+                summary['places_for_room'].tolist()):
+
+            if not response:
+                status = HutStatus.NO_RESPONSE
+            elif not data_requested:
+                status = HutStatus.NO_REQUEST
+            elif not is_open:
+                status = HutStatus.CLOSED
+            elif available_places == 0:
+                status = HutStatus.NOT_AVAILABLE
+            elif not is_serviced:
+                status = HutStatus.UNSERVICED
+            else:
+                status = HutStatus.AVAILABLE
+
+            if not response:
+                detailed_status = {date: HutStatus.NO_RESPONSE for date in request_dates}
+            else:
+                detailed_status = {}
+                for date, code, places in zip(request_dates, status_for_date, places_for_date):
+                    if code in (availability.NO_DATA, availability.CLOSED):
+                        detailed_status[date] = hut_status_for_code[code]
+                    elif places == 0:
+                        detailed_status[date] = HutStatus.NOT_AVAILABLE
+                    else:
+                        detailed_status[date] = hut_status_for_code.get(code, HutStatus.AVAILABLE)
+
+            hut = self._huts_dictionary[index]
+            hut_info = {
+                'name': hut['name'],
+                'country': hut['country'],
+                'region': hut['region'],
+                'mountain_range': hut['mountain_range'],
+                'self_catering': hut['self_catering'],
+                'height': hut['height'],
+                'lat': hut['lat'],
+                'lon': hut['lon'],
+                'distance': distance_from_ref,
+                'data_requested': data_requested,
+                'response': response,
+                'open': is_open,
+                'available': available_places,
+                'detailed_places': self._detailed_places(self._results_dictionary, index, request_dates),
+                'status': status,
+                'detailed_status': detailed_status
+            }
+            for room, places in zip(ROOM_TYPES, places_for_room):
+                hut_info[room] = places if places >= 0 else None
+            huts_info[index] = hut_info
+        return huts_info
 
     def _load_huts_dictionary(self):
         """Load from the file the list of huts with all their characteristics (location, country etc.)."""
@@ -630,152 +777,182 @@ class HutsModel:
         except FileNotFoundError:
             print(f"Fatal error: missing huts data file '{_HUTS_DATA_FILE}'")
             sys.exit(1)
+        self._huts_catalogue = HutCatalogue(self._huts_dictionary)
+        self._distances_from_ref = None
+        self._availability.rebuild(self._huts_catalogue.ids, self._results_dictionary)
+
+    def _split_fresh(self, huts_list, force):
+        """
+        Get the huts whose results have to be retrieved, skipping (unless forced) those whose results are younger than
+        the freshness threshold and already cover all the request dates; the skipped huts count as avoided requests.
+
+        :param huts_list: list of huts indexes
+        :param force: if True, no hut is skipped
+        :return: tuple of the list of huts indexes to be retrieved and of the number of skipped huts
+        """
+        if force:
+            return list(huts_list), 0
+        fresh_time = self._fresh_time()
+        request_dates = set(self.request_dates)
+        to_retrieve = [index for index in huts_list if not self._is_fresh(index, fresh_time, request_dates)]
+        skipped = len(huts_list) - len(to_retrieve)
+        self._avoided_requests += skipped
+        return to_retrieve, skipped
+
+    @staticmethod
+    def _fresh_time():
+        """Get the oldest request time for which the results of a hut are still fresh.
+
+        :return: the oldest fresh request time
+        """
+        freshness = config.RESULTS_FRESHNESS
+        if freshness is None:
+            freshness = _DEFAULT_RESULTS_FRESHNESS
+        return datetime.datetime.now() - datetime.timedelta(minutes=freshness)
+
+    def _is_fresh(self, index, fresh_time, request_dates):
+        """Check if the results of a hut are fresh, i.e. successfully retrieved recently for all the request dates.
+
+        :param index: the index of the hut
+        :param fresh_time: the oldest request time for which results are fresh
+        :param request_dates: the set of request dates
+        :return: True if the results of the hut are fresh, False otherwise
+        """
+        result = self._results_dictionary.get(index)
+        return (result is not None and result['error'] is None and result['request_time'] >= fresh_time
+                and request_dates <= result['places'].keys())
+
+    def _background_refresh(self, interval, hut_observer):
+        """
+        Periodically refresh the results of the stalest hut among the selected and displayed ones.
+
+        This method is executed in a separate thread.
 
-    def _get_results_for_date(self, huts_list, start_date, observer, final_observer):
+        :param interval: time between two refreshes [seconds]
+        :param hut_observer: function to be executed with the view update data of each refreshed hut (signature: (dict))
+        """
+        def on_result(hut_index, result):
+            self._update_results_dictionary({hut_index: result})
+            if hut_observer is not None:
+                hut_observer({'hut_data': {hut_index: self._get_hut_info_for_dates(hut_index, self.request_dates)}})
+
+        while not self._background_refresh_stop.wait(interval):
+            if not self._retrieve_enabled or self._results_cancelled or self._active_retrievals:
+                continue
+            index = self._stalest_hut()
+            if index is None:
+                continue
+            result = self._results_dictionary.get(index)
+            revalidate = {index} if result is not None and result['error'] is None else set()
+            cancellation = web_request.Cancellation()
+            self._background_cancellation = cancellation
+            if self._background_refresh_stop.is_set():
+                break
+            web_request.perform_web_requests_for_huts({index: self._huts_dictionary[index]}, on_result,
+                                                      cancellation, revalidate)
+
+    def _stalest_hut(self):
+        """Get the hut whose results are the stalest among the selected and displayed huts (selected huts first).
+
+        :return: the index of the stalest hut, None if all the results are fresh
+        """
+        fresh_time = self._fresh_time()
+        request_dates = set(self.request_dates)
+        selected = list(self._all_selected)
+        candidates = [index for index in dict.fromkeys(selected + self._displayed)
+                      if index in self._huts_dictionary and not self._is_fresh(index, fresh_time, request_dates)]
+        if not candidates:
+            return None
+
+        def staleness(index):
+            result = self._results_dictionary.get(index)
+            return index not in selected, datetime.datetime.min if result is None else result['request_time']
+
+        return min(candidates, key=staleness)
+
+    def _get_results_for_date(self, huts_list, start_date, observer, final_observer, hut_observer=None):
         """Start the retrieval of data about free places from the web for the specified huts and initial date.
 
+        The retrieval is added to the active retrievals, since it can overlap with a previous one still in progress
+        (e.g. when a new date is chosen): all the active retrievals are cancelled together.
+
         :param huts_list: list of huts indexes for which the information has to be retrieved
         :param start_date: initial date of the period for which information has to be retrieved
         :param observer: function to be executed after every data retrieval for each individual hut (signature: (int))
         :param final_observer: function to be executed at the end of the data retrieval (signature: ())
         """
         self._results_cancelled = False
+        cancellation = web_request.Cancellation()
+        with self._active_retrievals_lock:
+            self._active_retrievals.add(cancellation)
         thread = Thread(target=self._perform_web_request,
-                        args=(huts_list, start_date, observer, final_observer))
+                        args=(huts_list, start_date, observer, final_observer, hut_observer, cancellation))
         thread.start()
 
-    def _perform_web_request(self, huts_list, start_date, observer, final_observer):
+    def _perform_web_request(self, huts_list, start_date, observer, final_observer, hut_observer=None,
+                             cancellation=None):
         """Perform the retrieval of data about free places from the web for the specified huts and initial date.
 
+        The result of each hut is merged in the results dictionary as soon as it has been retrieved; if the retrieval
+        is cancelled, the requests in flight are aborted and only the results retrieved so far are kept.
+        At the end, the retrieval is removed from the active retrievals, which pause the background refresh.
         This method is executed in a separate thread.
 
         :param huts_list: list of huts indexes for which the information has to be retrieved
         :param start_date: initial date of the period for which information has to be retrieved
         :param observer: function to be executed after every data retrieval for each individual hut (signature: (int))
         :param final_observer: function to be executed at the end of the data retrieval (signature: ())
+        :param hut_observer: function to be executed with the view update data of each hut as soon as its result has
+                             been retrieved (signature: (dict))
+        :param cancellation: the web_request.Cancellation of the retrieval (None if it cannot be cancelled)
         """
         outstanding_requests = len(huts_list)
-        results = {}
-
-        for index in huts_list:
-            if observer is not None:
-                observer(outstanding_requests)
-            if self._results_cancelled:
-                break
-            results[index] = web_request.perform_web_request_for_hut(index, self._huts_dictionary[index])
-            outstanding_requests -= 1
+        outstanding_lock = Lock()
+
+        def on_result(index, result):
+            nonlocal outstanding_requests
+            self._update_results_dictionary({index: result})
+            if hut_observer is not None:
+                hut_observer({'hut_data': {index: self._get_hut_info_for_dates(index, self.request_dates)}})
+            with outstanding_lock:
+                outstanding_requests -= 1
+                outstanding = outstanding_requests
+            if observer is not None and outstanding > 0:
+                observer(outstanding)
+
+        if observer is not None and outstanding_requests > 0:
+            observer(outstanding_requests)
+
+        huts = {index: self._huts_dictionary[index] for index in huts_list}
+        revalidate = {index for index in huts_list
+                      if index in self._results_dictionary and self._results_dictionary[index]['error'] is None}
+        try:
+            web_request.perform_web_requests_for_huts(huts, on_result, cancellation, revalidate, self._fetch_priority)
+        finally:
+            with self._active_retrievals_lock:
+                self._active_retrievals.discard(cancellation)
 
         if observer is not None:
             observer(0)
 
-        self._update_results_dictionary(results)
-
         if final_observer is not None:
             final_observer()
 
-    @staticmethod
-    def _check_open(results_dictionary, index, dates=None):
-        """Check if the specified hut is open at all specified dates (or at all available date if no date is provided).
-
-        :param results_dictionary: the dictionary containing the information about free places
-        :param index: the index of the hut for which the check is required
-        :param dates: the dates for which the check is required; if not provided, all available dates are considered
-        :return: True if the hut is open, False otherwise
-        """
-        if index not in results_dictionary:
-            return False
-        response = results_dictionary[index]['error'] is None
-        if not response:
-            return False
-        available_dates = set(results_dictionary[index]['places'].keys())
-        check_dates = set(dates) if dates is not None else available_dates
-        if not check_dates <= available_dates:
-            return False
-        for date in check_dates:
-            if results_dictionary[index]['hut_status'][date] == _HUT_STATUS_CLOSED:
-                return False
-        return True
-
-    @staticmethod
-    def _check_serviced(results_dictionary, index, dates=None):
-        """Check if the specified hut is serviced at all specified dates
-        (or at all available date if no date is provided).
-
-        :param results_dictionary: the dictionary containing the information about free places
-        :param index: the index of the hut for which the check is required
-        :param dates: the dates for which the check is required; if not provided, all available dates are considered
-        :return: True if the hut is serviced, False otherwise
-        """
-        if index not in results_dictionary:
-            return False
-        response = results_dictionary[index]['error'] is None
-        if not response:
-            return False
-        available_dates = set(results_dictionary[index]['places'].keys())
-        check_dates = set(dates) if dates is not None else available_dates
-        if not check_dates <= available_dates:
-            return False
-        for date in check_dates:
-            if results_dictionary[index]['hut_status'][date] == _HUT_STATUS_UNSERVICED:
-                return False
-        return True
-
-    @staticmethod
-    def _available_places_for_date(results_dictionary, index, dates):
-        """Return the number of available places for a hut for all specified dates.
-
-        :param results_dictionary: the dictionary containing the information about free places
-        :param index: the index of the hut for which the number of available places is required
-        :param dates: the dates for which the value is required; if not provided, all available dates are considered
-        :return: the dictionary with the number of available places for each date
+    def _fetch_priority(self, index):
         """
-        check_dates = set(dates)
-        if index not in results_dictionary:
-            return {date: 0 for date in check_dates}
-        available_dates = set(results_dictionary[index]['places'].keys())
-        response = results_dictionary[index]['error'] is None
-        if not response:
-            return {date: 0 for date in check_dates}
-        available_places_for_date = {}
-        for date in check_dates:
-            available_places = 0
-            if date in available_dates:
-                for room_places in results_dictionary[index]['places'][date].values():
-                    available_places += room_places
-            available_places_for_date[date] = available_places
-        return available_places_for_date
+        Get the priority of a hut in the retrieval of data from the web: selected huts first,
+        then huts inside the window shown on the map, then by increasing distance from the reference location.
 
-    @staticmethod
-    def _available_places_for_room(results_dictionary, index, dates=None):
-        """Return the number of available places in each room type for a hut for all specified dates.
+        This method is executed in a separate thread.
 
-        :param results_dictionary: the dictionary containing the information about free places
-        :param index: the index of the hut for which the number of available places is required
-        :param dates: the dates for which the values are required; if not provided, all available dates are considered
-        :return: a dictionary with the number of available places with room type as key
+        :param index: the index of the hut
+        :return: the sort key of the hut (lower keys are retrieved first)
         """
-        if index not in results_dictionary:
-            return {}
-        if results_dictionary[index]['error'] is not None:
-            return {}
-        available_dates = set(results_dictionary[index]['places'].keys())
-        check_dates = set(dates) if dates is not None else available_dates
-        if not check_dates <= available_dates:
-            return {}
-        available_places = {}
-        for date in check_dates:
-            available_places_for_date = {}
-            for room_name, room_places in results_dictionary[index]['places'][date].items():
-                available_places_for_date[room_name] = room_places
-            if not available_places:
-                available_places = available_places_for_date
-            else:
-                for room in available_places:
-                    if room not in available_places_for_date:
-                        available_places[room] = 0
-                    else:
-                        available_places[room] = min(available_places_for_date[room], available_places[room])
-        return available_places
+        catalogue, distances_from_ref = self._get_distances_from_ref()
+        viewport = self._viewport
+        is_selected = index in self._all_selected
+        is_visible = viewport is not None and self.check_in_window(index, *viewport)
+        return not is_selected, not is_visible, float(distances_from_ref[catalogue.get_rows([index])[0]])
 
     @staticmethod
     def _detailed_places(results_dictionary, index, dates=None):
@@ -834,10 +1011,7 @@ class HutsModel:
         elif key == 'self_catering':
             to_filter = self._filter_by_self_catering(to_filter, parameters['value'])
         elif key == 'distance':
-            lat_ref = self._reference_location['lat']
-            lon_ref = self._reference_location['lon']
-            to_filter = self._filter_by_distance(to_filter, parameters['min'], parameters['max'],
-                                                 lat_ref, lon_ref)
+            to_filter = self._filter_by_distance(to_filter, parameters['min'], parameters['max'])
         elif key == 'response':
             to_filter = self._filter_by_response(to_filter)
         elif key == 'open':
@@ -855,11 +1029,7 @@ class HutsModel:
         :param filter_country: the country string to be used to filter
         :return: the updated list of hut indexes
         """
-        filtered_list = []
-        for index in original_list:
-            if self._huts_dictionary[index]['country'] == filter_country:
-                filtered_list.append(index)
-        return filtered_list
+        return self._huts_catalogue.filter_equal(original_list, 'country', filter_country)
 
     def _filter_by_region(self, original_list, filter_region):
         """Filter a list of huts keeping only those in the specified region.
@@ -868,11 +1038,7 @@ class HutsModel:
         :param filter_region: the region string to be used to filter
         :return: the updated list of hut indexes
         """
-        filtered_list = []
-        for index in original_list:
-            if self._huts_dictionary[index]['region'] == filter_region:
-                filtered_list.append(index)
-        return filtered_list
+        return self._huts_catalogue.filter_equal(original_list, 'region', filter_region)
 
     def _filter_by_mountain_range(self, original_list, filter_mountain_range):
         """Filter a list of huts keeping only those in the specified mountain range.
@@ -881,11 +1047,7 @@ class HutsModel:
         :param filter_mountain_range: the mountain range string to be used to filter
         :return: the updated list of hut indexes
         """
-        filtered_list = []
-        for index in original_list:
-            if self._huts_dictionary[index]['mountain_range'] == filter_mountain_range:
-                filtered_list.append(index)
-        return filtered_list
+        return self._huts_catalogue.filter_equal(original_list, 'mountain_range', filter_mountain_range)
 
     def _filter_by_height(self, original_list, filter_height_min, filter_height_max):
         """
@@ -902,11 +1064,7 @@ class HutsModel:
             filter_height_min = 0.
         if filter_height_max is None:
             filter_height_max = 10000.
-        filtered_list = []
-        for index in original_list:
-            if filter_height_min <= self._huts_dictionary[index]['height'] <= filter_height_max:
-                filtered_list.append(index)
-        return filtered_list
+        return self._huts_catalogue.filter_between(original_list, 'height', filter_height_min, filter_height_max)
 
     def _filter_by_self_catering(self, original_list, filter_self_catering):
         """Filter a list of huts keeping only those whose with the specified self-catering flag.
@@ -915,36 +1073,26 @@ class HutsModel:
         :param filter_self_catering: the self-catering flag to be used to filter [boolean]
         :return: the updated list of hut indexes
         """
-        filtered_list = []
-        for index in original_list:
-            if self._huts_dictionary[index]['self_catering'] == filter_self_catering:
-                filtered_list.append(index)
-        return filtered_list
+        return self._huts_catalogue.filter_equal(original_list, 'self_catering', filter_self_catering)
 
-    def _filter_by_distance(self, original_list, filter_distance_min, filter_distance_max, lat_ref, lon_ref):
+    def _filter_by_distance(self, original_list, filter_distance_min, filter_distance_max):
         """
-        Filter a list of huts keeping only those in the specified distance interval from a reference location.
+        Filter a list of huts keeping only those in the specified distance interval from the reference location.
 
         It is possible to specify an open interval by passing a None value for one of the distances.
 
         :param original_list: a list of hut indexes
         :param filter_distance_min: the minimum value of the distance interval to be used to filter [km]
         :param filter_distance_max: the maximum value of the distance interval to be used to filter [km]
-        :param lat_ref: latitude of the reference location [degrees]
-        :param lon_ref: longitude of the reference location [degrees]
         :return: the updated list of hut indexes
         """
         if filter_distance_min is None:
             filter_distance_min = 0.
         if filter_distance_max is None:
             filter_distance_max = 20000.
-        filtered_list = []
-        for index in original_list:
-            lat = self._huts_dictionary[index]['lat']
-            lon = self._huts_dictionary[index]['lon']
-            if filter_distance_min * 1000 <= distance(lat, lon, lat_ref, lon_ref) <= filter_distance_max * 1000:
-                filtered_list.append(index)
-        return filtered_list
+        catalogue, distances_from_ref = self._get_distances_from_ref()
+        return catalogue.filter_keys_between(original_list, distances_from_ref,
+                                             filter_distance_min * 1000, filter_distance_max * 1000)
 
     def _filter_by_response(self, original_list):
         """
@@ -955,14 +1103,8 @@ class HutsModel:
         :param original_list: a list of hut indexes
         :return: the updated list of hut indexes
         """
-        filtered_list = []
-        for index in original_list:
-            if index in self._results_dictionary:
-                response = self._results_dictionary[index]['error'] is None
-                if not response:
-                    continue
-            filtered_list.append(index)
-        return filtered_list
+        summary = self._availability.summarise([])
+        return self._huts_catalogue.filter_equal_keys(original_list, summary['response'], True)
 
     def _filter_by_open(self, original_list, dates):
         """
@@ -974,15 +1116,9 @@ class HutsModel:
         :param dates: the list of dates in which to check if the hut is open
         :return: the updated list of hut indexes
         """
-        filtered_list = []
-        for index in original_list:
-            if index in self._results_dictionary:
-                response = self._results_dictionary[index]['error'] is None
-                is_open = self._check_open(self._results_dictionary, index, dates)
-                if response and not is_open:
-                    continue
-            filtered_list.append(index)
-        return filtered_list
+        summary = self._availability.summarise(dates)
+        closed = summary['has_result'] & summary['response'] & ~summary['open']
+        return self._huts_catalogue.filter_equal_keys(original_list, closed, False)
 
     def _filter_by_available(self, original_list, filter_available_min, filter_available_max, dates):
         """
@@ -1002,13 +1138,9 @@ class HutsModel:
             filter_available_min = 0.
         if filter_available_max is None:
             filter_available_max = 1000.
-        filtered_list = []
-        for index in original_list:
-            available_places_for_date = self._available_places_for_date(self._results_dictionary, index, dates)
-            available_places = min(available_places_for_date.values())
-            if filter_available_min <= available_places <= filter_available_max:
-                filtered_list.append(index)
-        return filtered_list
+        summary = self._availability.summarise(dates)
+        return self._huts_catalogue.filter_keys_between(original_list, summary['available'],
+                                                        filter_available_min, filter_available_max)
 
     def _filter_by_room(self, original_list, room, filter_available_min, filter_available_max, dates):
         """
@@ -1029,13 +1161,10 @@ class HutsModel:
             filter_available_min = 0.
         if filter_available_max is None:
             filter_available_max = 1000.
-        filtered_list = []
-        for index in original_list:
-            available_places_for_room = self._available_places_for_room(self._results_dictionary, index, dates)
-            available_places = available_places_for_room[room] if room in available_places_for_room else 0
-            if filter_available_min <= available_places <= filter_available_max:
-                filtered_list.append(index)
-        return filtered_list
+        summary = self._availability.summarise(dates)
+        available_places = np.maximum(summary['places_for_room'][:, ROOM_TYPES.index(room)], 0)
+        return self._huts_catalogue.filter_keys_between(original_list, available_places,
+                                                        filter_available_min, filter_available_max)
 
     def _sort_by(self, to_sort, key, ascending):
         """
@@ -1061,9 +1190,7 @@ class HutsModel:
         elif key == 'self_catering':
             to_sort = self._sort_by_self_catering(to_sort, ascending)
         elif key == 'distance':
-            lat_ref = self._reference_location['lat']
-            lon_ref = self._reference_location['lon']
-            to_sort = self._sort_by_distance(to_sort, lat_ref, lon_ref, ascending)
+            to_sort = self._sort_by_distance(to_sort, ascending)
         elif key == 'available':
             to_sort = self._sort_by_available(to_sort, self.request_dates, ascending)
         elif key in ROOM_TYPES:
@@ -1079,7 +1206,7 @@ class HutsModel:
         :param ascending: boolean which specifies the sorting direction (True: ascending; False: descending)
         :return: the sorted list of hut indexes
         """
-        return sorted(original_list, key=lambda index: self._huts_dictionary[index]['name'], reverse=not ascending)
+        return self._huts_catalogue.sort_by(original_list, 'name', ascending)
 
     def _sort_by_country(self, original_list, ascending=True):
         """Sort a list of huts alphabetically by country.
@@ -1088,7 +1215,7 @@ class HutsModel:
         :param ascending: boolean which specifies the sorting direction (True: ascending; False: descending)
         :return: the sorted list of hut indexes
         """
-        return sorted(original_list, key=lambda index: self._huts_dictionary[index]['country'], reverse=not ascending)
+        return self._huts_catalogue.sort_by(original_list, 'country', ascending)
 
     def _sort_by_region(self, original_list, ascending=True):
         """Sort a list of huts alphabetically by region.
@@ -1097,9 +1224,7 @@ class HutsModel:
         :param ascending: boolean which specifies the sorting direction (True: ascending; False: descending)
         :return: the sorted list of hut indexes
         """
-        return sorted(original_list,
-                      key=lambda index: i18n.regions_labels[self._huts_dictionary[index]['region']].casefold(),
-                      reverse=not ascending)
+        return self._huts_catalogue.sort_by_labels(original_list, 'region', i18n.regions_labels, ascending)
 
     def _sort_by_mountain_range(self, original_list, ascending=True):
         """Sort a list of huts alphabetically by mountain range.
@@ -1108,11 +1233,8 @@ class HutsModel:
         :param ascending: boolean which specifies the sorting direction (True: ascending; False: descending)
         :return: the sorted list of hut indexes
         """
-        return sorted(original_list,
-                      key=lambda index: i18n.mountain_ranges_labels[
-                          self._huts_dictionary[index]['mountain_range']
-                      ].casefold(),
-                      reverse=not ascending)
+        return self._huts_catalogue.sort_by_labels(original_list, 'mountain_range', i18n.mountain_ranges_labels,
+                                                   ascending)
 
     def _sort_by_height(self, original_list, ascending=True):
         """Sort a list of huts by height.
@@ -1121,7 +1243,7 @@ class HutsModel:
         :param ascending: boolean which specifies the sorting direction (True: ascending; False: descending)
         :return: the sorted list of hut indexes
         """
-        return sorted(original_list, key=lambda index: self._huts_dictionary[index]['height'], reverse=not ascending)
+        return self._huts_catalogue.sort_by(original_list, 'height', ascending)
 
     def _sort_by_self_catering(self, original_list, ascending=True):
         """Sort a list of huts by self-catering flag.
@@ -1130,23 +1252,17 @@ class HutsModel:
         :param ascending: boolean which specifies the sorting direction (True: self-catering first; False: last)
         :return: the sorted list of hut indexes
         """
-        return sorted(original_list, key=lambda index: self._huts_dictionary[index]['self_catering'],
-                      reverse=not ascending)
+        return self._huts_catalogue.sort_by(original_list, 'self_catering', ascending)
 
-    def _sort_by_distance(self, original_list, lat_ref, lon_ref, ascending=True):
-        """Sort a list of huts by distance from a reference location.
+    def _sort_by_distance(self, original_list, ascending=True):
+        """Sort a list of huts by distance from the reference location.
 
         :param original_list: a list of hut indexes
-        :param lat_ref: latitude of the reference location [degrees]
-        :param lon_ref: longitude of the reference location [degrees]
         :param ascending: boolean which specifies the sorting direction (True: ascending; False: descending)
         :return: the sorted list of hut indexes
         """
-        def f_key(index):
-            lat = self._huts_dictionary[index]['lat']
-            lon = self._huts_dictionary[index]['lon']
-            return distance(lat, lon, lat_ref, lon_ref)
-        return sorted(original_list, key=f_key, reverse=not ascending)
+        catalogue, distances_from_ref = self._get_distances_from_ref()
+        return catalogue.sort_by_keys(original_list, distances_from_ref, ascending)
 
     def _sort_by_available(self, original_list, dates=None, ascending=False):
         """Sort a list of huts by number of available places for all the specified dates.
@@ -1156,10 +1272,8 @@ class HutsModel:
         :param ascending: boolean which specifies the sorting direction (True: ascending; False: descending)
         :return: the sorted list of hut indexes
         """
-        def f_key(index):
-            available_places_for_date = self._available_places_for_date(self._results_dictionary, index, dates)
-            return min(available_places_for_date.values())
-        return sorted(original_list, key=f_key, reverse=not ascending)
+        summary = self._availability.summarise(dates)
+        return self._huts_catalogue.sort_by_keys(original_list, summary['available'], ascending)
 
     def _sort_by_room(self, original_list, room, dates=None, ascending=False):
         """Sort a list of huts by number of available places for all the specified dates.
@@ -1170,36 +1284,58 @@ class HutsModel:
         :param ascending: boolean which specifies the sorting direction (True: ascending; False: descending)
         :return: the sorted list of hut indexes
         """
-        def f_key(index):
-            available_places_for_room = self._available_places_for_room(self._results_dictionary, index, dates)
-            return available_places_for_room[room] if room in available_places_for_room else -1
-        return sorted(original_list, key=f_key, reverse=not ascending)
+        summary = self._availability.summarise(dates)
+        return self._huts_catalogue.sort_by_keys(original_list, summary['places_for_room'][:, ROOM_TYPES.index(room)],
+                                                 ascending)
 
     def _update_results_dictionary(self, results):
-        """Update the dictionary containing the retrieved results about free places by merging new results.
+        """
+        Update the dictionary containing the retrieved results about free places by merging new results.
+
+        Results reported as not modified since the previous retrieval only update the request time;
+        results of huts skipped without a web request (after too many failed requests) are ignored.
+        The result of each hut is merged in a copy which then replaces the previous one, since the results dictionary
+        can be read while the retrieval is in progress; the merge is serialised by a lock, since it is performed both by
+        the retrievals and by the background refresh.
 
         :param results: a dictionary containing new retrieved results to be merged
         """
-        for index, result in results.items():
-            if index not in self._results_dictionary:
-                self._results_dictionary[index] = result
-            else:
-                self._results_dictionary[index]['error'] = result['error']
-                self._results_dictionary[index]['warning'] = result['warning']
-                self._results_dictionary[index]['request_time'] = result['request_time']
-                self._results_dictionary[index]['hut_status'] = result['hut_status']
-                for book_date, rooms in result['places'].items():
-                    self._results_dictionary[index]['places'][book_date] = rooms
+        with self._results_lock:
+            for index, result in results.items():
+                if result.get('skipped'):
+                    continue
+                if result.get('not_modified'):
+                    if index in self._results_dictionary:
+                        self._results_dictionary[index] = {**self._results_dictionary[index],
+                                                           'request_time': result['request_time']}
+                elif index not in self._results_dictionary:
+                    self._results_dictionary[index] = result
+                    self._availability.update(index, result)
+                else:
+                    merged_result = self._results_dictionary[index].copy()
+                    merged_result['error'] = result['error']
+                    merged_result['warning'] = result['warning']
+                    merged_result['request_time'] = result['request_time']
+                    merged_result['hut_status'] = result['hut_status']
+                    merged_result['places'] = {**merged_result['places'], **result['places']}
+                    self._results_dictionary[index] = merged_result
+                    self._availability.update(index, merged_result)
 
     def _cancel_results(self, obj):
         """
-        Set the flag to indicate that the retrieval of results from the web has been cancelled by the user.
+        Cancel all the active retrievals of results from the web, aborting the requests in flight.
 
+        The flag indicating that the retrieval has been cancelled by the user is set, which also pauses
+        the background refresh until the next retrieval starts.
         This method is called by a view widget.
 
         :param obj: object which calls the method
         """
         self._results_cancelled = True
+        with self._active_retrievals_lock:
+            for cancellation in self._active_retrievals:
+                cancellation.cancel()
+        self._background_cancellation.cancel()
 
     def _display_all(self):
         """Reset the list of displayed huts to contain all the huts in the dictionary i.e. removes all filters."""
@@ -3,11 +3,15 @@ Utility functions for the spherical Earth.
 
 Functions:
    distance: compute the distance between two points
+   distances: compute the distances between a point and an array of points
+   distance_matrix: compute the distances between each point of an array and each point of another array
    meters_to_degrees: convert distances in meters to the corresponding differences in latitude and longitude
 """
 
 import math
 
+import numpy as np
+
 _EARTH_RADIUS = 6371000  # meters
 
 
@@ -38,14 +42,62 @@ def distance(lat1, lon1, lat2, lon2):
     return 2 * _EARTH_RADIUS * math.asin(math.sqrt(h))
 
 
+def distances(lat, lon, lats, lons):
+    """Compute the distances between a point and an array of points on the spherical Earth.
+
+    :param lat: latitude of the point [degrees]
+    :param lon: longitude of the point [degrees]
+    :param lats: array of the latitudes of the points [degrees]
+    :param lons: array of the longitudes of the points [degrees]
+    :return: array of the distances between the point and each of the points [meters]
+    """
+    return _haversine_distance(np.radians(lat), np.radians(lon),
+                               np.radians(np.asarray(lats, dtype=np.float64)),
+                               np.radians(np.asarray(lons, dtype=np.float64)))
+
+
+def distance_matrix(lats1, lons1, lats2, lons2):
+    """Compute the distances between each point of an array and each point of another array on the spherical Earth.
+
+    :param lats1: array of the latitudes of the first points [degrees]
+    :param lons1: array of the longitudes of the first points [degrees]
+    :param lats2: array of the latitudes of the second points [degrees]
+    :param lons2: array of the longitudes of the second points [degrees]
+    :return: matrix of the distances, with a row for each of the first points and a column for each of the second
+             points [meters]
+    """
+    lat1_rad = np.radians(np.asarray(lats1, dtype=np.float64))[:, np.newaxis]
+    lon1_rad = np.radians(np.asarray(lons1, dtype=np.float64))[:, np.newaxis]
+    lat2_rad = np.radians(np.asarray(lats2, dtype=np.float64))[np.newaxis, :]
+    lon2_rad = np.radians(np.asarray(lons2, dtype=np.float64))[np.newaxis, :]
+    return _haversine_distance(lat1_rad, lon1_rad, lat2_rad, lon2_rad)
+
+
+def _haversine_distance(lat1_rad, lon1_rad, lat2_rad, lon2_rad):
+    """
+    Haversine formula for the distance between points, on arrays (broadcast against each other).
+
+    :param lat1_rad: latitudes of the first points [rad]
+    :param lon1_rad: longitudes of the first points [rad]
+    :param lat2_rad: latitudes of the second points [rad]
+    :param lon2_rad: longitudes of the second points [rad]
+    :return: the distances [meters]
+    """
+    h = (np.sin((lat2_rad - lat1_rad) / 2) ** 2
+         + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin((lon2_rad - lon1_rad) / 2) ** 2)
+    return 2 * _EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
 def meters_to_degrees(x, y, lat):
     """Convert distances in meters to the corresponding differences in latitude and longitude on the spherical Earth.
 
+    The arguments can also be arrays (broadcast against each other), in which case arrays are returned.
+
     :param x: distance along the meridian [m]
     :param y: distance along the parallel [m]
     :param lat: latitude of the mid-point [degrees]
     :return: a tuple containing the difference in latitude and longitude [degrees]
     """
-    d_lat = math.degrees(y / _EARTH_RADIUS)
-    d_lon = math.degrees(x / (_EARTH_RADIUS * math.cos(math.radians(lat))))
+    d_lat = np.degrees(np.divide(y, _EARTH_RADIUS))
+    d_lon = np.degrees(np.divide(x, _EARTH_RADIUS * np.cos(np.radians(lat))))
     return d_lat, d_lon
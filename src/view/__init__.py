@@ -6,6 +6,8 @@ Modules:
     tables.py: define the data tables used by the application
 
 Variables:
-    errors: list containing the errors detected in the view package
+    errors: registry of the errors detected in the view package
 """
-errors = []
+from src.error_registry import ErrorRegistry
+
+errors = ErrorRegistry()
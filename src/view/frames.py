@@ -15,10 +15,12 @@ Classes:
 """
 import ast
 import datetime
+import threading
 
 from src.map_tools import NavigableMap, HutMap
 from src import i18n
 from src import config
+from src import metrics
 from src.model import ROOM_TYPES
 from prettysusi.widgets import Button, CheckBox, RadioBox, Bitmap, Text, Calendar, SpinControl, Menu, TextControl, \
      TextTimedMenu
@@ -115,30 +117,47 @@ class _HutsView(_HutsInfoFrame):
         super().__init__(**kwargs)
         self.event_connect(self._after_update_event, self._on_after_update)
         self._waiting_message = None
+        self._skipped_huts = 0
         self._all_updates = {}
         self._update_cancelled = False
 
-    def show_waiting_message_huts(self, cancel_function, outstanding):
+    def show_waiting_message_huts(self, cancel_function, outstanding, skipped=0):
         """Show the waiting message when retrieving huts information.
 
         :param cancel_function: function to be executed if the data retrieval is cancelled
         :param outstanding: number of outstanding huts
+        :param skipped: number of huts skipped because their information is still fresh
         """
         if self._waiting_message is not None:
             self.close_waiting_message()
+        self._skipped_huts = skipped
         title = i18n.all_strings['waiting caption huts']
         self._waiting_message = WaitingMessage(cancel_function=cancel_function, parent=self, title=title)
-        label = i18n.all_strings['waiting message huts'].format(outstanding)
-        self._waiting_message.update_gui({'message': label})
+        self._waiting_message.update_gui({'message': self._waiting_message_huts_label(outstanding)})
         self._waiting_message.show()
 
-    def update_waiting_message_huts(self, outstanding):
+    def update_waiting_message_huts(self, outstanding, rate=None):
         """Update the waiting message when retrieving huts information.
 
         :param outstanding: number of outstanding huts
+        :param rate: current request rate [requests per second] (not shown if None)
         """
-        label = i18n.all_strings['waiting message huts'].format(outstanding)
-        self._waiting_message.update_gui({'message': label})
+        self._waiting_message.update_gui({'message': self._waiting_message_huts_label(outstanding, rate)})
+
+    def _waiting_message_huts_label(self, outstanding, rate=None):
+        """Get the waiting message when retrieving huts information.
+
+        :param outstanding: number of outstanding huts
+        :param rate: current request rate [requests per second] (not shown if None)
+        :return: the waiting message
+        """
+        if rate is None:
+            label = i18n.all_strings['waiting message huts'].format(outstanding)
+        else:
+            label = i18n.all_strings['waiting message huts rate'].format(outstanding, rate)
+        if self._skipped_huts > 0:
+            label += '\n' + i18n.all_strings['waiting message huts skipped'].format(self._skipped_huts)
+        return label
 
     def show_waiting_message_updates(self, cancel_function, message):
         """Show the waiting message when retrieving updates.
@@ -257,6 +276,8 @@ class _HutsView(_HutsInfoFrame):
         menu_develop.append(label, on_item_click=self._on_show_warnings)
         label = ast.literal_eval(i18n.all_strings['menu errors'])[0]
         menu_develop.append(label, on_item_click=self._on_show_errors)
+        label = ast.literal_eval(i18n.all_strings['menu metrics'])[0]
+        menu_develop.append(label, on_item_click=self._on_show_metrics)
 
         menubar.append(menu_main)
         menubar.append(menu_develop)
@@ -303,6 +324,10 @@ class _HutsView(_HutsInfoFrame):
         """Open the developer frame showing the triggered errors."""
         self._controller.command_open_errors_frame(self)
 
+    def _on_show_metrics(self):
+        """Open the developer frame showing the performance metrics of the web requests."""
+        self._controller.command_open_metrics_frame(self)
+
     def _on_menu_command_close(self):
         """Close the frame."""
         self.close()
@@ -322,6 +347,8 @@ class _HutsView(_HutsInfoFrame):
             self._update_selected(data['selected'])
         if 'huts_data' in data:
             self._update_huts_data(data['huts_data'])
+        if 'hut_data' in data:
+            self._update_hut_data(data['hut_data'])
         if 'filter_displayed_keys' in data:
             self._update_filter_displayed_keys(data['filter_displayed_keys'])
         if 'reference_location' in data:
@@ -356,6 +383,13 @@ class _HutsView(_HutsInfoFrame):
         """
         raise NotImplementedError
 
+    def _update_hut_data(self, data):
+        """Update the information of the huts whose data have just been retrieved, leaving the other huts untouched.
+
+        :param data: the data to use to update the huts information, with hut index as key
+        """
+        raise NotImplementedError
+
     def _update_reference_location(self, location):
         """Update the reference location to a new position.
 
@@ -590,6 +624,8 @@ class HutsTableView(_HutsView):
         self._get_selected_results_button = Button(parent=self,
                                                    on_click=self._on_get_huts_info_selected)
 
+        self._checkbox_force_refresh = CheckBox(parent=self, value=False)
+
         self._reference_label = Text(parent=self)
 
         self._latitude_label = Text(parent=self)
@@ -628,6 +664,7 @@ class HutsTableView(_HutsView):
         self._retrieve_info_label.label = i18n.all_strings['retrieve info']
         self._get_displayed_results_button.label = i18n.all_strings['retrieve displayed']
         self._get_selected_results_button.label = i18n.all_strings['retrieve selected']
+        self._checkbox_force_refresh.label = i18n.all_strings['force refresh']
         self._reference_label.label = i18n.all_strings['reference']
         self._latitude_label.label = i18n.all_strings['latitude']
         self._longitude_label.label = i18n.all_strings['longitude']
@@ -674,6 +711,14 @@ class HutsTableView(_HutsView):
         self._grid_displayed.update_data(data_dictionary=huts_data)
         self._grid_selected.update_data(data_dictionary=huts_data)
 
+    def _update_hut_data(self, hut_data):
+        """Update the rows of the huts whose data have just been retrieved.
+
+        :param hut_data: the data to use to update the huts information, with hut index as key
+        """
+        self._grid_displayed.update_hut_data(hut_data)
+        self._grid_selected.update_hut_data(hut_data)
+
     def _update_displayed(self, displayed):
         """Update the displayed huts.
 
@@ -702,12 +747,12 @@ class HutsTableView(_HutsView):
 
     def _on_get_huts_info_displayed(self, _obj):
         """Command the retrieval of huts data for all displayed huts."""
-        data = {'which': 'displayed'}
+        data = {'which': 'displayed', 'force': self._checkbox_force_refresh.value}
         self._controller.command_update_results(data)
 
     def _on_get_huts_info_selected(self, _obj):
         """Command the retrieval of huts data for all selected huts."""
-        data = {'which': 'selected'}
+        data = {'which': 'selected', 'force': self._checkbox_force_refresh.value}
         self._controller.command_update_results(data)
 
     def _on_update_location_button(self, _obj):
@@ -887,7 +932,8 @@ class HutsTableView(_HutsView):
         box_right.add(date_sizer)
         box_right.add(self._retrieve_info_label, align=Align.EXPAND, border=(10, 10, 0, 10))
         box_right.add(self._get_displayed_results_button, align=Align.EXPAND, border=(0, 10, 5, 10))
-        box_right.add(self._get_selected_results_button, align=Align.EXPAND, border=(0, 10, 10, 10))
+        box_right.add(self._get_selected_results_button, align=Align.EXPAND, border=(0, 10, 5, 10))
+        box_right.add(self._checkbox_force_refresh, align=Align.EXPAND, border=(0, 10, 10, 10))
         box_right.add(self._reference_label, align=Align.EXPAND, border=(10, 10, 5, 10))
         box_right.add(self._latitude_label, align=Align.EXPAND, border=(0, 10, 0, 10))
         box_right.add(self._latitude_widget, align=Align.EXPAND, border=(0, 10, 5, 10))
@@ -928,6 +974,7 @@ class HutsMapView(_HutsView):
     _DEFAULT_MAP_ZOOM = 6
     _MAP_MIN_ZOOM = 6
     _MAP_MAX_ZOOM = 13
+    _MAP_REDRAW_DELAY = 0.5  # [s]
 
     def __init__(self, *, parent=None, **kwargs):
         """Initialise the frame.
@@ -943,9 +990,12 @@ class HutsMapView(_HutsView):
         self._right_drag_start = None
         self._measure_distance_start = None
         self._keep_window = False
+        self._viewport = None
         self._reference_location = None
         self._displayed = None
         self._selected = None
+        self._map_outdated = False
+        self._map_redraw_timer = None
         super().__init__(parent=parent, title=i18n.all_strings['map title'], **kwargs)
         self._create_gui()
 
@@ -978,6 +1028,8 @@ class HutsMapView(_HutsView):
         self._checkbox_reference = CheckBox(parent=self,
                                             on_click=self._on_reference_check)
 
+        self._checkbox_force_refresh = CheckBox(parent=self, value=False)
+
         self._huts_choice = RadioBox(parent=self,
                                      num_choices=2,
                                      on_click=self._on_huts_choice)
@@ -1013,7 +1065,8 @@ class HutsMapView(_HutsView):
 
     def _on_get_huts_info(self, _obj):
         """Command the retrieval of huts data for all huts shown on the map."""
-        data = {'which': 'displayed' if self._huts_choice.selection == 0 else 'selected'}
+        data = {'which': 'displayed' if self._huts_choice.selection == 0 else 'selected',
+                'force': self._checkbox_force_refresh.value}
         self._controller.command_update_results(data)
 
     def on_update_gui(self, data):
@@ -1022,7 +1075,12 @@ class HutsMapView(_HutsView):
         :param data: the data to use to update the frame
         """
         super().on_update_gui(data)
-        self._update_shown_huts()
+        if 'map_redraw' in data:
+            self._map_redraw_timer = None
+            if self._map_outdated:
+                self._update_map()
+        if data.keys() - {'hut_data', 'map_redraw'}:
+            self._update_shown_huts()
 
     def _update_huts_data(self, huts_data):
         """Update the huts information with the provided data.
@@ -1031,6 +1089,22 @@ class HutsMapView(_HutsView):
         """
         self._huts_data = huts_data
 
+    def _update_hut_data(self, hut_data):
+        """Update the icons of the huts whose data have just been retrieved.
+        The map is not regenerated for each hut: the redraw is delayed, so that the results arriving in the meantime
+        are shown together.
+
+        :param hut_data: the data to use to update the huts information, with hut index as key
+        """
+        for index, data in hut_data.items():
+            self._huts_data[index] = data
+            self._hut_map.update_hut_status(index, data['status'])
+        self._map_outdated = True
+        if self._map_redraw_timer is None:
+            self._map_redraw_timer = threading.Timer(self._MAP_REDRAW_DELAY, self.update_gui, ({'map_redraw': None},))
+            self._map_redraw_timer.daemon = True
+            self._map_redraw_timer.start()
+
     def _on_huts_choice(self, _obj):
         """Show on the map all the displayed or only the selected huts based on the checkbox selection."""
         self._update_shown_huts()
@@ -1053,8 +1127,13 @@ class HutsMapView(_HutsView):
         self._checkbox_no_response.value = 'response' in filter_displayed_keys
 
     def _update_map(self):
-        """Regenerate and update the displayed map."""
+        """Regenerate and update the displayed map, notifying the controller if the shown window has changed."""
+        self._map_outdated = False
         self._bitmap.bitmap = self._hut_map.get_map_image()
+        viewport = self._hut_map.get_lat_lon_map_limits()
+        if viewport != self._viewport:
+            self._viewport = viewport
+            self._controller.command_update_viewport({'window': viewport})
 
     def _update_selected(self, data):
         """Update the selected huts.
@@ -1458,6 +1537,7 @@ class HutsMapView(_HutsView):
         self._request_date_label.label = i18n.all_strings['request date']
         self._number_days_label.label = i18n.all_strings['number of days']
         self._get_results_button.label = i18n.all_strings['retrieve shown']
+        self._checkbox_force_refresh.label = i18n.all_strings['force refresh']
         self._checkbox_no_response.label = i18n.all_strings['hide no response']
         self._checkbox_closed.label = i18n.all_strings['hide closed']
         self._checkbox_reference.label = i18n.all_strings['show reference']
@@ -1475,7 +1555,8 @@ class HutsMapView(_HutsView):
         box_right = VBoxLayout()
         date_sizer = self._create_date_gui()
         box_right.add(date_sizer)
-        box_right.add(self._get_results_button, align=Align.EXPAND, border=10)
+        box_right.add(self._get_results_button, align=Align.EXPAND, border=(10, 10, 5, 10))
+        box_right.add(self._checkbox_force_refresh, align=Align.EXPAND, border=(0, 15, 5, 15))
         box_right.add_space(5)
         box_checkboxes = VBoxLayout()
         box_checkboxes.add(self._checkbox_no_response, border=5)
@@ -1568,6 +1649,8 @@ class DetailedInfoView(_HutsInfoFrame):
         """
         if 'huts_data' in data:
             self._update_huts_data(data['huts_data'])
+        if 'hut_data' in data and self._index in data['hut_data']:
+            self._update_huts_data(data['hut_data'])
         if 'retrieve_enabled' in data:
             self._update_gui_for_retrieve_enabled(data['retrieve_enabled'])
         if 'language' in data:
@@ -1905,7 +1988,7 @@ class SelectedInfoView(_HutsInfoFrame):
 
 
 class DeveloperInfoView(Frame):
-    """Define the frame used to show information for the developer (warnings and errors)
+    """Define the frame used to show information for the developer (warnings, errors and performance metrics)
 
     Methods:
         From superclass:
@@ -1930,7 +2013,7 @@ class DeveloperInfoView(Frame):
     def __init__(self, info_type, **kwargs):
         """Initialise the frame.
 
-        :param info_type: the type of information to be shown (warnings or errors)
+        :param info_type: the type of information to be shown (warning, error or metrics)
         :param kwargs: additional parameters for superclass
         """
         self._developer_info = None
@@ -1988,8 +2071,11 @@ class DeveloperInfoView(Frame):
         self._main_label.label = i18n.all_strings[label_id]
 
     def _on_log(self, _obj):
-        """Save a log file."""
-        config.save_log(self._info_type, self._developer_info)
+        """Save a log file (for the performance metrics, a file in the Prometheus text format)."""
+        if self._info_type == 'metrics':
+            config.save_metrics(metrics.export_prometheus())
+        else:
+            config.save_log(self._info_type, self._developer_info)
         self._log_button.enable(False)
 
     def _on_ok(self, _obj):
@@ -48,6 +48,7 @@ class HutsGrid(Grid):
 
     Methods:
         update_data: update the data of the table
+        update_hut_data: update the data of the table for some huts only
 
         From superclass:
         on_cell_left_click: executed when a left click is performed on a cell
@@ -109,6 +110,14 @@ class HutsGrid(Grid):
         if filter_keys is not None:
             self._filter_keys = filter_keys
 
+    def update_hut_data(self, hut_data):
+        """Update the data of the table for some huts only (the order of the rows is not changed).
+
+        :param hut_data: the dictionary with the new information about the huts, with hut index as key
+        """
+        if self._data_dictionary is not None:
+            self._data_dictionary.update(hut_data)
+
     def _get_number_rows(self):
         """Return the number of rows of the table.
 
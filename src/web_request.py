@@ -2,13 +2,22 @@
 Management of web requests of data and pages.
 
 Variables:
-    errors: list containing the errors occurred during web requests
+    errors: registry of the errors occurred during web requests
 
 Functions:
     configure: configure the necessary data for the web requests
+    perform_web_requests_for_huts: perform the web requests retrieving the data about free beds for a group of huts
     perform_web_request_for_hut: perform the web request retrieving the data about free beds for a hut
+    reprioritise: invalidate the priorities of the huts waiting for a web request
+    Cancellation: cancellation of a group of web requests, aborting the requests in flight
+    get_connection_statistics: get the statistics about the reuse of the pooled connections
+    get_current_rate: get the current aggregate request rate set by the adaptive rate controller
+    set_shared_budget: set the request budget shared with other processes
+    get_hut_info_cache: get the cache of the hut information (room categories and labels, language, name)
+    invalidate_hut_info: force the invalidation of the cached hut information
     open_hut_page: open the web page of a hut in the browser
     search_for_updates: search for application updates
+    confirm_update: record that a downloaded update has been installed
 """
 import webbrowser
 import requests
@@ -17,20 +26,79 @@ import datetime
 import time
 import pathlib
 import hashlib
-from threading import Thread
+import os
+import email.utils
+import random
+import re
+import heapq
+import functools
+import copy
+import io
+import shutil
+import tarfile
+from collections import deque
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+import socket
+from threading import Thread, Lock, Condition, Event, local
 
 from src import config
+from src import metrics
+from src.error_registry import ErrorRegistry
 
-errors = []
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-_REQUEST_DELAY = 1.0  # seconds: determines the minimum delay between two web requests
+errors = ErrorRegistry()
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+_DEFAULT_REQUEST_RATE = 1.0  # requests per second: determines the (initial) aggregate rate of the web requests
+_DEFAULT_MIN_REQUEST_RATE = 0.2  # requests per second
+_DEFAULT_MAX_REQUEST_RATE = 2.0  # requests per second
+_DEFAULT_MAX_CONCURRENT_REQUESTS = 2  # maximum number of web requests in flight at the same time
+_DEFAULT_ADAPTIVE_REQUEST_RATE = True
+_RATE_INCREASE_STEP = 0.2  # requests per second: additive increase of the rate for each second of healthy responses
+_RATE_DECREASE_FACTOR = 0.5  # multiplicative decrease of the rate and concurrency on overload signals
+_DECREASE_HOLD_TIME = 2.0  # seconds: minimum time between two decreases (concurrent failures count once)
+_TTFB_SMOOTHING = 0.1  # smoothing factor of the baseline time to first byte
+_TTFB_RISE_FACTOR = 3.0  # ratio to the baseline above which the time to first byte is considered rising
+_TTFB_MIN_RISE = 0.5  # seconds: minimum time to first byte considered rising
+_MAX_RETRY_AFTER = 120.0  # seconds: maximum pause accepted from a Retry-After header
+_OVERLOAD_STATUS_CODES = (429, 502, 503, 504)
+_RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+_DEFAULT_REQUEST_RETRIES = 3
+_BACKOFF_BASE = 0.5  # seconds: delay before the first retry (before jitter)
+_MAX_BACKOFF = 30.0  # seconds
+_LATENCY_SAMPLES = 200  # number of recent latencies used to derive the timeout
+_MIN_LATENCY_SAMPLES = 20  # number of latencies required before the timeout is derived from them
+_TIMEOUT_PERCENTILE = 0.99
+_TIMEOUT_FACTOR = 4.0  # ratio between the timeout and the latency percentile
+_MIN_TIMEOUT = 1.0  # seconds
+_MAX_TIMEOUT = 20.0  # seconds
+_DEFAULT_CIRCUIT_BREAKER_THRESHOLD = 3  # consecutive failures opening the circuit of a hut
+_DEFAULT_CIRCUIT_BREAKER_COOLDOWN = 300.0  # seconds
+_DEFAULT_CONNECTION_POOL_SIZE = 10  # maximum number of connections kept alive for each host
+_DEFAULT_CONNECTION_KEEP_ALIVE = True
+_DEFAULT_HUT_INFO_CACHE_EXPIRATION = 30  # days
+_DEFAULT_HTTP_CACHE = True
+_HTTP_CACHE_PATH = config.ASSETS_PATH_CACHE / 'http'
+_UPDATE_STATE_FILE = config.ASSETS_PATH_CACHE / 'updates.json'
+_PARTIAL_DOWNLOADS_PATH = config.ASSETS_PATH_CACHE / 'downloads'
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024  # bytes
+_TILE_PATH_PATTERN = re.compile(r'\d+/\d+/\d+\.png')  # path of a tile in the manifest of the tiles
 _WEB_DATE_FORMAT = '%d.%m.%Y'
 _DAY_DELTA = datetime.timedelta(days=1.0)
 _HUT_PAGE = '/reservation/book-hut/{0}/wizard'
-_TIMEOUT = 5.0
+_TIMEOUT = 5.0  # seconds: default timeout, used for large downloads and until enough latencies are observed
+_CANCEL_POLL_INTERVAL = 0.1  # seconds: interval of the checks for cancellation while waiting for another request
 _DEFAULT_MAX_NIGHTS = 14
 _DEFAULT_ROOM_BASIC_TYPES = {'default_type': 'shared'}
 _HUT_STATUS_TYPES = ['SERVICED', 'UNSERVICED', 'CLOSED']
+_SUCCESS_STATUS_CODES = (requests.codes.ok, requests.codes.not_modified)
 _HEADERS = {
     "User-Agent":
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 "
@@ -39,16 +107,47 @@ _HEADERS = {
 
 _configured = False
 _max_nights = 0
-_last_request = None
+_max_concurrent_requests = _DEFAULT_MAX_CONCURRENT_REQUESTS
+_max_retries = _DEFAULT_REQUEST_RETRIES
+_session = None
+_session_settings = None
+_connection_statistics = {'requests': 0, 'connections': 0, 'connect_time': 0.0}
+_connection_statistics_lock = Lock()
+_hut_info_cache = {}
+_hut_info_cache_lock = Lock()
+_hut_info_cache_expiration = datetime.timedelta(days=_DEFAULT_HUT_INFO_CACHE_EXPIRATION)
+_http_cache_enabled = _DEFAULT_HTTP_CACHE
+_priority_generation = 0
+_shared_budget = None
 _base_url = ""
 _updates_url = ""
 _room_basic_types = {}
-_update_cancelled = False
+_request_context = local()
+
+# Metrics of the web requests, labelled by request type ('hut_info', 'availability', 'data_file', 'tile')
+_requests_metric = metrics.counter('web_requests_total', "Number of web requests, by request type and status")
+_connect_time_metric = metrics.histogram('web_request_connect_seconds',
+                                         "Time spent opening new connections for the web requests")
+_ttfb_metric = metrics.histogram('web_request_ttfb_seconds', "Time to the first byte of the responses")
+_duration_metric = metrics.histogram('web_request_duration_seconds',
+                                     "Total time of the web requests, including the download of the responses")
+_response_size_metric = metrics.histogram('web_response_bytes', "Size of the bodies of the responses",
+                                          metrics.SIZE_BUCKETS)
+_parse_time_metric = metrics.histogram('web_parse_seconds', "Time spent decoding and parsing the responses")
+_update_cancellation = None
+
+
+class RequestCancelled(Exception):
+    """Exception raised when a web request is aborted because it has been cancelled."""
 
 
 def configure():
-    """Configure the necessary data for the web requests (URLs, maximum number of nights, room types)."""
-    global _base_url, _updates_url, _max_nights, _room_basic_types, _configured
+    """
+    Configure the necessary data for the web requests
+    (URLs, maximum number of nights, room types, rate limits, cached hut information).
+    """
+    global _base_url, _updates_url, _max_nights, _room_basic_types, _max_concurrent_requests, _max_retries, \
+        _hut_info_cache_expiration, _http_cache_enabled, _configured
 
     _base_url = config.get('BASE_URL', True)
     _updates_url = config.get('UPDATES_URL', True)
@@ -58,88 +157,1259 @@ def configure():
     _room_basic_types = config.ROOM_BASIC_TYPES
     if _room_basic_types is None:
         _room_basic_types = _DEFAULT_ROOM_BASIC_TYPES
+    request_rate = config.REQUEST_RATE
+    if request_rate is None or request_rate <= 0:
+        request_rate = _DEFAULT_REQUEST_RATE
+    min_request_rate = config.MIN_REQUEST_RATE
+    if min_request_rate is None or min_request_rate <= 0:
+        min_request_rate = _DEFAULT_MIN_REQUEST_RATE
+    max_request_rate = config.MAX_REQUEST_RATE
+    if max_request_rate is None or max_request_rate <= 0:
+        max_request_rate = _DEFAULT_MAX_REQUEST_RATE
+    _max_concurrent_requests = config.MAX_CONCURRENT_REQUESTS
+    if _max_concurrent_requests is None or _max_concurrent_requests < 1:
+        _max_concurrent_requests = _DEFAULT_MAX_CONCURRENT_REQUESTS
+    adaptive_request_rate = config.ADAPTIVE_REQUEST_RATE
+    if adaptive_request_rate is None:
+        adaptive_request_rate = _DEFAULT_ADAPTIVE_REQUEST_RATE
+    _rate_controller.configure(request_rate, min(min_request_rate, request_rate), max(max_request_rate, request_rate),
+                               _max_concurrent_requests, adaptive_request_rate)
+    _max_retries = config.REQUEST_RETRIES
+    if _max_retries is None or _max_retries < 0:
+        _max_retries = _DEFAULT_REQUEST_RETRIES
+    circuit_breaker_threshold = config.CIRCUIT_BREAKER_THRESHOLD
+    if circuit_breaker_threshold is None:
+        circuit_breaker_threshold = _DEFAULT_CIRCUIT_BREAKER_THRESHOLD
+    circuit_breaker_cooldown = config.CIRCUIT_BREAKER_COOLDOWN
+    if circuit_breaker_cooldown is None:
+        circuit_breaker_cooldown = _DEFAULT_CIRCUIT_BREAKER_COOLDOWN
+    _circuit_breaker.configure(circuit_breaker_threshold, circuit_breaker_cooldown)
+    pool_size = config.CONNECTION_POOL_SIZE
+    if pool_size is None or pool_size < 1:
+        pool_size = _DEFAULT_CONNECTION_POOL_SIZE
+    keep_alive = config.CONNECTION_KEEP_ALIVE
+    if keep_alive is None:
+        keep_alive = _DEFAULT_CONNECTION_KEEP_ALIVE
+    _configure_session(max(pool_size, _max_concurrent_requests), keep_alive)
+    hut_info_cache_expiration = config.HUT_INFO_CACHE_EXPIRATION
+    if hut_info_cache_expiration is None:
+        hut_info_cache_expiration = _DEFAULT_HUT_INFO_CACHE_EXPIRATION
+    _hut_info_cache_expiration = datetime.timedelta(days=hut_info_cache_expiration)
+    _http_cache_enabled = config.HTTP_CACHE
+    if _http_cache_enabled is None:
+        _http_cache_enabled = _DEFAULT_HTTP_CACHE
+    # The cached hut information is loaded only once: after a reload of the configuration, the cache in memory is
+    # more recent than the one in the file
+    cached_hut_info = config.HUT_INFO_DICTIONARY
+    with _hut_info_cache_lock:
+        if not _hut_info_cache and cached_hut_info is not None:
+            _hut_info_cache.update(cached_hut_info)
     _configured = True
 
 
-def perform_web_request_for_hut(index, hut):
+def get_current_rate():
+    """Get the current aggregate request rate set by the adaptive rate controller.
+
+    :return: the current request rate [requests per second]
+    """
+    return _rate_controller.rate
+
+
+def set_shared_budget(acquire):
+    """Set the request budget shared with other processes (e.g. the other processes of a sharded crawl).
+
+    The budget limits the aggregate request rate of all the processes, in addition to the rate limits of this process.
+
+    :param acquire: function waiting until a web request can be performed within the budget, returning False if
+                    the request has been cancelled while waiting (signature: (Cancellation) -> bool);
+                    if None, no shared budget is used
+    """
+    global _shared_budget
+    _shared_budget = acquire
+
+
+def get_hut_info_cache():
+    """Get the cache of the hut information (room categories and labels, preferred language, name).
+
+    :return: a copy of the dictionary of cached hut information, with hut index as key
+    """
+    with _hut_info_cache_lock:
+        return {index: hut_info.copy() for index, hut_info in _hut_info_cache.items()}
+
+
+def invalidate_hut_info(indexes=None):
+    """Force the invalidation of the cached hut information, which will be retrieved again at the next request.
+
+    :param indexes: the indexes of the huts whose information has to be invalidated (if None: all huts)
+    """
+    with _hut_info_cache_lock:
+        if indexes is None:
+            _hut_info_cache.clear()
+        else:
+            for index in indexes:
+                _hut_info_cache.pop(index, None)
+
+
+def get_connection_statistics():
+    """Get the statistics about the reuse of the pooled connections.
+
+    The handshake time saved is estimated from the average time spent to open the new connections.
+
+    :return: dictionary with the number of requests, of new and reused connections, the handshake times [seconds]
+             and the number of requests coalesced with a request in flight for the same hut
+    """
+    with _connection_statistics_lock:
+        number_requests = _connection_statistics['requests']
+        new_connections = _connection_statistics['connections']
+        connect_time = _connection_statistics['connect_time']
+    reused_connections = max(0, number_requests - new_connections)
+    average_connect_time = connect_time / new_connections if new_connections else 0.0
+    return {'requests': number_requests,
+            'new_connections': new_connections,
+            'reused_connections': reused_connections,
+            'reuse_ratio': reused_connections / number_requests if number_requests else 0.0,
+            'handshake_time': connect_time,
+            'saved_handshake_time': reused_connections * average_connect_time,
+            'coalesced_requests': _in_flight_requests.coalesced}
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    """
+    HTTP connection which records the number of opened connections and the time spent to open them.
+
+    The connection is attached to the cancellation of the request using it, so that it can be aborted.
+    """
+
+    def connect(self):
+        """Open the connection, recording the time spent."""
+        start = time.perf_counter()
+        super().connect()
+        _record_connection(time.perf_counter() - start)
+        _attach_connection(self)
+
+    def request(self, *args, **kwargs):
+        """Send a request on the connection, attaching it to the cancellation of the request."""
+        _attach_connection(self)
+        super().request(*args, **kwargs)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    """
+    HTTPS connection which records the number of opened connections and the time spent for TCP and TLS setup.
+
+    The connection is attached to the cancellation of the request using it, so that it can be aborted.
+    """
+
+    def connect(self):
+        """Open the connection, recording the time spent."""
+        start = time.perf_counter()
+        super().connect()
+        _record_connection(time.perf_counter() - start)
+        _attach_connection(self)
+
+    def request(self, *args, **kwargs):
+        """Send a request on the connection, attaching it to the cancellation of the request."""
+        _attach_connection(self)
+        super().request(*args, **kwargs)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    """HTTP connection pool using timed connections."""
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    """HTTPS connection pool using timed connections."""
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _PooledAdapter(HTTPAdapter):
+    """Transport adapter keeping a pool of timed connections alive for each host."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Initialize the pool manager, replacing the connection pool classes with the timed ones."""
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _TimedHTTPConnectionPool,
+                                                   'https': _TimedHTTPSConnectionPool}
+
+
+class _ResponseCache:
+    """
+    On-disk cache of web responses, used to revalidate them with conditional requests.
+
+    For each URL the body of the last successful response is stored together with its validators
+    (ETag and Last-Modified headers); responses without validators are not cached.
+
+    Methods:
+        conditional_headers: get the headers for a conditional request of a URL
+        store: store the body and the validators of a response
+        load_body: load the cached body of a URL
+    """
+
+    def __init__(self, path):
+        """Create the response cache.
+
+        :param path: folder where the cached responses are stored
+        """
+        self._path = path
+        self._lock = Lock()
+
+    def conditional_headers(self, url):
+        """Get the headers for a conditional request of a URL, based on the cached validators.
+
+        :param url: the requested URL
+        :return: dictionary of conditional headers (empty if the URL is not cached)
+        """
+        validators = self._load_validators(url)
+        headers = {}
+        if validators is not None:
+            if validators['etag'] is not None:
+                headers['If-None-Match'] = validators['etag']
+            if validators['last_modified'] is not None:
+                headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def store(self, url, response):
+        """Store the body and the validators of a successful response.
+
+        :param url: the requested URL
+        :param response: the requests Response object
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag is None and last_modified is None:
+            return
+        validators = {'url': url, 'etag': etag, 'last_modified': last_modified}
+        body_file, validators_file = self._files(url)
+        with self._lock:
+            try:
+                self._path.mkdir(parents=True, exist_ok=True)
+                temp_body_file = body_file.with_suffix('.tmp')
+                with open(temp_body_file, 'wb') as f:
+                    f.write(response.content)
+                os.replace(temp_body_file, body_file)
+                with open(validators_file, 'w', encoding='UTF-8') as f:
+                    f.write(json.dumps(validators))
+            except IOError as e:
+                errors.append({'type': type(e), 'message': str(e)})
+
+    def load_body(self, url):
+        """Load the cached body of a URL.
+
+        :param url: the requested URL
+        :return: the cached body (bytes) or None if the URL is not cached
+        """
+        body_file, _ = self._files(url)
+        with self._lock:
+            try:
+                with open(body_file, 'rb') as f:
+                    return f.read()
+            except IOError:
+                return None
+
+    def _load_validators(self, url):
+        """Load the cached validators of a URL.
+
+        :param url: the requested URL
+        :return: dictionary of validators or None if the URL is not cached
+        """
+        _, validators_file = self._files(url)
+        with self._lock:
+            try:
+                with open(validators_file, encoding='UTF-8') as f:
+                    validators = json.load(f)
+            except (IOError, json.JSONDecodeError):
+                return None
+        return validators if validators.get('url') == url else None
+
+    def _files(self, url):
+        """Get the paths of the files where body and validators of a URL are stored.
+
+        :param url: the requested URL
+        :return: tuple of paths of the body file and of the validators file
+        """
+        name = hashlib.sha1(url.encode('UTF-8')).hexdigest()
+        return self._path / (name + '.body'), self._path / (name + '.json')
+
+
+_response_cache = _ResponseCache(_HTTP_CACHE_PATH)
+
+
+def _record_connection(connect_time):
+    """Record the opening of a new connection.
+
+    :param connect_time: time spent to open the connection [seconds]
+    """
+    _request_context.connect_time = getattr(_request_context, 'connect_time', 0.) + connect_time
+    with _connection_statistics_lock:
+        _connection_statistics['connections'] += 1
+        _connection_statistics['connect_time'] += connect_time
+
+
+class Cancellation:
+    """
+    Cancellation of a group of web requests.
+
+    When cancelled, the requests waiting for the rate limiter or for a retry are stopped and the connections of the
+    requests in flight are shut down, so that all the requests are aborted immediately (raising RequestCancelled).
+
+    Methods:
+        cancel: cancel the web requests
+        sleep: wait for the specified time, unless the web requests are cancelled
+    Properties:
+        cancelled: flag defining if the web requests have been cancelled
+    """
+
+    def __init__(self):
+        """Create the cancellation."""
+        self._event = Event()
+        self._connections = set()
+        self._lock = Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        """Cancel the web requests, aborting the requests in flight."""
+        with self._lock:
+            self._event.set()
+            connections = list(self._connections)
+        for connection in connections:
+            _abort_connection(connection)
+        _rate_limiter.interrupt()
+
+    def sleep(self, seconds):
+        """Wait for the specified time, unless the web requests are cancelled.
+
+        :param seconds: the time to wait [seconds]
+        :return: True if the web requests have been cancelled, False otherwise
+        """
+        return self._event.wait(seconds)
+
+    def attach(self, connection):
+        """Attach the connection used by a web request, aborting it if the web requests are already cancelled.
+
+        :param connection: the urllib3 connection
+        """
+        with self._lock:
+            self._connections.add(connection)
+            cancelled = self._event.is_set()
+        if cancelled:
+            _abort_connection(connection)
+
+    def detach(self, connections):
+        """Detach the connections used by a completed web request.
+
+        :param connections: the urllib3 connections
+        """
+        with self._lock:
+            self._connections.difference_update(connections)
+
+
+def _attach_connection(connection):
+    """Attach a connection to the cancellation of the web request performed by the current thread (if any).
+
+    :param connection: the urllib3 connection
+    """
+    cancellation = getattr(_request_context, 'cancellation', None)
+    if cancellation is not None:
+        _request_context.connections.append(connection)
+        cancellation.attach(connection)
+
+
+def _abort_connection(connection):
+    """Abort a connection, shutting down its socket so that the blocked reads and writes fail immediately.
+
+    :param connection: the urllib3 connection
+    """
+    sock = connection.sock
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def _configure_session(pool_size, keep_alive):
+    """Create the long-lived session shared by all the web requests, or update it if the settings have changed.
+
+    :param pool_size: maximum number of connections kept alive for each host
+    :param keep_alive: flag defining if connections are kept alive after each request
+    """
+    global _session, _session_settings
+
+    if _session is not None and _session_settings == (pool_size, keep_alive):
+        return
+    session = requests.Session()
+    adapter = _PooledAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    old_session = _session
+    _session = session
+    _session_settings = (pool_size, keep_alive)
+    if old_session is not None:
+        old_session.close()
+
+
+class _RateLimiter:
+    """
+    Token-bucket rate limiter shared by all the web requests.
+
+    The bucket is refilled at the configured aggregate rate and holds at most as many tokens as the allowed number
+    of requests in flight, so that short bursts are possible but the long-term rate is respected.
+
+    Methods:
+        set_limits: set the aggregate request rate and the maximum number of requests in flight
+        pause: suspend all the new requests for the specified time
+        acquire: wait until a new request can be performed
+        release: signal that a request has been completed
+        interrupt: wake up the waiting requests, so that they check for cancellation
+    """
+
+    def __init__(self, rate, max_in_flight):
+        """Create the rate limiter.
+
+        :param rate: aggregate request rate [requests per second]
+        :param max_in_flight: maximum number of requests in flight at the same time
+        """
+        self._condition = Condition()
+        self._rate = rate
+        self._max_in_flight = max_in_flight
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._in_flight = 0
+        self._paused_until = 0.0
+
+    def set_limits(self, rate, max_in_flight):
+        """Set the aggregate request rate and the maximum number of requests in flight.
+
+        :param rate: aggregate request rate [requests per second]
+        :param max_in_flight: maximum number of requests in flight at the same time
+        """
+        with self._condition:
+            self._refill()
+            self._rate = rate
+            self._max_in_flight = max_in_flight
+            self._tokens = min(self._tokens, self._capacity)
+            self._condition.notify_all()
+
+    def pause(self, seconds):
+        """Suspend all the new requests for the specified time.
+
+        :param seconds: duration of the pause [seconds]
+        """
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+    def acquire(self, cancellation=None):
+        """Wait until a token is available and the number of requests in flight is below the limit.
+
+        :param cancellation: the cancellation of the request (None if the request cannot be cancelled)
+        """
+        with self._condition:
+            while True:
+                if cancellation is not None and cancellation.cancelled:
+                    raise RequestCancelled()
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._condition.wait(pause)
+                    self._last_refill = time.monotonic()
+                    continue
+                self._refill()
+                if self._tokens >= 1.0 and self._in_flight < self._max_in_flight:
+                    self._tokens -= 1.0
+                    self._in_flight += 1
+                    return
+                if self._tokens < 1.0:
+                    self._condition.wait((1.0 - self._tokens) / self._rate)
+                else:
+                    self._condition.wait()
+
+    def release(self):
+        """Signal that a request has been completed, freeing its in-flight slot."""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def interrupt(self):
+        """Wake up the waiting requests, so that they check for cancellation."""
+        with self._condition:
+            self._condition.notify_all()
+
+    @property
+    def _capacity(self):
+        """Return the maximum number of tokens in the bucket.
+
+        :return: the maximum number of tokens in the bucket
+        """
+        return float(max(1, self._max_in_flight))
+
+    def _refill(self):
+        """Add the tokens accumulated since the last refill, up to the bucket capacity."""
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._rate)
+        self._last_refill = now
+
+
+_rate_limiter = _RateLimiter(_DEFAULT_REQUEST_RATE, _DEFAULT_MAX_CONCURRENT_REQUESTS)
+
+
+class _RateController:
+    """
+    Adaptive controller of the request rate and concurrency, driven by the feedback of the server (AIMD).
+
+    While responses are healthy, rate and number of requests in flight are increased additively;
+    on overload signals (status codes 429 and 5xx gateway/unavailable errors, timeouts, rising time to first byte)
+    they are decreased multiplicatively, and a Retry-After header suspends all the new requests.
+
+    Properties:
+        rate: the current request rate [requests per second]
+
+    Methods:
+        configure: configure the limits of the controller
+        on_response: update the limits after a response has been received
+        on_timeout: update the limits after a request has timed out
+    """
+
+    def __init__(self, limiter):
+        """Create the rate controller.
+
+        :param limiter: the rate limiter whose limits are controlled
+        """
+        self._limiter = limiter
+        self._lock = Lock()
+        self._adaptive = _DEFAULT_ADAPTIVE_REQUEST_RATE
+        self._rate = _DEFAULT_REQUEST_RATE
+        self._min_rate = _DEFAULT_MIN_REQUEST_RATE
+        self._max_rate = _DEFAULT_MAX_REQUEST_RATE
+        self._in_flight = self._max_in_flight = _DEFAULT_MAX_CONCURRENT_REQUESTS
+        self._baseline_ttfb = None
+        self._last_decrease = 0.0
+
+    @property
+    def rate(self):
+        """Return the current request rate.
+
+        :return: the current request rate [requests per second]
+        """
+        return self._rate
+
+    def configure(self, rate, min_rate, max_rate, max_in_flight, adaptive):
+        """Configure the limits of the controller.
+
+        :param rate: initial request rate [requests per second]
+        :param min_rate: minimum request rate [requests per second]
+        :param max_rate: maximum request rate [requests per second]
+        :param max_in_flight: maximum number of requests in flight at the same time
+        :param adaptive: flag defining if the limits are adapted (if False, rate and concurrency are fixed)
+        """
+        with self._lock:
+            self._adaptive = adaptive
+            self._rate = rate
+            self._min_rate = min_rate
+            self._max_rate = max_rate
+            self._max_in_flight = max_in_flight
+            self._in_flight = min(2, max_in_flight) if adaptive else max_in_flight
+            self._baseline_ttfb = None
+            self._apply()
+
+    def on_response(self, status_code, ttfb, retry_after=None):
+        """
+        Update the limits after a response has been received.
+
+        Only successful responses (2xx or 304) can increase the limits: client errors (e.g. unknown huts or a blocked
+        client) do not show that the server can sustain a higher rate, so they leave the limits unchanged.
+
+        :param status_code: status code of the response
+        :param ttfb: time to first byte of the response [seconds]
+        :param retry_after: value of the Retry-After header of the response, if any
+        """
+        if retry_after is not None:
+            pause = _parse_retry_after(retry_after)
+            if pause is not None:
+                self._limiter.pause(min(pause, _MAX_RETRY_AFTER))
+        if not self._adaptive:
+            return
+        with self._lock:
+            if status_code in _OVERLOAD_STATUS_CODES:
+                self._decrease()
+            elif 200 <= status_code < 300 or status_code == requests.codes.not_modified:
+                if self._baseline_ttfb is None:
+                    self._baseline_ttfb = ttfb
+                if ttfb > max(_TTFB_RISE_FACTOR * self._baseline_ttfb, _TTFB_MIN_RISE):
+                    self._decrease()
+                else:
+                    self._baseline_ttfb += _TTFB_SMOOTHING * (ttfb - self._baseline_ttfb)
+                    self._increase()
+
+    def on_timeout(self):
+        """Update the limits after a request has timed out."""
+        if not self._adaptive:
+            return
+        with self._lock:
+            self._decrease()
+
+    def _increase(self):
+        """
+        Increase additively the rate and, when the requests in flight needed to sustain it (Little's law,
+        with a margin of two) exceed the current limit, the concurrency.
+        """
+        # Each healthy response contributes to the increase so that the rate grows linearly in time
+        self._rate = min(self._max_rate, self._rate + _RATE_INCREASE_STEP / max(1.0, self._rate))
+        if 2 * self._rate * self._baseline_ttfb > self._in_flight and self._in_flight < self._max_in_flight:
+            self._in_flight += 1
+        self._apply()
+
+    def _decrease(self):
+        """Decrease multiplicatively the rate and the concurrency (at most once in the hold time)."""
+        now = time.monotonic()
+        if now - self._last_decrease < _DECREASE_HOLD_TIME:
+            return
+        self._last_decrease = now
+        self._rate = max(self._min_rate, self._rate * _RATE_DECREASE_FACTOR)
+        self._in_flight = max(1, int(self._in_flight * _RATE_DECREASE_FACTOR))
+        self._apply()
+
+    def _apply(self):
+        """Apply the current limits to the rate limiter."""
+        self._limiter.set_limits(self._rate, self._in_flight)
+
+
+_rate_controller = _RateController(_rate_limiter)
+
+
+def _parse_retry_after(retry_after):
+    """Parse the value of a Retry-After header, which can be a number of seconds or an HTTP date.
+
+    :param retry_after: the value of the header
+    :return: the time to wait [seconds] or None if the value is not valid
+    """
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_date = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_date - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class _LatencyTracker:
+    """
+    Tracker of the latencies (time to first byte) of the recent successful requests,
+    used to derive the request timeout from their percentiles.
+
+    Methods:
+        add: add the latency of a successful request
+        timeout: get the timeout for a request
+    """
+
+    def __init__(self, size):
+        """Create the latency tracker.
+
+        :param size: number of recent latencies to be tracked
+        """
+        self._latencies = deque(maxlen=size)
+        self._lock = Lock()
+
+    def add(self, latency):
+        """Add the latency of a successful request.
+
+        :param latency: the latency of the request [seconds]
+        """
+        with self._lock:
+            self._latencies.append(latency)
+
+    def timeout(self, attempt=0):
+        """
+        Get the timeout for a request: a multiple of the high percentile of the recent latencies,
+        doubled at each retry attempt; the default timeout is used until enough latencies have been observed.
+
+        :param attempt: number of the attempt (starting from 0)
+        :return: the timeout [seconds]
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < _MIN_LATENCY_SAMPLES:
+            timeout = _TIMEOUT
+        else:
+            percentile = latencies[min(len(latencies) - 1, int(_TIMEOUT_PERCENTILE * len(latencies)))]
+            timeout = min(_MAX_TIMEOUT, max(_MIN_TIMEOUT, _TIMEOUT_FACTOR * percentile))
+        return min(_MAX_TIMEOUT, timeout * 2 ** attempt)
+
+
+_latency_tracker = _LatencyTracker(_LATENCY_SAMPLES)
+
+
+class _CircuitBreaker:
+    """
+    Per-hut circuit breaker, which stops the requests for the huts failing repeatedly.
+
+    After a number of consecutive failures, the circuit of a hut opens and no request is performed until a
+    cooldown time has elapsed; then a single trial request is allowed, which closes the circuit if successful.
+
+    Methods:
+        configure: configure the failure threshold and the cooldown time
+        allow_request: check if a request can be performed for a hut
+        record_success: record a successful request for a hut
+        record_failure: record a failed request for a hut
+    """
+
+    def __init__(self):
+        """Create the circuit breaker."""
+        self._threshold = _DEFAULT_CIRCUIT_BREAKER_THRESHOLD
+        self._cooldown = _DEFAULT_CIRCUIT_BREAKER_COOLDOWN
+        self._failures = {}
+        self._opened = {}
+        self._lock = Lock()
+
+    def configure(self, threshold, cooldown):
+        """Configure the failure threshold and the cooldown time.
+
+        :param threshold: number of consecutive failures opening the circuit (0 disables the circuit breaker)
+        :param cooldown: time after which a trial request is allowed [seconds]
+        """
+        with self._lock:
+            self._threshold = threshold
+            self._cooldown = cooldown
+
+    def allow_request(self, index):
+        """Check if a request can be performed for a hut.
+
+        :param index: id number of the hut
+        :return: True if the circuit is closed or a trial request is allowed, False otherwise
+        """
+        with self._lock:
+            opened = self._opened.get(index)
+            if opened is None:
+                return True
+            if time.monotonic() - opened < self._cooldown:
+                return False
+            # Half-open circuit: allow a single trial request, reopening the circuit for the other ones
+            self._opened[index] = time.monotonic()
+            return True
+
+    def record_success(self, index):
+        """Record a successful request for a hut, closing its circuit.
+
+        :param index: id number of the hut
+        """
+        with self._lock:
+            self._failures.pop(index, None)
+            self._opened.pop(index, None)
+
+    def record_failure(self, index):
+        """Record a failed request for a hut, opening its circuit if the failures reach the threshold.
+
+        :param index: id number of the hut
+        """
+        with self._lock:
+            self._failures[index] = self._failures.get(index, 0) + 1
+            if 0 < self._threshold <= self._failures[index]:
+                self._opened[index] = time.monotonic()
+
+
+_circuit_breaker = _CircuitBreaker()
+
+
+class _InFlightRequests:
+    """
+    Registry of the web requests in flight, keyed by hut index, used to coalesce concurrent requests for a hut.
+
+    The first caller requesting a hut performs the web request; the callers requesting the same hut while the
+    request is in flight wait for it and receive a copy of its result.
+
+    Methods:
+        join: register a request for a hut, attaching it to the request in flight if any
+        complete: publish the result of a request, releasing the waiting callers
+        wait: wait for the result of a request in flight, unless cancelled
+    Properties:
+        coalesced: number of requests attached to a request in flight
+    """
+
+    def __init__(self):
+        """Create the registry."""
+        self._pending = {}
+        self._coalesced = 0
+        self._lock = Lock()
+
+    @property
+    def coalesced(self):
+        return self._coalesced
+
+    def join(self, index):
+        """Register a request for a hut, attaching it to the request in flight if any.
+
+        :param index: id number of the hut
+        :return: None if the caller must perform the request, otherwise the pending request to be waited for
+        """
+        with self._lock:
+            pending = self._pending.get(index)
+            if pending is None:
+                self._pending[index] = {'done': Event(), 'result': None}
+                return None
+            self._coalesced += 1
+            return pending
+
+    def complete(self, index, result):
+        """Publish the result of a request, releasing the callers waiting for it.
+
+        :param index: id number of the hut
+        :param result: dictionary containing the retrieved information about free beds (None if not available)
+        """
+        with self._lock:
+            pending = self._pending.pop(index)
+        pending['result'] = result
+        pending['done'].set()
+
+    @staticmethod
+    def wait(pending, cancellation=None):
+        """Wait for the result of a request in flight, unless cancelled.
+
+        :param pending: the pending request returned by join
+        :param cancellation: the cancellation of the waiting request (None if it cannot be cancelled)
+        :return: a copy of the result of the request, None if not available or cancelled
+        """
+        while not pending['done'].wait(_CANCEL_POLL_INTERVAL):
+            if cancellation is not None and cancellation.cancelled:
+                return None
+        return copy.deepcopy(pending['result'])
+
+
+_in_flight_requests = _InFlightRequests()
+
+
+class _FetchQueue:
+    """
+    Queue of the huts waiting for a web request, ordered by priority.
+
+    Huts with equal priority (or all huts, if no priority function is provided) are fetched in the order in which
+    they were provided. The queue is re-ordered, before the next hut is extracted, every time the priorities are
+    invalidated by calling reprioritise.
+
+    Methods:
+        pop: extract the hut with the highest priority from the queue
+    """
+
+    def __init__(self, huts, priority=None):
+        """Create the queue.
+
+        :param huts: dictionary of information about the huts, with hut index as key
+        :param priority: function returning the sort key of a hut, lower keys first (signature: (int) -> any)
+        """
+        self._huts = dict(huts)
+        self._order = {index: position for position, index in enumerate(self._huts)}
+        self._priority = priority
+        self._generation = None
+        self._heap = []
+
+    def __len__(self):
+        return len(self._huts)
+
+    def pop(self):
+        """Extract the hut with the highest priority from the queue.
+
+        :return: tuple of the hut index and of the information about the hut
+        """
+        if self._generation != _priority_generation:
+            self._generation = _priority_generation
+            self._heap = [self._key(index) for index in self._huts]
+            heapq.heapify(self._heap)
+        *_, index = heapq.heappop(self._heap)
+        return index, self._huts.pop(index)
+
+    def _key(self, index):
+        """Get the heap entry of a hut.
+
+        :param index: id number of the hut
+        :return: tuple of the priority, of the original position and of the index of the hut
+        """
+        if self._priority is None:
+            return self._order[index], index
+        return self._priority(index), self._order[index], index
+
+
+def reprioritise():
+    """Invalidate the priorities of the huts waiting for a web request, which are re-ordered before the next request."""
+    global _priority_generation
+    _priority_generation += 1
+
+
+def perform_web_requests_for_huts(huts, observer=None, cancellation=None, revalidate=(), priority=None):
+    """
+    Perform the web requests retrieving the data about free beds for a group of huts.
+
+    The requests are executed by a bounded pool of worker threads; the aggregate request rate and the number
+    of requests in flight are limited by the shared rate limiter. The huts are fetched in order of priority;
+    the priorities are evaluated again whenever reprioritise is called while the requests are in progress.
+    When the requests are cancelled, the requests in flight are aborted and the results retrieved so far are returned.
+
+    :param huts: dictionary of information about the huts, with hut index as key
+    :param observer: function to be executed after the data of each hut have been retrieved (signature: (int, dict));
+                     it is executed by the worker threads, possibly concurrently
+    :param cancellation: the Cancellation of the requests (None if the requests cannot be cancelled)
+    :param revalidate: indexes of the huts whose results are already available to the caller
+                       (see perform_web_request_for_hut)
+    :param priority: function returning the sort key of a hut, lower keys are fetched first (signature: (int) -> any);
+                     if None, the huts are fetched in the provided order
+    :return: dictionary containing the retrieved information about free beds, with hut index as key
+    """
+    if not _configured:
+        configure()
+
+    results = {}
+    pending = _FetchQueue(huts, priority)
+    lock = Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending or (cancellation is not None and cancellation.cancelled):
+                    return
+                index, hut = pending.pop()
+            result = perform_web_request_for_hut(index, hut, index in revalidate, cancellation)
+            if result is None:
+                return
+            with lock:
+                results[index] = result
+            if observer is not None:
+                observer(index, result)
+
+    workers = [Thread(target=worker) for _ in range(min(_max_concurrent_requests, len(huts)))]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    return results
+
+
+def perform_web_request_for_hut(index, hut, revalidate=False, cancellation=None):
     """
     Perform the web request retrieving the data about free beds for a single hut.
 
     Data are retrieved from an HTML page and from a JSON file; each request covers an interval of 14 days.
+    If the results for the hut are already available to the caller, the request can be performed as a revalidation:
+    when the server reports that the availability data are not modified, the JSON data are not parsed at all and
+    the returned dictionary only contains the new request time, with the 'not_modified' key set to True.
+    Concurrent requests for the same hut are coalesced: if a request for the hut is already in flight, no new web
+    request is performed and a copy of the result of the request in flight is returned (unless it only reports
+    unmodified data to a caller without the results, in which case the web request is performed again).
+    If the hut is temporarily skipped after too many failed requests (circuit breaker open), no web request is
+    performed and the returned dictionary has the 'skipped' key set to True: it does not replace previous results.
 
     :param index: id number of the hut
     :param hut: dictionary of information about the hut
-    :return: dictionary containing the retrieved information about free beds
+    :param revalidate: flag defining if the results for the hut are already available to the caller
+    :param cancellation: the Cancellation of the request (None if the request cannot be cancelled)
+    :return: dictionary containing the retrieved information about free beds, None if the request has been cancelled
     """
-    global _last_request
-
     if not _configured:
         configure()
 
-    # Limit the rate of web requests by delaying the execution of the function if required
-    if _last_request is not None:
-        time_from_last_request = time.time() - _last_request
-        if time_from_last_request < _REQUEST_DELAY:
-            time.sleep(_REQUEST_DELAY - time_from_last_request)
+    pending = _in_flight_requests.join(index)
+    if pending is not None:
+        result = _in_flight_requests.wait(pending, cancellation)
+        if result is not None and (revalidate or not result.get('not_modified', False)):
+            return result
+        return _perform_web_request_for_hut(index, hut, revalidate, cancellation)
 
-    with requests.Session() as session:
-        result = {'warning': None, 'error': None,
-                  'hut_status': {}, 'places': {}, 'request_time': datetime.datetime.now()}
-        try:
-            _last_request = time.time()
-
-            # Retrieve the hut information
-            url_hut_info = _base_url + f"api/v1/reservation/hutInfo/{index}"
-            hut_info = session.get(url_hut_info, headers=_HEADERS, timeout=_TIMEOUT, verify=True)
-            if hut_info.status_code != requests.codes.ok:
-                errors.append({'type': f"Requests error on {hut_info.url}",
-                              'message': f"Status code: {hut_info.status_code}"})
-                raise Exception(f"Hut information error on hut {index}")
-
-            # Retrieve the availability information
-            url_availability = _base_url + f"api/v1/reservation/getHutAvailability?hutId={index}"
-            availability = session.get(url_availability, headers=_HEADERS, timeout=_TIMEOUT, verify=True)
-            if availability.status_code != requests.codes.ok:
-                errors.append({'type': f"Requests error on {availability.url}",
-                              'message': f"Status code: {availability.status_code}"})
-                raise Exception(f"Hut availability error on hut {index}")
-
-            hut_info_json = json.loads(hut_info.text)
-            hut_availability_json = json.loads(availability.text)
-
-            # Analyze the JSON data to find the required information
-            hut_id, hut_name, category_id_list, room_label_list = _parse_hut_info_json(hut_info_json)
-            if hut_id != index:
-                result['warning'] = 'Unexpected index: ' + hut_id
-            if hut_name != hut['name']:
-                result['warning'] = 'Unexpected name: ' + hut_name
-
-            hut_status, availabilities = _parse_hut_availability_json(hut_availability_json,
-                                                                      category_id_list, room_label_list)
-
-            for book_date in hut_status:
-                result['hut_status'][book_date] = hut_status[book_date]
-                result['places'][book_date] = {}
-                if hut_status[book_date] == "CLOSED":
-                    result['places'][book_date]['closed'] = 0
-                    continue
-                for room_label in availabilities[book_date]:
-                    if room_label in _room_basic_types:
-                        room_type = _room_basic_types[room_label]
-                    else:
-                        result['warning'] = 'Unexpected room type: ' + room_label
-                        room_type = _room_basic_types['default_type']
-                    if room_type not in result['places'][book_date]:
-                        result['places'][book_date][room_type] = availabilities[book_date][room_label]
-                    else:
-                        result['places'][book_date][room_type] += availabilities[book_date][room_label]
-
-        except Exception as e:
-            result['error'] = f'Error occurred: {e}'
+    result = None
+    try:
+        result = _perform_web_request_for_hut(index, hut, revalidate, cancellation)
+    finally:
+        _in_flight_requests.complete(index, result)
+    return result
+
+
+def _perform_web_request_for_hut(index, hut, revalidate, cancellation):
+    """Perform the web request retrieving the data about free beds for a single hut, without coalescing.
+
+    :param index: id number of the hut
+    :param hut: dictionary of information about the hut
+    :param revalidate: flag defining if the results for the hut are already available to the caller
+    :param cancellation: the Cancellation of the request (None if the request cannot be cancelled)
+    :return: dictionary containing the retrieved information about free beds, None if the request has been cancelled
+    """
+    if cancellation is not None and cancellation.cancelled:
+        return None
+    session = _session
+    result = {'warning': None, 'error': None,
+              'hut_status': {}, 'places': {}, 'request_time': datetime.datetime.now()}
+    if not _circuit_breaker.allow_request(index):
+        result['error'] = 'Error occurred: too many failed requests, hut temporarily skipped'
+        result['skipped'] = True
+        return result
+    try:
+        # Retrieve the hut information (from the cache if recent enough)
+        hut_info = _get_hut_info(session, index, cancellation)
+
+        # Retrieve the availability information
+        url_availability = _base_url + f"api/v1/reservation/getHutAvailability?hutId={index}"
+        availability = _get(session, url_availability, use_cache=True, cancellation=cancellation,
+                            request_type='availability', headers=_HEADERS, verify=True)
+        if availability.status_code not in _SUCCESS_STATUS_CODES:
+            errors.append({'type': f"Requests error on {availability.url}",
+                          'message': f"Status code: {availability.status_code}"})
+            raise Exception(f"Hut availability error on hut {index}")
+
+        if revalidate and availability.status_code == requests.codes.not_modified:
+            _circuit_breaker.record_success(index)
+            result['not_modified'] = True
+            return result
+
+        parse_start_time = time.perf_counter()
+        hut_availability_json = _json_loads(availability.content)
+        parse_time = time.perf_counter() - parse_start_time
+
+        # If the availability refers to bed categories unknown to the cached hut information, the cache may be
+        # outdated and the hut information is retrieved again. The categories still unknown to the retrieved hut
+        # information are recorded with it (they are ignored by the parser), so that they do not cause the retrieval
+        # of the hut information again at the next requests
+        unknown_categories = _get_unknown_categories(hut_availability_json, hut_info)
+        if unknown_categories and hut_info['cached']:
+            invalidate_hut_info([index])
+            hut_info = _get_hut_info(session, index, cancellation)
+            unknown_categories = _get_unknown_categories(hut_availability_json, hut_info)
+        if unknown_categories:
+            _record_unknown_categories(index, unknown_categories)
+
+        # Analyze the JSON data to find the required information
+        hut_id, hut_name = hut_info['hut_id'], hut_info['hut_name']
+        category_id_list, room_label_list = hut_info['category_id_list'], hut_info['room_label_list']
+        if hut_id != index:
+            result['warning'] = 'Unexpected index: ' + hut_id
+        if hut_name != hut['name']:
+            result['warning'] = 'Unexpected name: ' + hut_name
+
+        parse_start_time = time.perf_counter()
+        hut_status, places, warning = _parse_hut_availability_json(hut_availability_json,
+                                                                   category_id_list, room_label_list)
+        _parse_time_metric.observe(parse_time + time.perf_counter() - parse_start_time, type='availability')
+        result['hut_status'] = hut_status
+        result['places'] = places
+        if warning is not None:
+            result['warning'] = warning
+
+        _circuit_breaker.record_success(index)
+
+    except RequestCancelled:
+        return None
+
+    except Exception as e:
+        result['error'] = f'Error occurred: {e}'
+        _circuit_breaker.record_failure(index)
 
     return result
 
 
+def _get(session, url, use_cache=False, cancellation=None, request_type='other', **kwargs):
+    """
+    Perform a GET request through the shared rate limiter.
+
+    Requests failing with a timeout, a connection error or a transient status code are retried with a jittered
+    exponential backoff. If no timeout is specified, it is derived from the observed latencies.
+    If the response cache is used, the request is made conditional on the cached validators; when the server
+    replies that the resource is not modified (status code 304) the cached body is set as content of the response.
+    If the request is cancelled, RequestCancelled is raised as soon as possible, also during the wait for a retry.
+
+    :param session: the requests Session object to be used
+    :param url: the URL to be requested
+    :param use_cache: flag defining if the response cache has to be used
+    :param cancellation: the Cancellation of the request (None if the request cannot be cancelled)
+    :param request_type: type of the request, used as label of the metrics
+    :param kwargs: additional parameters for the request
+    :return: the requests Response object
+    """
+    use_cache = use_cache and _http_cache_enabled
+    request_headers = kwargs.pop('headers', None)
+    headers = dict(request_headers or {})
+    if use_cache:
+        headers.update(_response_cache.conditional_headers(url))
+    adaptive_timeout = 'timeout' not in kwargs
+
+    attempt = 0
+    while True:
+        if adaptive_timeout:
+            kwargs['timeout'] = _latency_tracker.timeout(attempt)
+        try:
+            response = _get_once(session, url, headers, cancellation, request_type, **kwargs)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            if attempt >= _max_retries:
+                raise
+        else:
+            if response.status_code not in _RETRY_STATUS_CODES or attempt >= _max_retries:
+                break
+            response.close()
+        if cancellation is None:
+            time.sleep(_backoff_delay(attempt))
+        elif cancellation.sleep(_backoff_delay(attempt)):
+            raise RequestCancelled()
+        attempt += 1
+
+    if use_cache:
+        if response.status_code == requests.codes.not_modified:
+            body = _response_cache.load_body(url)
+            if body is None:
+                # The cached body is not available anymore: the resource is requested again unconditionally
+                if adaptive_timeout:
+                    kwargs.pop('timeout')
+                return _get(session, url, cancellation=cancellation, request_type=request_type,
+                            headers=request_headers, **kwargs)
+            response._content = body
+        elif response.status_code == requests.codes.ok:
+            _response_cache.store(url, response)
+    return response
+
+
+def _get_once(session, url, headers, cancellation=None, request_type='other', **kwargs):
+    """
+    Perform a single attempt of a GET request through the shared rate limiter, giving feedback to the controller.
+
+    The connect time, the time to first byte, the total time, the status and the size of the response are recorded
+    in the metrics of the web requests.
+
+    :param session: the requests Session object to be used
+    :param url: the URL to be requested
+    :param headers: the headers of the request
+    :param cancellation: the Cancellation of the request (None if the request cannot be cancelled)
+    :param request_type: type of the request, used as label of the metrics
+    :param kwargs: additional parameters for the request
+    :return: the requests Response object
+    """
+    if _shared_budget is not None and not _shared_budget(cancellation):
+        raise RequestCancelled()
+    _rate_limiter.acquire(cancellation)
+    _request_context.cancellation = cancellation
+    _request_context.connections = []
+    _request_context.connect_time = 0.
+    start_time = time.perf_counter()
+    try:
+        with _connection_statistics_lock:
+            _connection_statistics['requests'] += 1
+        response = session.get(url, headers=headers, **kwargs)
+    except requests.exceptions.RequestException as e:
+        if cancellation is not None and cancellation.cancelled:
+            _requests_metric.increment(type=request_type, status='cancelled')
+            raise RequestCancelled() from e
+        _requests_metric.increment(type=request_type, status=type(e).__name__)
+        if isinstance(e, requests.exceptions.Timeout):
+            _rate_controller.on_timeout()
+        raise
+    finally:
+        if cancellation is not None:
+            cancellation.detach(_request_context.connections)
+        _request_context.cancellation = None
+        _rate_limiter.release()
+    _record_request_metrics(request_type, response, time.perf_counter() - start_time, kwargs.get('stream', False))
+    ttfb = response.elapsed.total_seconds()
+    _rate_controller.on_response(response.status_code, ttfb, response.headers.get('Retry-After'))
+    if response.status_code in _SUCCESS_STATUS_CODES:
+        _latency_tracker.add(ttfb)
+    return response
+
+
+def _record_request_metrics(request_type, response, duration, stream=False):
+    """Record the metrics of a completed web request.
+
+    :param request_type: type of the request, used as label of the metrics
+    :param response: the requests Response object
+    :param duration: total time of the request, including the download of the response [seconds]
+    :param stream: flag defining if the response is streamed (its size is then recorded when downloaded)
+    """
+    _requests_metric.increment(type=request_type, status=str(response.status_code))
+    if _request_context.connect_time > 0:
+        _connect_time_metric.observe(_request_context.connect_time, type=request_type)
+    _ttfb_metric.observe(response.elapsed.total_seconds(), type=request_type)
+    _duration_metric.observe(duration, type=request_type)
+    if not stream:
+        _response_size_metric.observe(len(response.content), type=request_type)
+
+
+def _backoff_delay(attempt):
+    """Compute the delay before retrying a request, drawn uniformly up to a bound growing exponentially (full jitter).
+
+    :param attempt: number of the failed attempt (starting from 0)
+    :return: the delay [seconds]
+    """
+    delay = min(_MAX_BACKOFF, _BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(0, delay)
+
+
+def _get_hut_info(session, index, cancellation=None):
+    """
+    Get the information about a hut (room categories and labels, preferred language, name).
+
+    The information is taken from the cache if it is recent enough, otherwise it is retrieved from the web
+    and the cache is updated.
+
+    :param session: the requests Session object to be used
+    :param index: id number of the hut
+    :param cancellation: the Cancellation of the request (None if the request cannot be cancelled)
+    :return: dictionary of hut information; the 'cached' key defines if it has been taken from the cache
+    """
+    with _hut_info_cache_lock:
+        cached_hut_info = _hut_info_cache.get(index)
+    if (cached_hut_info is not None
+            and cached_hut_info['request_time'] + _hut_info_cache_expiration > datetime.datetime.now()):
+        return dict(cached_hut_info, cached=True)
+
+    url_hut_info = _base_url + f"api/v1/reservation/hutInfo/{index}"
+    hut_info = _get(session, url_hut_info, use_cache=True, cancellation=cancellation, request_type='hut_info',
+                    headers=_HEADERS, verify=True)
+    if hut_info.status_code not in _SUCCESS_STATUS_CODES:
+        errors.append({'type': f"Requests error on {hut_info.url}",
+                       'message': f"Status code: {hut_info.status_code}"})
+        raise Exception(f"Hut information error on hut {index}")
+
+    parse_start_time = time.perf_counter()
+    hut_info_json = _json_loads(hut_info.content)
+    hut_id, hut_name, language, category_id_list, room_label_list = _parse_hut_info_json(hut_info_json)
+    _parse_time_metric.observe(time.perf_counter() - parse_start_time, type='hut_info')
+    new_hut_info = {'hut_id': hut_id, 'hut_name': hut_name, 'language': language,
+                    'category_id_list': category_id_list, 'room_label_list': room_label_list,
+                    'request_time': datetime.datetime.now()}
+    with _hut_info_cache_lock:
+        _hut_info_cache[index] = new_hut_info
+    return dict(new_hut_info, cached=False)
+
+
+def _get_unknown_categories(hut_availability_json, hut_info):
+    """Get the bed categories of the availability information which are unknown to the hut information.
+
+    The categories already recorded as unknown to the hut information are not included.
+
+    :param hut_availability_json: the availability information (JSON data)
+    :param hut_info: dictionary of hut information
+    :return: the set of the unknown bed categories (as strings)
+    """
+    known_categories = {str(category_id) for category_id in hut_info['category_id_list']}
+    known_categories.update(hut_info.get('unknown_category_id_list', ()))
+    unknown_categories = set()
+    for day in hut_availability_json:
+        unknown_categories.update(day["freeBedsPerCategory"].keys() - known_categories)
+    return unknown_categories
+
+
+def _record_unknown_categories(index, unknown_categories):
+    """Record bed categories of the availability information unknown to the cached hut information.
+
+    :param index: id number of the hut
+    :param unknown_categories: the set of the unknown bed categories (as strings)
+    """
+    with _hut_info_cache_lock:
+        cached_hut_info = _hut_info_cache.get(index)
+        if cached_hut_info is not None:
+            recorded = set(cached_hut_info.get('unknown_category_id_list', ()))
+            _hut_info_cache[index] = dict(cached_hut_info,
+                                          unknown_category_id_list=sorted(recorded | unknown_categories))
+
+
 def _parse_hut_info_json(hut_info_json):
     hut_id = hut_info_json["hutId"]
     hut_name = hut_info_json["hutName"]
@@ -168,24 +1438,60 @@ def _parse_hut_info_json(hut_info_json):
                 break
         else:
             raise Exception("No valid hut language")
-    return hut_id, hut_name, category_id_list, room_label_list
+    return hut_id, hut_name, preferred_hut_language, category_id_list, room_label_list
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_date(date_formatted):
+    """Convert a date string used by the web pages into a date (memoised, since each date recurs for every hut).
+
+    :param date_formatted: the date string
+    :return: the corresponding date
+    """
+    return datetime.datetime.strptime(date_formatted, _WEB_DATE_FORMAT).date()
 
 
 def _parse_hut_availability_json(hut_availability_json, category_id_list, room_label_list):
+    """
+    Parse the availability information of a hut, summing the free places of the bed categories
+    by basic room type in the same pass.
+
+    :param hut_availability_json: the availability information (JSON data)
+    :param category_id_list: the list of bed categories of the hut
+    :param room_label_list: the list of labels of the bed categories of the hut
+    :return: tuple of the dictionary of hut status and of the dictionary of free places by room type,
+             both with date as key, and of the warning about unexpected room types (None if no warning)
+    """
+    # A room label appearing more than once refers to the last bed category with that label
+    category_for_label = dict(zip(room_label_list, (str(category_id) for category_id in category_id_list)))
+    room_types = []
+    warning = None
+    for room_label, category_id in category_for_label.items():
+        if room_label in _room_basic_types:
+            room_types.append((category_id, _room_basic_types[room_label]))
+        else:
+            warning = 'Unexpected room type: ' + room_label
+            room_types.append((category_id, _room_basic_types['default_type']))
+
     hut_status = {}
-    availabilities = {}
-    for i_day in range(len(hut_availability_json)):
-        availabilities_day = {}
-        date_formatted = hut_availability_json[i_day]["dateFormatted"]
-        date = datetime.datetime.strptime(date_formatted, '%d.%m.%Y').date()
-        if hut_availability_json[i_day]["hutStatus"] not in _HUT_STATUS_TYPES:
+    places = {}
+    is_open = False
+    for day in hut_availability_json:
+        date = _parse_date(day["dateFormatted"])
+        status = day["hutStatus"]
+        if status not in _HUT_STATUS_TYPES:
             raise Exception("Invalid hut status")
-        hut_status[date] = hut_availability_json[i_day]["hutStatus"]
-        free_beds_per_category = hut_availability_json[i_day]["freeBedsPerCategory"]
-        for room_label, category_id in zip(room_label_list, category_id_list):
-            availabilities_day[room_label] = free_beds_per_category.get(str(category_id), 0)
-        availabilities[date] = availabilities_day
-    return hut_status, availabilities
+        hut_status[date] = status
+        if status == "CLOSED":
+            places[date] = {'closed': 0}
+            continue
+        is_open = True
+        free_beds_per_category = day["freeBedsPerCategory"]
+        places_day = {}
+        for category_id, room_type in room_types:
+            places_day[room_type] = places_day.get(room_type, 0) + free_beds_per_category.get(category_id, 0)
+        places[date] = places_day
+    return hut_status, places, warning if is_open else None
 
 
 def open_hut_page(index):
@@ -210,8 +1516,8 @@ def search_for_updates(temp_folder, initial, observer, final_observer):
     :param observer: function to be executed during the search process (signature: (string))
     :param final_observer: function to be executed at the end of the search process (signature: (dict, boolean))
     """
-    global _update_cancelled
-    _update_cancelled = False
+    global _update_cancellation
+    _update_cancellation = Cancellation()
     if initial is not None:
         initial(_cancel_update, 'all updates')
 
@@ -221,12 +1527,11 @@ def search_for_updates(temp_folder, initial, observer, final_observer):
 
 
 def _cancel_update(obj):
-    """Cancel the application update request by setting the dedicated flag.
+    """Cancel the application update request, aborting the download in progress.
 
     :param obj: GUI object generating the cancel request
     """
-    global _update_cancelled
-    _update_cancelled = True
+    _update_cancellation.cancel()
 
 
 def _perform_update_request(temp_folder, observer, final_observer):
@@ -239,102 +1544,462 @@ def _perform_update_request(temp_folder, observer, final_observer):
     :param observer: function to be executed during the search process (signature: (string))
     :param final_observer: function to be executed at the end of the search process (signature: (dict, boolean))
     """
-    with requests.Session() as session:
-        all_updates = {}
+    if not _configured:
+        configure()
+
+    session = _session
+    all_updates = {}
+    update_state = _load_update_state()
+    update_state['offered'] = {}
+
+    if observer is not None:
+        observer('data_files')
 
-        if observer is not None:
-            observer('data_files')
+    update_data_files = config.UPDATE_DATA_FILES
+    if update_data_files is not None:
+        all_updates['data_files'] = _perform_data_update_request(session, temp_folder, update_data_files,
+                                                                 update_state)
 
-        update_data_files = config.UPDATE_DATA_FILES
-        if update_data_files is not None:
-            all_updates['data_files'] = _perform_data_update_request(session, temp_folder, update_data_files)
+    if observer is not None:
+        observer('tiles')
 
-        if observer is not None:
-            observer('tiles')
+    update_tiles = config.UPDATE_TILES
+    if update_tiles is not None:
+        all_updates['tiles'] = _perform_tiles_update_request(session, temp_folder, update_tiles, update_state)
 
-        update_tiles = config.UPDATE_TILES
-        if update_tiles is not None:
-            all_updates['tiles'] = _perform_tiles_update_request(session, temp_folder, update_tiles)
+    _save_update_state(update_state)
 
     if observer is not None:
         observer(None)
 
     if final_observer is not None:
-        final_observer(all_updates, _update_cancelled)
+        final_observer(all_updates, _update_cancellation.cancelled)
 
 
-def _perform_data_update_request(session, temp_folder, update_data_files):
+def _perform_data_update_request(session, temp_folder, update_data_files, update_state):
     """
     Perform the web requests for data files updates.
 
+    The files are checked concurrently with conditional requests, based on the validators (ETag, Last-Modified)
+    recorded at the previous check: a file not modified since then is not downloaded again, and it is an update only
+    if its recorded hash differs from the (cached) hash of the local file. The modified files are streamed to disk.
     This method executes in a secondary thread.
 
     :param session: a request Session object to be used to retrieve data
     :param temp_folder: temporary folder where to download the update files
     :param update_data_files: dictionary describing the data files for which updates should be searched
+    :param update_state: dictionary of the validators and hashes of the remote and local files (updated in place)
     :return: dictionary containing the information about the downloaded update files
     """
     if not _configured:
         configure()
 
     available_updates = {}
-    for folder, files_dict in update_data_files.items():
-        for filename, description in files_dict.items():
-            if _update_cancelled:
-                break
+    pending = [(folder, filename, description)
+               for folder, files_dict in update_data_files.items() for filename, description in files_dict.items()]
+    lock = Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending or _update_cancellation.cancelled:
+                    return
+                folder, filename, description = pending.pop(0)
             try:
-                with open(str(config.ASSETS_PATH_DATA / filename), 'rb') as old_file:
-                    old_content = old_file.read()
-                    old_md5 = hashlib.md5(old_content).digest()
-                updated_file = session.get(_updates_url + folder + filename, timeout=_TIMEOUT)
-                if updated_file.status_code == requests.codes.ok:
-                    content = updated_file.content
-                    update_md5 = hashlib.md5(content).digest()
-                    if update_md5 != old_md5:
-                        update_path = pathlib.Path(temp_folder) / filename
+                update_path = _check_data_file_update(session, _updates_url + folder + filename,
+                                                      config.ASSETS_PATH_DATA / filename,
+                                                      pathlib.Path(temp_folder) / filename, update_state, lock)
+                if update_path is not None:
+                    with lock:
                         available_updates[filename] = (update_path, description)
-                        with open(pathlib.Path(temp_folder) / filename, 'wb') as f:
-                            f.write(content)
-                else:
-                    errors.append({'type': f"Requests error on {updated_file.url}",
-                                   'message': f"Status code: {updated_file.status_code}"})
+            except RequestCancelled:
+                return
             except Exception as e:
                 errors.append({'type': type(e), 'message': str(e)})
 
+    workers = [Thread(target=worker) for _ in range(min(_max_concurrent_requests, len(pending)))]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
     return available_updates
 
 
-def _perform_tiles_update_request(session, temp_folder, update_tiles):
+def _check_data_file_update(session, url, local_path, update_path, update_state, lock):
+    """Check if a data file has been updated, downloading it if necessary.
+
+    :param session: a request Session object to be used to retrieve data
+    :param url: the URL of the remote file
+    :param local_path: the path of the local file
+    :param update_path: the path where the updated file is downloaded
+    :param update_state: dictionary of the validators and hashes of the remote and local files (updated in place)
+    :param lock: the lock protecting the update state
+    :return: the path of the downloaded update file, None if the local file is up to date
+    """
+    local_hash = _get_local_file_hash(local_path, update_state, lock)
+    with lock:
+        remote = dict(update_state['remote'].get(url, {}))
+    headers = {}
+    if remote.get('hash') is not None:
+        if remote.get('etag') is not None:
+            headers['If-None-Match'] = remote['etag']
+        if remote.get('last_modified') is not None:
+            headers['If-Modified-Since'] = remote['last_modified']
+
+    response, remote_hash = _download(session, url, update_path, headers, 'data_file')
+    if response.status_code == requests.codes.not_modified:
+        if remote['hash'] == local_hash:
+            return None
+        # The remote file is not modified, but it differs from the local one (the update was not applied)
+        response, remote_hash = _download(session, url, update_path, {}, 'data_file')
+    if response.status_code != requests.codes.ok:
+        errors.append({'type': f"Requests error on {response.url}",
+                       'message': f"Status code: {response.status_code}"})
+        return None
+
+    with lock:
+        update_state['remote'][url] = {'etag': response.headers.get('ETag'),
+                                       'last_modified': response.headers.get('Last-Modified'),
+                                       'hash': remote_hash}
+    if remote_hash == local_hash:
+        update_path.unlink()
+        return None
+    return update_path
+
+
+def _download(session, url, path, headers, request_type, update_state=None):
+    """
+    Download a file, streaming it to disk and computing its hash while streaming.
+
+    If the update state is provided, the download is resumable: the file is streamed to a partial file in the cache,
+    kept if the download is interrupted, and the next download of the same URL requests only the missing part
+    (Range request), provided that the remote file has not changed in the meantime (If-Range).
+
+    :param session: a request Session object to be used to retrieve data
+    :param url: the URL of the file
+    :param path: the path where the file is written
+    :param headers: the headers of the request (e.g. the conditional ones)
+    :param request_type: type of the request, used as label of the metrics
+    :param update_state: dictionary of the validators and hashes of the remote and local files (updated in place);
+                         if None, the download is not resumable
+    :return: tuple of the requests Response object and of the hash of the file (None if not downloaded)
+    """
+    request_headers = dict(headers)
+    offset = 0
+    if update_state is not None:
+        part_path = _PARTIAL_DOWNLOADS_PATH / (hashlib.md5(url.encode()).hexdigest() + '.part')
+        partial = update_state['partial'].get(url)
+        validator = None if partial is None else partial.get('etag') or partial.get('last_modified')
+        if validator is not None and not headers and part_path.is_file():
+            offset = part_path.stat().st_size
+            request_headers['Range'] = f'bytes={offset}-'
+            request_headers['If-Range'] = validator
+    else:
+        part_path = path
+
+    response = _get(session, url, cancellation=_update_cancellation, request_type=request_type,
+                    headers=request_headers, stream=True, timeout=_TIMEOUT)
+    resumed = (response.status_code == requests.codes.partial_content
+               and response.headers.get('Content-Range', '').startswith(f'bytes {offset}-'))
+    if response.status_code != requests.codes.ok and not resumed:
+        response.close()
+        return response, None
+
+    file_hash = hashlib.md5()
+    if resumed:
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_DOWNLOAD_CHUNK_SIZE), b''):
+                file_hash.update(chunk)
+    if update_state is not None:
+        update_state['partial'][url] = {'etag': response.headers.get('ETag'),
+                                        'last_modified': response.headers.get('Last-Modified')}
+        part_path.parent.mkdir(parents=True, exist_ok=True)
+
+    size = 0
+    with response, open(part_path, 'ab' if resumed else 'wb') as f:
+        for chunk in response.iter_content(_DOWNLOAD_CHUNK_SIZE):
+            if _update_cancellation.cancelled:
+                raise RequestCancelled()
+            f.write(chunk)
+            file_hash.update(chunk)
+            size += len(chunk)
+    _response_size_metric.observe(size, type=request_type)
+
+    if update_state is not None:
+        del update_state['partial'][url]
+        shutil.move(str(part_path), str(path))
+    return response, file_hash.hexdigest()
+
+
+def _get_local_file_hash(path, update_state, lock):
+    """Get the hash of a local file, from the cache if the file has not been modified since it was hashed.
+
+    :param path: the path of the local file
+    :param update_state: dictionary of the validators and hashes of the remote and local files (updated in place)
+    :param lock: the lock protecting the update state
+    :return: the hash of the file, None if the file does not exist
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = str(path)
+    with lock:
+        cached = update_state['local'].get(key)
+    if cached is not None and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime_ns:
+        return cached['hash']
+    file_hash = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_DOWNLOAD_CHUNK_SIZE), b''):
+            file_hash.update(chunk)
+    with lock:
+        update_state['local'][key] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': file_hash.hexdigest()}
+    return file_hash.hexdigest()
+
+
+def _load_update_state():
+    """Load the validators and hashes of the remote and local files recorded by the previous update checks.
+
+    :return: dictionary with the 'remote' (URL as key), 'local' (path as key), 'partial' (URL as key, partial
+             downloads), 'installed' (URL as key, hash of the installed version) and 'offered' (update path as key,
+             URL and hash of the offered updates) records
+    """
+    update_state = {}
+    try:
+        with open(_UPDATE_STATE_FILE, encoding='UTF-8') as state_file:
+            update_state = json.load(state_file)
+    except (IOError, ValueError):
+        pass
+    if not isinstance(update_state, dict):
+        update_state = {}
+    return {key: dict(update_state.get(key, {})) for key in ('remote', 'local', 'partial', 'installed', 'offered')}
+
+
+def _save_update_state(update_state):
+    """Save the validators and hashes of the remote and local files, for the next update checks.
+
+    :param update_state: dictionary of the update state records (see _load_update_state)
+    """
+    try:
+        _UPDATE_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(_UPDATE_STATE_FILE, 'w', encoding='UTF-8') as state_file:
+            json.dump(update_state, state_file)
+    except IOError as e:
+        errors.append({'type': type(e), 'message': str(e)})
+
+
+def _perform_tiles_update_request(session, temp_folder, update_tiles, update_state):
     """
     Perform the web requests for tiles updates.
 
+    If a manifest of the tiles (JSON dictionary of the MD5 hash, size and modification time of each tile, with the tile
+    path 'zoom/x/y.png' as key) is configured and available, only the tiles which differ from the local ones are
+    downloaded, and packed in a small archive. Otherwise, the whole archive is checked with a conditional request and,
+    if it has changed since the installed version, downloaded as a resumable stream.
     This method executes in a secondary thread.
 
     :param session: a request Session object to be used to retrieve data
     :param temp_folder: temporary folder where to download the update files
     :param update_tiles: dictionary describing the tiles files for which updates should be searched
+    :param update_state: dictionary of the validators and hashes of the remote and local files (updated in place)
     :return: dictionary containing the information about the downloaded update files
     """
     if not _configured:
         configure()
 
     available_updates = {}
+    tiles_manifest = config.UPDATE_TILES_MANIFEST
     for folder, files_dict in update_tiles.items():
         for filename, description in files_dict.items():
-            if _update_cancelled:
+            if _update_cancellation.cancelled:
                 break
             try:
-                updated_file = session.get(_updates_url + folder + filename, timeout=_TIMEOUT)
-                if updated_file.status_code == requests.codes.ok:
-                    content = updated_file.content
-                    update_path = pathlib.Path(temp_folder) / filename
+                update_path = pathlib.Path(temp_folder) / filename
+                is_updated = None
+                if tiles_manifest is not None:
+                    is_updated = _check_tiles_delta_update(session, _updates_url + folder, tiles_manifest,
+                                                           update_path, update_state)
+                if is_updated is None:
+                    is_updated = _check_tiles_archive_update(session, _updates_url + folder + filename,
+                                                             update_path, update_state)
+                if is_updated:
                     available_updates[filename] = (update_path, description)
-                    with open(pathlib.Path(temp_folder) / filename, 'wb') as f:
-                        f.write(content)
-                else:
-                    errors.append({'type': f"Requests error on {updated_file.url}",
-                                   'message': f"Status code: {updated_file.status_code}"})
+            except RequestCancelled:
+                break
             except Exception as e:
                 errors.append({'type': type(e), 'message': str(e)})
 
     return available_updates
+
+
+def _check_tiles_archive_update(session, url, update_path, update_state):
+    """Check if the tiles archive has changed since the installed version, downloading it if necessary.
+
+    :param session: a request Session object to be used to retrieve data
+    :param url: the URL of the tiles archive
+    :param update_path: the path where the updated archive is downloaded
+    :param update_state: dictionary of the validators and hashes of the remote and local files (updated in place)
+    :return: True if an updated archive has been downloaded, False otherwise
+    """
+    remote = update_state['remote'].get(url, {})
+    installed_hash = update_state['installed'].get(url)
+    headers = {}
+    if remote.get('hash') is not None and remote['hash'] == installed_hash:
+        if remote.get('etag') is not None:
+            headers['If-None-Match'] = remote['etag']
+        if remote.get('last_modified') is not None:
+            headers['If-Modified-Since'] = remote['last_modified']
+
+    response, remote_hash = _download(session, url, update_path, headers, 'tile', update_state)
+    if response.status_code == requests.codes.not_modified:
+        return False
+    if remote_hash is None:
+        errors.append({'type': f"Requests error on {response.url}",
+                       'message': f"Status code: {response.status_code}"})
+        return False
+
+    update_state['remote'][url] = {'etag': response.headers.get('ETag'),
+                                   'last_modified': response.headers.get('Last-Modified'),
+                                   'hash': remote_hash}
+    if remote_hash == installed_hash:
+        update_path.unlink()
+        return False
+    update_state['offered'][str(update_path)] = {'url': url, 'hash': remote_hash}
+    return True
+
+
+def _check_tiles_delta_update(session, tiles_url, manifest_filename, update_path, update_state):
+    """Check the tiles against the manifest of the tiles, packing the changed tiles in an archive.
+
+    :param session: a request Session object to be used to retrieve data
+    :param tiles_url: the URL of the folder of the tiles
+    :param manifest_filename: the name of the manifest file in the folder of the tiles
+    :param update_path: the path of the archive of the changed tiles
+    :param update_state: dictionary of the validators and hashes of the remote and local files (updated in place)
+    :return: True if changed tiles have been downloaded, False if the tiles are up to date,
+             None if the manifest is not available
+    """
+    manifest_url = tiles_url + manifest_filename
+    remote = update_state['remote'].get(manifest_url, {})
+    headers = {}
+    if remote.get('hash') is not None and remote['hash'] == update_state['installed'].get(manifest_url):
+        if remote.get('etag') is not None:
+            headers['If-None-Match'] = remote['etag']
+        if remote.get('last_modified') is not None:
+            headers['If-Modified-Since'] = remote['last_modified']
+    response = _get(session, manifest_url, cancellation=_update_cancellation, request_type='tile',
+                    headers=headers, timeout=_TIMEOUT)
+    if response.status_code == requests.codes.not_modified:
+        return False
+    if response.status_code != requests.codes.ok:
+        return None
+
+    manifest_hash = hashlib.md5(response.content).hexdigest()
+    manifest = _json_loads(response.content)
+    # The tile paths are used to write the tiles: a manifest with paths outside the tiles folder is rejected
+    invalid_tiles = [tile for tile in manifest if not _TILE_PATH_PATTERN.fullmatch(tile)]
+    if invalid_tiles:
+        errors.append({'type': f"Invalid tiles manifest {manifest_url}",
+                       'message': f"Invalid tile paths: {', '.join(invalid_tiles[:5])}"})
+        return None
+    update_state['remote'][manifest_url] = {'etag': response.headers.get('ETag'),
+                                            'last_modified': response.headers.get('Last-Modified'),
+                                            'hash': manifest_hash}
+    lock = Lock()
+    changed = [tile for tile, entry in manifest.items()
+               if not _is_tile_unchanged(config.ASSETS_PATH_TILES / tile, entry)]
+    if not changed:
+        update_state['installed'][manifest_url] = manifest_hash
+        return False
+
+    pending = list(changed)
+    updated = []
+
+    def worker():
+        while True:
+            with lock:
+                if not pending or _update_cancellation.cancelled:
+                    return
+                tile = pending.pop()
+            try:
+                tile_response = _get(session, tiles_url + tile, cancellation=_update_cancellation,
+                                     request_type='tile', timeout=_TIMEOUT)
+                content = tile_response.content
+            except RequestCancelled:
+                return
+            except requests.RequestException as e:
+                errors.append({'type': type(e), 'message': str(e)})
+                continue
+            if (tile_response.status_code != requests.codes.ok
+                    or hashlib.md5(content).hexdigest() != manifest[tile]['md5']):
+                errors.append({'type': f"Requests error on {tile_response.url}",
+                               'message': f"Status code: {tile_response.status_code}, tile not updated"})
+                continue
+            tile_info = tarfile.TarInfo(tile)
+            tile_info.size = len(content)
+            tile_info.mtime = manifest[tile]['mtime']
+            with lock:
+                archive.addfile(tile_info, io.BytesIO(content))
+                updated.append(tile)
+
+    with tarfile.open(update_path, 'w') as archive:
+        workers = [Thread(target=worker) for _ in range(min(_max_concurrent_requests, len(pending)))]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    if _update_cancellation.cancelled:
+        raise RequestCancelled()
+    if not updated:
+        update_path.unlink()
+        return False
+
+    # If some tiles could not be downloaded, the manifest is not recorded as installed with the update,
+    # so that the next search compares again the tiles against it
+    complete = len(updated) == len(changed)
+    update_state['offered'][str(update_path)] = {'url': manifest_url, 'hash': manifest_hash if complete else None}
+    return True
+
+
+def _is_tile_unchanged(path, entry):
+    """
+    Check if a local tile matches its entry in the manifest of the tiles.
+
+    A tile is unchanged if it has the size and the modification time of the manifest, so that the tiles are checked
+    without hashing them and without keeping their hashes. A tile with the same size but another modification time
+    (e.g. extracted from an archive not created with the manifest) is hashed and, if unchanged, it is given the
+    modification time of the manifest, so that it is not hashed again at the next checks.
+
+    :param path: the path of the local tile
+    :param entry: the entry of the tile in the manifest (dictionary with the 'md5', 'size' and 'mtime' keys)
+    :return: True if the local tile is unchanged, False if it is missing or it has changed
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size != entry['size']:
+        return False
+    if int(stat.st_mtime) == entry['mtime']:
+        return True
+    with open(path, 'rb') as f:
+        if hashlib.md5(f.read()).hexdigest() != entry['md5']:
+            return False
+    try:
+        os.utime(path, (stat.st_atime, entry['mtime']))
+    except OSError:
+        pass
+    return True
+
+
+def confirm_update(update_path):
+    """Record that a downloaded update has been installed, so that it is not offered again by the next searches.
+
+    :param update_path: the path of the downloaded update file, as provided to the final observer of the search
+    """
+    update_state = _load_update_state()
+    offered = update_state['offered'].pop(str(update_path), None)
+    if offered is not None:
+        update_state['installed'][offered['url']] = offered['hash']
+        _save_update_state(update_state)
@@ -0,0 +1,41 @@
+"""
+Create the manifest of the tiles, to be published next to the tiles archive for the delta tiles updates.
+
+The manifest is a JSON dictionary of the MD5 hash, the size and the modification time of each tile, with the tile
+path 'zoom/x/y.png' as key; its file name is defined by the UPDATE_TILES_MANIFEST key of the configuration file.
+The manifest has to be created from the tiles packed in the tiles archive, so that the modification times of the
+extracted tiles match those of the manifest.
+
+Run with:
+python tiles_manifest.py [-t TILES_FOLDER] [-o OUTPUT]
+"""
+import argparse
+import hashlib
+import json
+import pathlib
+
+from src import config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the manifest of the tiles for the delta tiles updates.")
+    parser.add_argument('-t', '--tiles', type=str, default=str(config.ASSETS_PATH_TILES),
+                        help="Folder of the tiles")
+    parser.add_argument('-o', '--output', type=str, default='tiles_manifest.json',
+                        help="Manifest file")
+    args = parser.parse_args()
+
+    tiles_path = pathlib.Path(args.tiles)
+    manifest = {}
+    for tile_path in sorted(tiles_path.glob('*/*/*.png')):
+        stat = tile_path.stat()
+        manifest[tile_path.relative_to(tiles_path).as_posix()] = {'md5': hashlib.md5(tile_path.read_bytes()).hexdigest(),
+                                                                  'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+    with open(args.output, 'w', encoding='UTF-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=0, sort_keys=True)
+    print(f"Manifest of {len(manifest)} tiles written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -40,10 +40,7 @@ for index, hut in huts_model._huts_dictionary.items():
         hut_map.update_zoom(1)
 
 # Look for missing tiles that need to be generated
-missing_tiles = set()
-for error in map_tools.errors:
-    if error['type'] == 'Missing tile':
-        missing_tiles.add(error['message'])
+missing_tiles = set(map_tools.missing_tiles)
 
 if not missing_tiles:
     print("No tiles missing")